@@ -1,5 +1,5 @@
 import os
-from flask import Flask
+from flask import Flask, request
 from flask_cors import CORS
 from routes.fetch_clean_doc import fetch_clean_doc_bp, fetch_user_docs_bp
 from routes.delete_account import delete_account_bp
@@ -9,6 +9,10 @@ from routes.progress import progress_bp
 from routes.submit_challenge import submit_challenge_bp
 from routes.report_routes import report_bp
 from routes.leaderboard import leaderboard_bp
+from routes.jobs import jobs_bp
+from routes.metrics import metrics_bp
+from services.compression import finalize_response
+from services import resilience
 
 FRONTEND_URL = os.getenv("FRONTEND_URL", "https://fundocs.appwrite.network")
 
@@ -19,7 +23,7 @@ CORS(
     resources={r"/api/*": {"origins": FRONTEND_URL}},
     supports_credentials=True,
     methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-    allow_headers=["Content-Type", "Authorization"]
+    allow_headers=["Content-Type", "Authorization", "X-Request-Timeout"]
 )
 
 # Register routes
@@ -32,14 +36,29 @@ app.register_blueprint(progress_bp, url_prefix="/api")
 app.register_blueprint(submit_challenge_bp, url_prefix="/api")
 app.register_blueprint(report_bp, url_prefix="/api")
 app.register_blueprint(leaderboard_bp, url_prefix="/api")
+app.register_blueprint(jobs_bp, url_prefix="/api")
+app.register_blueprint(metrics_bp, url_prefix="/api")
+
+# Outbound calls made while handling a request share its latency budget
+@app.before_request
+def start_latency_budget():
+    resilience.start_request_budget(request.headers.get("X-Request-Timeout"))
+
+@app.teardown_request
+def end_latency_budget(exc=None):
+    resilience.end_request_budget()
 
 @app.after_request
 def add_cors_headers(response):
     response.headers["Access-Control-Allow-Origin"] = FRONTEND_URL
     response.headers["Access-Control-Allow-Credentials"] = "true"
-    response.headers["Access-Control-Allow-Headers"] = "Content-Type,Authorization"
+    response.headers["Access-Control-Allow-Headers"] = "Content-Type,Authorization,X-Request-Timeout"
     response.headers["Access-Control-Allow-Methods"] = "GET,POST,PUT,DELETE,OPTIONS"
     return response
 
+# Compression and ETags; independent of the CORS headers above, which it
+# leaves in place (Vary is extended, not replaced)
+app.after_request(finalize_response)
+
 if __name__ == "__main__":
     app.run(debug=True, port=5000)
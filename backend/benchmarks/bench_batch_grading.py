@@ -0,0 +1,89 @@
+# Benchmark: grading three answers one by one vs. with /api/submit_challenges_batch
+# Run from backend/ with the usual .env: python -m benchmarks.bench_batch_grading
+#
+# Gemini is replaced by a stand-in with a fixed latency (slightly longer for
+# bigger prompts) that grades every answer it is sent; Appwrite writes have
+# their own fixed latency. Caches are cleared between scenarios.
+import re
+import json
+import time
+import threading
+from unittest import mock
+from app import app
+from routes import submit_challenge
+from services import evaluation_cache, llm_response
+
+GEMINI_LATENCY = 1.5
+GEMINI_LATENCY_PER_ANSWER = 0.2
+APPWRITE_LATENCY = 0.02
+ANSWERS = 3
+
+
+class FakeGemini:
+    def __init__(self):
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def post(self, url, **kwargs):
+        prompt = kwargs["json"]["contents"][0]["parts"][0]["text"]
+        ids = re.findall(r"### Answer (\S+)", prompt)
+        with self.lock:
+            self.calls += 1
+        time.sleep(GEMINI_LATENCY + GEMINI_LATENCY_PER_ANSWER * max(len(ids), 1))
+        if ids:
+            body = {"results": [{"id": i, "success": True, "feedback": "Good.", "xp": 5} for i in ids]}
+        else:
+            body = {"success": True, "feedback": "Good.", "xp": 5}
+        resp = mock.Mock(status_code=200, text="")
+        resp.json.return_value = {"candidates": [{"content": {"parts": [{"text": json.dumps(body)}]}}]}
+        return resp
+
+
+def main():
+    gemini = FakeGemini()
+    awards, writes = [], []
+    client = app.test_client()
+    doc = {"$id": "doc1", "title": "Flexbox", "createdBy": "u1",
+           "challenges": "1. Center a div.\n2. Build a sticky footer.\n3. Make a responsive grid."}
+
+    def create_document(*args, **kwargs):
+        time.sleep(APPWRITE_LATENCY)
+        writes.append(args)
+
+    def run(name, fn):
+        evaluation_cache._entries.clear()
+        gemini.calls = 0
+        awards.clear()
+        writes.clear()
+        start = time.perf_counter()
+        xp = fn()
+        elapsed = time.perf_counter() - start
+        print(f"{name:<10} {elapsed * 1000:7.0f} ms  gemini calls {gemini.calls}  "
+              f"submission writes {len(writes)}  progress updates {len(awards)}  xp {xp}")
+
+    solutions = [f"answer to challenge {i + 1}" for i in range(ANSWERS)]
+
+    def one_by_one():
+        return sum(
+            client.post("/api/submit_challenge", json={
+                "user_id": "u1", "doc_id": "doc1", "user_solution": s,
+            }).json["xp_awarded"]
+            for s in solutions
+        )
+
+    def batch():
+        return client.post("/api/submit_challenges_batch", json={
+            "user_id": "u1",
+            "answers": [{"doc_id": "doc1", "user_solution": s} for s in solutions],
+        }).json["xp_awarded"]
+
+    with mock.patch.object(llm_response.http_client, "post", gemini.post), \
+            mock.patch.object(submit_challenge.challenge_store, "get", return_value=doc), \
+            mock.patch.object(submit_challenge.databases, "create_document", create_document), \
+            mock.patch.object(submit_challenge.xp_pipeline, "award", lambda *a: awards.append(a)):
+        run("one by one", one_by_one)
+        run("batch", batch)
+
+
+if __name__ == "__main__":
+    main()
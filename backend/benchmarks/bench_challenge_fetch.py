@@ -0,0 +1,67 @@
+# Benchmark: challenge lookup cost vs. document size, full get vs. projected vs. cached
+# Run from backend/ with the usual .env: python -m benchmarks.bench_challenge_fetch
+#
+# Appwrite is replaced by a stand-in that honours Query.select, adds a
+# fixed round-trip latency plus transfer time at APPWRITE_BANDWIDTH, and
+# decodes the JSON body like the SDK does.
+import json
+import time
+from services import challenge_store
+
+APPWRITE_LATENCY = 0.005
+APPWRITE_BANDWIDTH = 50e6  # bytes/s
+DOC_SIZES = [10_000, 100_000, 1_000_000]
+RUNS = 20
+
+
+class FakeDatabases:
+    def __init__(self, doc):
+        self.doc = doc
+        self.bytes_sent = 0
+
+    def get_document(self, database_id, collection_id, document_id, queries=None):
+        doc = self.doc
+        for q in queries or []:
+            q = json.loads(q)
+            if q["method"] == "select":
+                doc = {k: v for k, v in doc.items() if k in q["values"]}
+        body = json.dumps(doc)
+        self.bytes_sent += len(body)
+        time.sleep(APPWRITE_LATENCY + len(body) / APPWRITE_BANDWIDTH)
+        return json.loads(body)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    for _ in range(RUNS):
+        fn()
+    return (time.perf_counter() - start) / RUNS * 1000
+
+
+def main():
+    print(f"{'doc size':>9} {'full ms':>8} {'projected ms':>13} {'cached ms':>10} {'full bytes':>11} {'projected bytes':>16}")
+    for size in DOC_SIZES:
+        doc = {
+            "$id": "doc1", "title": "Flexbox", "createdBy": "u1",
+            "text": "x" * size, "story": "y" * (size // 10), "flashcards": "[]",
+            "challenges": "1. Center a div with flexbox.\n2. Build a sticky footer.",
+        }
+        fake = FakeDatabases(doc)
+        challenge_store.databases = fake
+
+        full_ms = timed(lambda: fake.get_document("db", "docs", "doc1"))
+        full_bytes = fake.bytes_sent // RUNS
+
+        def projected():
+            challenge_store.invalidate("doc1")
+            challenge_store.get("doc1")
+
+        fake.bytes_sent = 0
+        projected_ms = timed(projected)
+        projected_bytes = fake.bytes_sent // RUNS
+        cached_ms = timed(lambda: challenge_store.get("doc1"))
+        print(f"{size:>9,} {full_ms:8.2f} {projected_ms:13.2f} {cached_ms:10.4f} {full_bytes:>11,} {projected_bytes:>16,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# Benchmark: bytes on the wire and CPU for JSON responses, identity vs. gzip vs. brotli
+# Run from backend/ with the usual .env: python -m benchmarks.bench_compression
+#
+# Payloads mimic /api/leaderboard, /api/fetch_user_docs (summary and full)
+# and /api/generate_all. Each is pushed through a throwaway route so the
+# numbers include Flask's JSON serialization, the ETag and the encoder;
+# "revalidate" is a repeat request carrying the ETag (answered with 304).
+import time
+from flask import Flask, jsonify
+from services import compression
+
+RUNS = 20
+
+LOREM = (
+    "Flexbox lays items out along a main axis. Use justify-content to distribute "
+    "space and align-items to align them on the cross axis. "
+)
+
+
+def payloads():
+    leaderboard = {
+        "leaderboard": [
+            {"$id": f"user{i:04d}", "name": f"Learner {i}", "xp": 5000 - i * 7, "streak": i % 30,
+             "badges": ["Fast Starter", "Going Strong", "Rising Coder"][: 1 + i % 3],
+             "avatar": None, "rank": i + 1}
+            for i in range(100)
+        ],
+        "next_cursor": "NDMwMDp1c2VyMDA5OQ==",
+    }
+    summary = {"docs": [{"$id": f"doc{i:03d}", "title": f"Doc {i}", "createdAt": "2026-01-01T00:00:00Z"} for i in range(100)]}
+    doc = {
+        "$id": "doc001", "title": "CSS Flexbox", "text": LOREM * 400,
+        "story": LOREM * 40, "steps": LOREM * 10, "challenges": LOREM * 10,
+        "flashcards": '[{"question": "What is the main axis?", "answer": "The flex-direction axis."}]' * 10,
+        "createdAt": "2026-01-01T00:00:00Z",
+    }
+    generate_all = {"doc": doc, "story": doc["story"], "slider": doc["steps"],
+                    "challenges": doc["challenges"], "flashcards": doc["flashcards"]}
+    full = {"docs": [dict(doc, **{"$id": f"doc{i:03d}"}) for i in range(20)]}
+    return [("leaderboard", leaderboard), ("docs summary", summary),
+            ("generate_all", generate_all), ("docs full x20", full)]
+
+
+def main():
+    app = Flask(__name__)
+    app.after_request(compression.finalize_response)
+    current = {}
+
+    @app.route("/payload")
+    def payload():
+        return jsonify(current["data"])
+
+    client = app.test_client()
+    encodings = [("identity", "identity")] + [(e, e) for e in compression.ENCODERS]
+    print(f"{'payload':<14} {'encoding':<9} {'bytes':>10} {'ms/req':>8} {'revalidate ms':>14}")
+    for name, data in payloads():
+        current["data"] = data
+        for label, accept in encodings:
+            resp = client.get("/payload", headers={"Accept-Encoding": accept})
+            etag = resp.headers["ETag"]
+            start = time.perf_counter()
+            for _ in range(RUNS):
+                client.get("/payload", headers={"Accept-Encoding": accept})
+            per_request = (time.perf_counter() - start) / RUNS
+            start = time.perf_counter()
+            for _ in range(RUNS):
+                status = client.get("/payload", headers={"Accept-Encoding": accept, "If-None-Match": etag}).status_code
+            per_revalidate = (time.perf_counter() - start) / RUNS
+            assert status == 304
+            print(f"{name:<14} {label:<9} {len(resp.data):>10,} {per_request * 1000:8.2f} {per_revalidate * 1000:14.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# Benchmark: full vs. summary doc listing for a user with 100 large docs
+# Run from backend/ with the usual .env: python -m benchmarks.bench_doc_listing
+#
+# Appwrite is replaced by an in-memory stand-in that honours select, limit
+# and cursorAfter, and round-trips every response through JSON the way the
+# SDK does. "appwrite bytes" is what the stand-in would have sent over the
+# wire; "response bytes" is what the browser receives.
+import json
+import time
+from unittest import mock
+from app import app
+from routes import fetch_clean_doc
+
+DOCS = 100
+TEXT_CHARS = 1_000_000
+RUNS = 3
+
+
+class FakeDatabases:
+    def __init__(self, docs):
+        self.docs = docs
+        self.bytes_sent = 0
+
+    def list_documents(self, database_id, collection_id, queries=None):
+        parsed = [json.loads(q) for q in queries or []]
+        docs = self.docs
+        select, limit = None, 25
+        for q in parsed:
+            if q["method"] == "equal":
+                docs = [d for d in docs if d.get(q["attribute"]) in q["values"]]
+            elif q["method"] == "select":
+                select = q["values"]
+            elif q["method"] == "limit":
+                limit = q["values"][0]
+            elif q["method"] == "cursorAfter":
+                ids = [d["$id"] for d in docs]
+                docs = docs[ids.index(q["values"][0]) + 1:]
+        page = docs[:limit]
+        if select:
+            page = [{k: d[k] for k in select + ["$id"] if k in d} for d in page]
+        body = json.dumps({"total": len(docs), "documents": page})
+        self.bytes_sent += len(body)
+        return json.loads(body)
+
+
+def make_docs():
+    text = "lorem ipsum dolor sit amet " * (TEXT_CHARS // 27)
+    return [
+        {
+            "$id": f"doc{i:03d}",
+            "title": f"Doc {i}",
+            "text": text,
+            "story": text[:20000],
+            "slider": text[:5000],
+            "challenges": text[:5000],
+            "flashcards": "[]",
+            "createdBy": "u1",
+            "createdAt": "2026-01-01T00:00:00Z",
+        }
+        for i in range(DOCS)
+    ]
+
+
+def main():
+    fake = FakeDatabases(make_docs())
+    client = app.test_client()
+    with mock.patch("services.collection_iter.databases", fake), \
+            mock.patch.object(fetch_clean_doc, "databases", fake):
+        for name, query in (("full", ""), ("summary", "&view=summary")):
+            best = None
+            for _ in range(RUNS):
+                fake.bytes_sent = 0
+                start = time.perf_counter()
+                resp = client.get(f"/api/fetch_user_docs?userId=u1{query}")
+                elapsed = time.perf_counter() - start
+                assert resp.status_code == 200
+                best = elapsed if best is None else min(best, elapsed)
+            print(
+                f"{name:<8} {len(resp.json['docs'])} docs  {best * 1000:9.1f} ms  "
+                f"response bytes {len(resp.data):>11,}  appwrite bytes {fake.bytes_sent:>11,}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# Benchmark: /api/submit_challenge with the evaluation cache and single-flight
+# Run from backend/ with the usual .env: python -m benchmarks.bench_eval_cache
+#
+# Gemini is replaced by a stand-in with a fixed latency that counts calls;
+# Appwrite and the XP pipeline are stubbed. Scenarios: a burst of users
+# sending the canonical solution at once, then the same users resubmitting
+# (cache hits must not pay out again), then a mix of distinct answers.
+import json
+import time
+import threading
+from unittest import mock
+from concurrent.futures import ThreadPoolExecutor
+from app import app
+from routes import submit_challenge
+from services import evaluation_cache, llm_response
+
+GEMINI_LATENCY = 1.0
+USERS = 50
+
+
+class FakeGemini:
+    def __init__(self):
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def post(self, url, **kwargs):
+        with self.lock:
+            self.calls += 1
+        time.sleep(GEMINI_LATENCY)
+        resp = mock.Mock(status_code=200, text="")
+        body = json.dumps({"success": True, "feedback": "Looks good.", "xp": 5})
+        resp.json.return_value = {"candidates": [{"content": {"parts": [{"text": body}]}}]}
+        return resp
+
+
+def main():
+    gemini = FakeGemini()
+    awards = []
+    client = app.test_client()
+    doc = {"challenges": "Center a div with flexbox.", "title": "Flexbox"}
+
+    def submit(user, solution):
+        return client.post("/api/submit_challenge", json={
+            "user_id": user, "doc_id": "doc1", "user_solution": solution,
+        }).json
+
+    def burst(name, jobs):
+        gemini.calls = 0
+        awards.clear()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(jobs)) as pool:
+            results = list(pool.map(lambda job: submit(*job), jobs))
+        elapsed = time.perf_counter() - start
+        print(
+            f"{name:<24} {len(jobs):3d} submissions  gemini calls {gemini.calls:3d}  "
+            f"{elapsed * 1000:7.0f} ms  xp awards {len(awards):3d}  "
+            f"xp total {sum(r['xp_awarded'] for r in results):4d}"
+        )
+
+    canonical = ".parent { display: flex; justify-content: center; align-items: center; }"
+    with mock.patch.object(llm_response.http_client, "post", gemini.post), \
+            mock.patch.object(submit_challenge.databases, "get_document", return_value=doc), \
+            mock.patch.object(submit_challenge.databases, "create_document", return_value={}), \
+            mock.patch.object(submit_challenge.xp_pipeline, "award", lambda *a: awards.append(a)):
+        burst("canonical, concurrent", [(f"user{i}", canonical) for i in range(USERS)])
+        burst("same users resubmit", [(f"user{i}", "  " + canonical.replace(" ", "  ")) for i in range(USERS)])
+        burst("distinct answers", [(f"user{i}", f"{canonical} /* {i % 10} */") for i in range(USERS)])
+    print("cache:", evaluation_cache.stats())
+
+
+if __name__ == "__main__":
+    main()
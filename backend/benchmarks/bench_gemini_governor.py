@@ -0,0 +1,101 @@
+# Load test: Gemini admission control under a mixed burst
+# Run from backend/: python -m benchmarks.bench_gemini_governor
+#
+# A heavy user fires a burst of separate bulk generation requests while other users
+# submit interactive grading requests and reports. Gemini is a stand-in
+# with a fixed latency. Without the governor every call goes upstream at
+# once (and would be met with 429s past the quota); with it, load is held
+# to the configured rate, interactive calls jump the queue, the heavy user
+# hits their quota and overflow is rejected quickly with Retry-After.
+# Then one long document is generated: a single request fanning out into
+# map calls, a reduce and repairs, which all count as one against the
+# user's quota.
+import time
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from services import gemini_governor as governor
+
+GEMINI_LATENCY = 0.3
+HEAVY_USER_CALLS = 60
+INTERACTIVE_USERS = 15
+REPORT_USERS = 5
+FAN_OUT_CALLS = 27   # ~1 MB document: 25 map chunks, the reduce, a repair
+
+governor.GEMINI_RATE_PER_SEC = 10
+governor._bucket = governor.TokenBucket(10, 5)
+governor.GEMINI_MAX_IN_FLIGHT = 8
+governor.GEMINI_USER_BURST = 20
+governor.GEMINI_QUEUE_MAX = 30
+governor.QUEUE_TIMEOUTS.update({governor.INTERACTIVE: 3, governor.STANDARD: 4, governor.BULK: 5})
+
+
+def main():
+    results = defaultdict(lambda: {"ok": 0, "rejected": defaultdict(int), "waits": []})
+    upstream_peak = [0, 0]
+    lock = threading.Lock()
+
+    def call(name, priority, user_id, delay):
+        time.sleep(delay)
+        start = time.perf_counter()
+        try:
+            with governor.request_context(priority, user_id), governor.admit():
+                waited = time.perf_counter() - start
+                with lock:
+                    upstream_peak[0] += 1
+                    upstream_peak[1] = max(upstream_peak)
+                time.sleep(GEMINI_LATENCY)
+                with lock:
+                    upstream_peak[0] -= 1
+        except governor.Rejected as e:
+            with lock:
+                results[name]["rejected"][f"{type(e).__name__} (retry {e.retry_after}s)"] += 1
+            return
+        with lock:
+            results[name]["ok"] += 1
+            results[name]["waits"].append(waited)
+
+    jobs = [("bulk (heavy user)", governor.BULK, "heavy", 0.0) for _ in range(HEAVY_USER_CALLS)]
+    jobs += [("interactive", governor.INTERACTIVE, f"learner{i}", 0.2 + i * 0.05) for i in range(INTERACTIVE_USERS)]
+    jobs += [("report", governor.STANDARD, f"reader{i}", 0.3 + i * 0.1) for i in range(REPORT_USERS)]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(jobs)) as pool:
+        list(pool.map(lambda job: call(*job), jobs))
+    elapsed = time.perf_counter() - start
+
+    print(f"{len(jobs)} calls in {elapsed:.1f}s, peak upstream concurrency {upstream_peak[1]}")
+    for name, r in results.items():
+        waits = sorted(r["waits"]) or [0]
+        print(
+            f"{name:<18} admitted {r['ok']:3d}  wait avg {sum(waits) / len(waits):5.2f}s "
+            f"max {waits[-1]:5.2f}s  rejected {dict(r['rejected']) or 0}"
+        )
+    print("metrics:", governor.metrics()["classes"])
+
+
+def fan_out():
+    outcomes = defaultdict(int)
+    lock = threading.Lock()
+
+    def gemini_call(_):
+        try:
+            with governor.admit():
+                time.sleep(GEMINI_LATENCY)
+            outcome = "admitted"
+        except governor.Rejected as e:
+            outcome = type(e).__name__
+        with lock:
+            outcomes[outcome] += 1
+
+    start = time.perf_counter()
+    with governor.request_context(governor.BULK, "writer"):
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            list(pool.map(governor.bind(gemini_call), range(FAN_OUT_CALLS)))
+    print(f"one request, {FAN_OUT_CALLS} fan-out calls in {time.perf_counter() - start:.1f}s: {dict(outcomes)}")
+
+
+if __name__ == "__main__":
+    main()
+    print()
+    fan_out()
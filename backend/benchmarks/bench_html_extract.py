@@ -0,0 +1,71 @@
+# Benchmark: streaming extractor vs. full BeautifulSoup parse on large pages
+# Run from backend/: python -m benchmarks.bench_html_extract
+import time
+import tracemalloc
+from bs4 import BeautifulSoup
+from services.html_extract import extract_text_from_response, CHUNK_SIZE
+
+
+class FakeResponse:
+    def __init__(self, body: bytes):
+        self.body = body
+        self.headers = {"Content-Type": "text/html; charset=utf-8"}
+        self.encoding = "utf-8"
+
+    @property
+    def text(self):
+        return self.body.decode(self.encoding)
+
+    def iter_content(self, chunk_size=CHUNK_SIZE):
+        for i in range(0, len(self.body), chunk_size):
+            yield self.body[i:i + chunk_size]
+
+
+def build_page(target_bytes: int) -> bytes:
+    block = (
+        "<div class='section'><h2>Heading</h2>"
+        "<p>Some documentation paragraph explaining an API in detail.</p>"
+        "<script>var x = 1; console.log(x);</script>"
+        "<style>.a { color: red; }</style>"
+        "<pre><code>def f(x):\n    return x * 2</code></pre></div>\n"
+    )
+    repeats = target_bytes // len(block) + 1
+    return ("<html><body>" + block * repeats + "</body></html>").encode("utf-8")
+
+
+def legacy_extract(resp) -> str:
+    soup = BeautifulSoup(resp.text, "html.parser")
+    for tag in soup(["script", "style", "noscript"]):
+        tag.decompose()
+    return " ".join(soup.stripped_strings)[:1000000]
+
+
+def measure(fn, body):
+    start = time.perf_counter()
+    text = fn(FakeResponse(body))
+    elapsed = time.perf_counter() - start
+
+    # Separate pass: tracemalloc slows the parsers down considerably
+    tracemalloc.start()
+    fn(FakeResponse(body))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, len(text)
+
+
+def main():
+    for size_mb in (1, 4, 16):
+        body = build_page(size_mb * 1024 * 1024)
+        for name, fn in (
+            ("beautifulsoup", legacy_extract),
+            ("streaming", lambda r: extract_text_from_response(r, max_bytes=len(body))),
+        ):
+            elapsed, peak, chars = measure(fn, body)
+            print(
+                f"{size_mb:>3} MB  {name:<14} {elapsed * 1000:9.1f} ms  "
+                f"peak {peak / 1024 / 1024:8.1f} MB  {chars} chars"
+            )
+
+
+if __name__ == "__main__":
+    main()
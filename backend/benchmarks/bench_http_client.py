@@ -0,0 +1,62 @@
+# Benchmark: per-call requests.get vs. the shared pooled client against a local server
+# Run from backend/: python -m benchmarks.bench_http_client
+#
+# The stand-in server is plain HTTP, so the savings shown are TCP setup
+# only; against TLS endpoints such as Gemini the handshake cost is larger.
+import time
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import requests
+from services import http_client
+
+REQUESTS = 500
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Avoid Nagle/delayed-ACK stalls on the kept-alive connection
+    disable_nagle_algorithm = True
+    connections = 0
+    lock = threading.Lock()
+
+    def setup(self):
+        super().setup()
+        with Handler.lock:
+            Handler.connections += 1
+
+    def do_GET(self):
+        body = b'{"ok": true}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def run(name, fn, url):
+    Handler.connections = 0
+    start = time.perf_counter()
+    for _ in range(REQUESTS):
+        fn(url).raise_for_status()
+    elapsed = time.perf_counter() - start
+    print(
+        f"{name:<14} {REQUESTS} requests  {elapsed * 1000:8.1f} ms  "
+        f"{elapsed / REQUESTS * 1000:6.3f} ms/req  {Handler.connections} connections"
+    )
+
+
+def main():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/ping"
+
+    run("requests.get", lambda u: requests.get(u, timeout=10), url)
+    run("http_client", http_client.get, url)
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+# Benchmark: parsing model replies, and the cost of recovering from a bad one
+# Run from backend/ with the usual .env: python -m benchmarks.bench_llm_response
+#
+# 1) Reply shapes seen from Gemini, parsed with the old greedy
+#    r"\{.*\}" extraction and with llm_response.parse_json.
+# 2) A generation whose flashcards come back malformed: regenerating the
+#    whole reply vs. the targeted repair of just that field. Gemini is a
+#    stand-in that charges a fixed latency per output character.
+import re
+import json
+import time
+from routes import generated_all
+from services import llm_response
+
+OUTPUT_SECONDS_PER_CHAR = 2e-5
+PARSE_ROUNDS = 2000
+
+GRADE = {"success": True, "feedback": "Use `{}` for the dict literal.", "xp": 7}
+BRACES = {**GRADE, "feedback": "Close the } before { the next block"}
+# name -> (reply, the value a correct parse returns)
+REPLIES = {
+    "clean JSON": (json.dumps(GRADE), GRADE),
+    "code fence": ("```json\n" + json.dumps(GRADE, indent=2) + "\n```", GRADE),
+    "prose around": ("Here is my evaluation:\n" + json.dumps(GRADE) + "\nLet me know if {anything} is unclear.", GRADE),
+    "two objects": (json.dumps(GRADE) + "\n\nAlternative: " + json.dumps({**GRADE, "xp": 3}), GRADE),
+    "braces in strings": ("Result: " + json.dumps(BRACES), BRACES),
+    "truncated": (json.dumps(GRADE)[:-10], None),
+}
+
+
+def old_extract(text):
+    try:
+        match = re.search(r"\{.*\}", text, re.DOTALL)
+        if match:
+            return json.loads(match.group())
+    except Exception:
+        pass
+    return None
+
+
+def parsing():
+    print(f"{'reply':<18} {'old regex':>10} {'parse_json':>11} {'old us':>8} {'new us':>8}")
+    for name, (text, expected) in REPLIES.items():
+        timings = []
+        for parse in (old_extract, llm_response.parse_json):
+            start = time.perf_counter()
+            for _ in range(PARSE_ROUNDS):
+                result = parse(text)
+            timings.append((result == expected, (time.perf_counter() - start) / PARSE_ROUNDS * 1e6))
+        (old_ok, old_us), (new_ok, new_us) = timings
+        print(f"{name:<18} {'ok' if old_ok else 'FAIL':>10} {'ok' if new_ok else 'FAIL':>11} {old_us:8.1f} {new_us:8.1f}")
+
+
+class FakeGemini:
+    """The first full reply has broken flashcards; everything after it is fine."""
+    def __init__(self):
+        self.calls = 0
+        self.output_chars = 0
+
+    def generate_text(self, prompt, schema=None, timeout=30):
+        sections = {
+            "story": "Once upon a time. " * 200,
+            "steps": ["Install it", "Configure it", "Run it"],
+            "challenges": "Challenge 1: Do it\nChallenge Ended",
+            "flashcards": [{"question": "Q", "answer": "A"}],
+        }
+        if "Your previous reply had problems" in prompt:
+            reply = json.dumps({field: sections[field] for field in schema["properties"]})
+        elif self.calls == 0:
+            reply = json.dumps({**sections, "flashcards": "[{question: Q}"})
+        else:
+            reply = json.dumps(sections)
+        self.calls += 1
+        self.output_chars += len(reply)
+        time.sleep(len(reply) * OUTPUT_SECONDS_PER_CHAR)
+        return reply
+
+
+def recovery():
+    doc = "Flexbox lays out items along a main axis. " * 200
+    prompt = generated_all.build_json_prompt(doc, generated_all.SINGLE)
+    original = llm_response.generate_text
+
+    for name, attempts in (("full regeneration", 0), ("targeted repair", 1)):
+        gemini = FakeGemini()
+        llm_response.generate_text = gemini.generate_text
+        llm_response.LLM_REPAIR_ATTEMPTS = attempts
+        start = time.perf_counter()
+        data, errors = llm_response.generate_json(prompt, generated_all.SECTIONS_SCHEMA)
+        if errors:
+            # What the old code had to do: throw the reply away and ask again
+            data, errors = llm_response.generate_json(prompt, generated_all.SECTIONS_SCHEMA)
+        elapsed = time.perf_counter() - start
+        print(
+            f"{name:<18} gemini calls {gemini.calls}  output chars {gemini.output_chars:6,}  "
+            f"{elapsed * 1000:6.0f} ms  flashcards {'ok' if 'flashcards' in data else 'missing'}"
+        )
+    llm_response.generate_text = original
+
+
+def main():
+    parsing()
+    print()
+    recovery()
+    print("stats:", llm_response.stats())
+
+
+if __name__ == "__main__":
+    main()
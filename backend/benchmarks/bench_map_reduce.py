@@ -0,0 +1,49 @@
+# Benchmark: generate_all latency vs. document size, single-prompt vs. map-reduce
+# Run from backend/ with the usual .env: python -m benchmarks.bench_map_reduce
+#
+# Gemini is replaced by a stand-in whose latency grows with prompt size
+# (fixed overhead + per-input-char cost + per-output-char cost), so the
+# numbers show the shape of the curve rather than real API timings.
+import json
+import time
+from routes import generated_all
+from services import generation_cache, llm_response
+
+BASE_SECONDS = 0.05
+INPUT_SECONDS_PER_CHAR = 1e-6
+OUTPUT_SECONDS_PER_CHAR = 2e-5
+
+SECTIONS_REPLY = json.dumps({
+    "story": "Once upon a time. " * 200,
+    "steps": ["First", "Second"],
+    "challenges": "Challenge 1: Do it\nChallenge Ended",
+    "flashcards": [{"question": "Q", "answer": "A"}],
+})
+NOTES_REPLY = "Key concept notes. " * 150
+
+
+def fake_generate_text(prompt, schema=None, timeout=30):
+    reply = NOTES_REPLY if "This is part" in prompt else SECTIONS_REPLY
+    time.sleep(BASE_SECONDS + len(prompt) * INPUT_SECONDS_PER_CHAR + len(reply) * OUTPUT_SECONDS_PER_CHAR)
+    return reply
+
+
+def build_doc(chars: int) -> str:
+    paragraph = "## Section\n" + "This explains an important API option in detail. " * 40 + "\n\n"
+    return (paragraph * (chars // len(paragraph) + 1))[:chars]
+
+
+def main():
+    llm_response.generate_text = fake_generate_text
+    for size in (50_000, 200_000, 500_000, 1_000_000):
+        doc = build_doc(size)
+        for mode in (generated_all.SINGLE, generated_all.MAP_REDUCE):
+            generation_cache.clear()
+            start = time.perf_counter()
+            generated_all.generate_sections(doc, mode)
+            elapsed = time.perf_counter() - start
+            print(f"{size:>9} chars  {mode:<11} {elapsed:6.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# Benchmark: rendering a ~100-page report PDF, old BytesIO/textwrap renderer vs. the new one
+# Run from backend/: python -m benchmarks.bench_pdf_report
+#
+# "peak MB" is the tracemalloc peak while rendering (timing runs are
+# separate, without tracemalloc); "cached" is a repeat download served
+# from the PDF cache.
+import os
+import re
+import time
+import shutil
+import tempfile
+import textwrap
+import tracemalloc
+from io import BytesIO
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+
+BENCH_CACHE_DIR = tempfile.mkdtemp(prefix="pdf-bench-")
+os.environ["PDF_CACHE_DIR"] = BENCH_CACHE_DIR
+
+from services import pdf_report  # noqa: E402  (reads PDF_CACHE_DIR at import)
+
+SECTION = """
+## {n}) Section {n}
+Solid grasp of **flexbox** and grid layout. Explanations are clear, with good use of examples, though some answers skip edge cases like empty input or very long content that overflows its container.
+
+- Uses `justify-content` and `align-items` correctly in most submissions
+- Occasionally confuses the main and cross axis when flex-direction is column
+  - Nested point about wrapping behaviour and min-width: auto on flex items
+1. Practise responsive layouts with media queries
+2. Review accessibility of custom components
+"""
+
+
+def make_report(pages):
+    # ~5 sections per page
+    return "# User Progress Report\n" + "".join(SECTION.format(n=i) for i in range(pages * 5))
+
+
+def legacy_render(report_text):
+    buffer = BytesIO()
+    c = canvas.Canvas(buffer, pagesize=A4)
+    width, height = A4
+    margin = 40
+    y = height - margin
+    font_size = 12
+    line_height = font_size + 4
+    c.setFont("Helvetica", font_size)
+    for line in report_text.split("\n"):
+        for wrapped_line in textwrap.wrap(line, width=95):
+            if y <= margin:
+                c.showPage()
+                c.setFont("Helvetica", font_size)
+                y = height - margin
+            c.drawString(margin, y, wrapped_line)
+            y -= line_height
+    c.save()
+    buffer.seek(0)
+    return buffer
+
+
+def new_render(report_text):
+    spool = tempfile.SpooledTemporaryFile(max_size=pdf_report.PDF_SPOOL_MAX_BYTES)
+    pdf_report.render(report_text, spool)
+    return spool
+
+
+def measure(fn, report_text):
+    start_cpu, start = time.process_time(), time.perf_counter()
+    result = fn(report_text)
+    cpu, wall = time.process_time() - start_cpu, time.perf_counter() - start
+    tracemalloc.start()
+    fn(report_text)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, cpu, wall, peak
+
+
+def page_count(fileobj):
+    fileobj.seek(0)
+    return len(re.findall(rb"/Type /Page\b", fileobj.read()))
+
+
+def main():
+    report_text = make_report(100)
+    try:
+        rows = [
+            ("legacy", *measure(legacy_render, report_text)),
+            ("new", *measure(new_render, report_text)),
+        ]
+        pdf_report.get_pdf(report_text)
+        rows.append(("cached", *measure(lambda text: open(pdf_report.get_pdf(text)[0], "rb"), report_text)))
+        print(f"{'renderer':<8} {'pages':>5} {'cpu ms':>8} {'wall ms':>8} {'peak MB':>8}")
+        for name, result, cpu, wall, peak in rows:
+            print(f"{name:<8} {page_count(result):>5} {cpu * 1000:8.1f} {wall * 1000:8.1f} {peak / 1e6:8.2f}")
+            result.close()
+    finally:
+        shutil.rmtree(BENCH_CACHE_DIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# Benchmark: awarding XP over the HTTP loopback vs. calling the progress service directly
+# Run from backend/ with the usual .env: python -m benchmarks.bench_progress_loopback
+#
+# Appwrite is replaced by an in-memory stand-in with a fixed per-call
+# latency. "worker time" is the time request workers spent serving
+# /api/update_progress, i.e. the capacity the loopback takes away from
+# real user requests.
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.serving import make_server
+import requests
+from app import app
+from services import progress_service
+
+APPWRITE_LATENCY = 0.005
+AWARDS = 200
+CONCURRENCY = 8
+
+
+class FakeDatabases:
+    def __init__(self):
+        self.docs = {}
+        self.lock = threading.Lock()
+
+    def get_document(self, database_id, collection_id, document_id):
+        time.sleep(APPWRITE_LATENCY)
+        with self.lock:
+            if document_id not in self.docs:
+                raise Exception("Document not found")
+            return dict(self.docs[document_id])
+
+    def create_document(self, database_id, collection_id, document_id, data, permissions=None):
+        time.sleep(APPWRITE_LATENCY)
+        with self.lock:
+            self.docs[document_id] = dict(data)
+            return dict(data)
+
+    def update_document(self, database_id, collection_id, document_id, data):
+        time.sleep(APPWRITE_LATENCY)
+        with self.lock:
+            self.docs[document_id].update(data)
+            return dict(self.docs[document_id])
+
+
+class WorkerTimer:
+    """WSGI middleware summing the time spent inside requests."""
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+        self.busy = 0.0
+        self.lock = threading.Lock()
+
+    def __call__(self, environ, start_response):
+        start = time.perf_counter()
+        try:
+            return list(self.wsgi_app(environ, start_response))
+        finally:
+            with self.lock:
+                self.busy += time.perf_counter() - start
+
+
+def run(award):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=CONCURRENCY) as pool:
+        list(pool.map(award, (f"user{i % 20}" for i in range(AWARDS))))
+    return time.perf_counter() - start
+
+
+def main():
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    progress_service.db = FakeDatabases()
+    timer = WorkerTimer(app.wsgi_app)
+    app.wsgi_app = timer
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/api/update_progress"
+    session = requests.Session()
+
+    def via_loopback(user_id):
+        session.post(url, json={"user_id": user_id, "xp_earned": 1}, timeout=10).raise_for_status()
+
+    def direct(user_id):
+        progress_service.update_progress(user_id, 1)
+
+    for name, award in (("loopback", via_loopback), ("direct", direct)):
+        timer.busy = 0.0
+        elapsed = run(award)
+        print(
+            f"{name:<9} {AWARDS} awards  {elapsed * 1000:8.1f} ms total  "
+            f"{elapsed / AWARDS * CONCURRENCY * 1000:6.2f} ms/award  "
+            f"worker time {timer.busy * 1000:8.1f} ms"
+        )
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
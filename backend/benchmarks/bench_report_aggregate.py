@@ -0,0 +1,76 @@
+# Benchmark: report prompt size with raw vs. aggregated submissions, and cached reports
+# Run from backend/ with the usual .env: python -m benchmarks.bench_report_aggregate
+#
+# Gemini is replaced by a stand-in with a fixed latency; its response is a
+# canned report JSON. Prompt tokens are estimated at ~4 chars per token.
+import json
+import time
+from unittest import mock
+from app import app
+from routes import report_routes
+from services import generation_cache, llm_response
+from services.report_aggregate import aggregate_submissions, estimate_tokens
+
+GEMINI_LATENCY = 2.0
+HISTORY_SIZES = [10, 100, 1000]
+SOLUTION = "function solve(items) {\n  return items.filter(Boolean).map((x) => x * 2);\n}\n" * 15
+
+
+def make_submissions(n):
+    return [
+        {
+            "$id": f"sub{i:05d}",
+            "$createdAt": f"2026-{1 + i % 12:02d}-{1 + i % 28:02d}T10:00:00.000+00:00",
+            "$updatedAt": f"2026-{1 + i % 12:02d}-{1 + i % 28:02d}T10:00:00.000+00:00",
+            "$permissions": [],
+            "$databaseId": "db",
+            "$collectionId": "subs",
+            "user_id": "u1",
+            "doc_id": f"doc{i % 25:03d}",
+            "user_solution": SOLUTION,
+            "feedback": "Correct approach, but consider edge cases such as empty input. " * 3,
+            "xp_awarded": (i * 7) % 11,
+        }
+        for i in range(n)
+    ]
+
+
+class FakeResponse:
+    status_code = 200
+    text = ""
+
+    def json(self):
+        report = {k: "Solid progress." for k in (
+            "technical_knowledge", "communication_skills", "strengths",
+            "areas_of_improvement", "overall_analysis")}
+        return {"candidates": [{"content": {"parts": [{"text": json.dumps(report)}]}}]}
+
+
+def fake_post(url, **kwargs):
+    time.sleep(GEMINI_LATENCY)
+    return FakeResponse()
+
+
+def main():
+    client = app.test_client()
+    print(f"{'history':>8} {'raw tokens':>11} {'aggregated':>11} {'miss ms':>9} {'hit ms':>8}")
+    for n in HISTORY_SIZES:
+        submissions = make_submissions(n)
+        raw_tokens = estimate_tokens(json.dumps(submissions))
+        aggregated_tokens = estimate_tokens(json.dumps(aggregate_submissions(submissions)))
+
+        generation_cache.clear()
+        with mock.patch.object(report_routes, "iter_documents", lambda *a, **k: iter(submissions)), \
+                mock.patch.object(report_routes.databases, "get_document", return_value={"xp": 120, "streak": 4}), \
+                mock.patch.object(llm_response.http_client, "post", fake_post):
+            timings = []
+            for _ in range(2):
+                start = time.perf_counter()
+                resp = client.post("/api/generate_report", json={"user_id": "u1"})
+                timings.append(time.perf_counter() - start)
+                assert resp.status_code == 200, resp.json
+        print(f"{n:>8} {raw_tokens:>11,} {aggregated_tokens:>11,} {timings[0] * 1000:9.1f} {timings[1] * 1000:8.1f}")
+
+
+if __name__ == "__main__":
+    main()
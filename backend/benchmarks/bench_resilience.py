@@ -0,0 +1,102 @@
+# Benchmark: circuit breaker, latency budget and hedging against the fault server
+# Run from backend/: python -m benchmarks.bench_resilience
+#
+# Scenarios, each compared with plain session calls (no resilience layer):
+#   outage  - the dependency hangs; callers time out one after another
+#   budget  - one request makes several calls to a slow dependency
+#   tail    - a few percent of responses are slow; reads are hedged
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from services import http_client, resilience
+from benchmarks import fault_server
+
+OUTAGE_CALLS = 12
+OUTAGE_TIMEOUT = (0.3, 0.3)
+TAIL_CALLS = 300
+TAIL_CONCURRENCY = 4
+
+resilience.CB_OPEN_SECONDS = 1
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+def timed(fn):
+    start = time.perf_counter()
+    try:
+        fn()
+        return time.perf_counter() - start, None
+    except requests.exceptions.RequestException as e:
+        return time.perf_counter() - start, type(e).__name__
+
+
+def outage(url):
+    print("outage: dependency hangs, timeout 0.3s (GETs are retried twice by the adapter)")
+    fault_server.set_faults(delay=2)
+    for name, get in [
+        ("plain session", lambda: http_client.session.get(url, timeout=OUTAGE_TIMEOUT)),
+        ("with breaker", lambda: http_client.get(url, timeout=OUTAGE_TIMEOUT)),
+    ]:
+        errors = {}
+        start = time.perf_counter()
+        for _ in range(OUTAGE_CALLS):
+            _, error = timed(get)
+            errors[error] = errors.get(error, 0) + 1
+        print(f"  {name:<14} {OUTAGE_CALLS} calls in {time.perf_counter() - start:5.2f}s  {errors}")
+
+    fault_server.set_faults()
+    time.sleep(resilience.CB_OPEN_SECONDS)
+    elapsed, error = timed(lambda: http_client.get(url))
+    state = resilience.stats()["dependencies"]
+    print(f"  recovery probe after cool-down: {error or 'ok'} in {elapsed:.2f}s, breaker {[d['state'] for d in state.values()]}")
+
+
+def budget(url):
+    print("budget: one request makes 5 calls to a dependency taking 0.8s each, budget 2s")
+    fault_server.set_faults(delay=0.8)
+
+    def five_calls(get):
+        for _ in range(5):
+            get(url).raise_for_status()
+
+    elapsed, error = timed(lambda: five_calls(lambda u: http_client.session.get(u, timeout=5)))
+    print(f"  {'no budget':<14} {elapsed:5.2f}s  {error or 'ok'}")
+    with resilience.budget(2):
+        elapsed, error = timed(lambda: five_calls(http_client.get))
+    print(f"  {'2s budget':<14} {elapsed:5.2f}s  {error or 'ok'}")
+    fault_server.set_faults()
+
+
+def tail(url):
+    print(f"tail: 3% of responses take 1s, the rest 20ms; {TAIL_CALLS} reads, {TAIL_CONCURRENCY} at a time")
+    fault_server.set_faults(delay=0.02, slow_rate=0.03, slow_delay=1.0)
+    for name, get in [
+        ("not hedged", lambda: http_client.get(url)),
+        ("hedged", lambda: http_client.get(url, hedge=True)),
+    ]:
+        before = fault_server.request_count()
+        with ThreadPoolExecutor(max_workers=TAIL_CONCURRENCY) as pool:
+            latencies = [t for t, _ in pool.map(lambda _: timed(get), range(TAIL_CALLS))]
+        sent = fault_server.request_count() - before
+        print(
+            f"  {name:<14} p50 {percentile(latencies, 0.5) * 1000:6.0f} ms  p95 {percentile(latencies, 0.95) * 1000:6.0f} ms  "
+            f"p99 {percentile(latencies, 0.99) * 1000:6.0f} ms  upstream requests {sent}"
+        )
+    print("  hedging:", resilience.stats()["hedging"])
+    fault_server.set_faults()
+
+
+def main():
+    server = fault_server.start()
+    url = f"http://127.0.0.1:{server.server_port}/page"
+    for scenario in (outage, budget, tail):
+        resilience._breakers.clear()   # each scenario starts with a fresh breaker
+        scenario(url)
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
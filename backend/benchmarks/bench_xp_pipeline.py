@@ -0,0 +1,124 @@
+# Load test: concurrent XP awards for the same users, direct vs. the coalescing pipeline
+# Run from backend/ with the usual .env: python -m benchmarks.bench_xp_pipeline
+#
+# Appwrite is replaced by a stand-in that keeps each progress document in a
+# JSON file (so every worker process sees the same data), with a fixed
+# per-call latency and no locking, like a plain get/update against Appwrite.
+# Several processes x threads award 1 XP each; "lost" is the number of
+# awards missing from the final XP totals.
+import os
+import json
+import time
+import shutil
+import tempfile
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+from services import progress_service, xp_pipeline, leaderboard_store, activity_log
+
+APPWRITE_LATENCY = 0.005
+PROCESSES = 4
+THREADS = 8
+AWARDS_PER_PROCESS = 200
+USERS = 5
+
+
+class FileDatabases:
+    def __init__(self, root):
+        self.root = root
+
+    def _path(self, document_id):
+        return os.path.join(self.root, document_id + ".json")
+
+    def _count_write(self):
+        with open(os.path.join(self.root, "writes.log"), "a") as f:
+            f.write("w\n")
+
+    def _save(self, document_id, doc):
+        tmp = f"{self._path(document_id)}.{os.getpid()}.{id(doc)}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(doc, f)
+        os.replace(tmp, self._path(document_id))
+
+    def get_document(self, database_id, collection_id, document_id):
+        time.sleep(APPWRITE_LATENCY)
+        try:
+            with open(self._path(document_id)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise Exception("Document not found")
+
+    def create_document(self, database_id, collection_id, document_id, data, permissions=None):
+        time.sleep(APPWRITE_LATENCY)
+        self._save(document_id, dict(data))
+        self._count_write()
+        return dict(data)
+
+    def update_document(self, database_id, collection_id, document_id, data):
+        time.sleep(APPWRITE_LATENCY)
+        with open(self._path(document_id)) as f:
+            doc = json.load(f)
+        doc.update(data)
+        self._save(document_id, doc)
+        self._count_write()
+        return doc
+
+
+def worker(mode):
+    def direct(i):
+        progress_service.update_progress(f"user{i % USERS}", 1, "load test")
+
+    def pipeline(i):
+        return xp_pipeline.award(f"user{i % USERS}", 1, "load test")
+
+    with ThreadPoolExecutor(max_workers=THREADS) as pool:
+        results = list(pool.map(direct if mode == "direct" else pipeline, range(AWARDS_PER_PROCESS)))
+    if mode == "pipeline":
+        for future in results:
+            future.result(timeout=60)
+
+
+def run(mode, root):
+    for name in os.listdir(root):
+        os.remove(os.path.join(root, name))
+    # Create the documents up front; creation itself isn't what's measured
+    for u in range(USERS):
+        progress_service.db.create_document(None, None, f"user{u}", {"userId": f"user{u}", "xp": 0, "streak": 0, "badges": "", "activities": []})
+    os.remove(os.path.join(root, "writes.log"))
+
+    ctx = multiprocessing.get_context("fork")
+    start = time.perf_counter()
+    procs = [ctx.Process(target=worker, args=(mode,)) for _ in range(PROCESSES)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    elapsed = time.perf_counter() - start
+
+    total_xp = sum(progress_service.db.get_document(None, None, f"user{u}")["xp"] for u in range(USERS))
+    with open(os.path.join(root, "writes.log")) as f:
+        writes = len(f.readlines())
+    expected = PROCESSES * AWARDS_PER_PROCESS
+    print(
+        f"{mode:<9} {expected} awards  {elapsed * 1000:8.1f} ms  "
+        f"xp {total_xp:5d}  lost {expected - total_xp:5d}  appwrite writes {writes:5d}"
+    )
+
+
+def main():
+    root = tempfile.mkdtemp(prefix="xp-bench-")
+    lock_dir = tempfile.mkdtemp(prefix="xp-bench-locks-")
+    progress_service.db = FileDatabases(root)
+    leaderboard_store.record_progress = lambda *args, **kwargs: None
+    activity_log.append = lambda *args, **kwargs: None
+    xp_pipeline.XP_LOCK_DIR = lock_dir
+    xp_pipeline.XP_JOURNAL_PATH = os.path.join(lock_dir, "xp_awards.db")
+    try:
+        for mode in ("direct", "pipeline"):
+            run(mode, root)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+        shutil.rmtree(lock_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
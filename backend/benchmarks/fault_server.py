@@ -0,0 +1,120 @@
+# Local fault-injecting stand-in for an outbound dependency
+#
+# Answers every request with a small JSON body after applying the current
+# fault profile: a fixed delay, a share of slow responses, a share of
+# errors, or dropped connections. The profile can be changed between
+# scenarios with set_faults() (in-process) or POST /_faults (JSON body),
+# and any field can be overridden per request in the query string, e.g.
+# /page?delay=2&error_rate=0.5.
+#
+# Standalone: python -m benchmarks.fault_server --port 8099
+import json
+import time
+import random
+import argparse
+import threading
+from urllib.parse import urlsplit, parse_qsl
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+DEFAULT_FAULTS = {
+    "delay": 0.0,         # seconds before every response
+    "slow_rate": 0.0,     # share of responses delayed by slow_delay instead
+    "slow_delay": 1.0,
+    "error_rate": 0.0,    # share of responses answered with error_status
+    "error_status": 503,
+    "drop_rate": 0.0,     # share of connections closed without a response
+}
+
+_lock = threading.Lock()
+_faults = dict(DEFAULT_FAULTS)
+_counts = {"requests": 0}
+
+
+def set_faults(**faults):
+    with _lock:
+        _faults.clear()
+        _faults.update(DEFAULT_FAULTS, **faults)
+
+
+def request_count() -> int:
+    with _lock:
+        return _counts["requests"]
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def _faults_for_request(self):
+        with _lock:
+            _counts["requests"] += 1
+            faults = dict(_faults)
+        for key, value in parse_qsl(urlsplit(self.path).query):
+            if key in faults:
+                faults[key] = float(value)
+        return faults
+
+    def _respond(self, status, body: bytes):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _serve(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+
+        faults = self._faults_for_request()
+        if random.random() < faults["drop_rate"]:
+            self.close_connection = True
+            return
+        slow = random.random() < faults["slow_rate"]
+        time.sleep(faults["slow_delay"] if slow else faults["delay"])
+        if random.random() < faults["error_rate"]:
+            self._respond(int(faults["error_status"]), b'{"error": "injected"}')
+        else:
+            self._respond(200, b'{"ok": true}')
+
+    def do_GET(self):
+        self._serve()
+
+    def do_POST(self):
+        if urlsplit(self.path).path == "/_faults":
+            length = int(self.headers.get("Content-Length") or 0)
+            set_faults(**json.loads(self.rfile.read(length) or b"{}"))
+            with _lock:
+                body = json.dumps(_faults).encode()
+            self._respond(200, body)
+            return
+        self._serve()
+
+    def log_message(self, *args):
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        pass   # clients hanging up on a delayed response is the point
+
+
+def start(port=0) -> ThreadingHTTPServer:
+    """Starts the server on a background thread; returns it (see .server_port)."""
+    server = _Server(("127.0.0.1", port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8099)
+    args = parser.parse_args()
+    server = start(args.port)
+    print(f"Fault server on http://127.0.0.1:{server.server_port} (POST /_faults to change faults)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -1,7 +1,10 @@
 from flask import Blueprint, request, jsonify
 from appwrite.exception import AppwriteException
 from services.appwrite_client import users, databases, storage
+from services import leaderboard_store, jobs, xp_pipeline, activity_log
+from services.collection_iter import iter_documents
 from appwrite.query import Query
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import os
 
 delete_account_bp = Blueprint("delete_account", __name__)
@@ -14,6 +17,134 @@ TIPS_COLLECTION_ID = os.getenv("APPWRITE_TIPS_COLLECTION_ID")
 AVATARS_BUCKET_ID = os.getenv("APPWRITE_BUCKET_ID")
 FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:3000")
 
+ACCOUNT_DELETE_WORKERS = int(os.getenv("ACCOUNT_DELETE_WORKERS", "8"))
+PROGRESS_EVERY = 25
+
+# (progress key, collection, owner attribute), deleted in this order
+DEPENDENT_COLLECTIONS = [
+    ("docs", DOCS_COLLECTION_ID, "createdBy"),
+    ("submissions", SUBMISSIONS_COLLECTION_ID, "user_id"),
+    ("tips", TIPS_COLLECTION_ID, "user_id"),
+]
+if activity_log.ACTIVITIES_COLLECTION_ID:
+    DEPENDENT_COLLECTIONS.append(("activities", activity_log.ACTIVITIES_COLLECTION_ID, "userId"))
+
+
+def _is_not_found(e: AppwriteException) -> bool:
+    return getattr(e, "code", None) == 404 or "not found" in str(e).lower()
+
+
+def _delete_document(collection_id: str, document_id: str):
+    try:
+        databases.delete_document(
+            database_id=DATABASE_ID,
+            collection_id=collection_id,
+            document_id=document_id,
+        )
+    except AppwriteException as e:
+        # Already gone, e.g. deleted before a crash and the job was resumed
+        if not _is_not_found(e):
+            raise
+
+
+def _delete_avatar(user_id: str):
+    try:
+        user_info = users.get(user_id)
+        avatar_file_id = user_info.get("prefs", {}).get("avatar")
+        if avatar_file_id:
+            storage.delete_file(AVATARS_BUCKET_ID, avatar_file_id)
+    except AppwriteException as e:
+        print(f"Failed to delete avatar: {str(e)}")
+
+
+def _delete_collection(job_id: str, progress: dict, name: str, collection_id: str, owner_field: str, user_id: str):
+    step = progress.setdefault(name, {"deleted": 0, "failed": 0, "remaining": None, "done": False})
+    if step["done"]:
+        return
+
+    # Ids are collected before deleting, since deleting under a cursor can
+    # drop the cursor document mid-iteration
+    doc_ids = [
+        doc["$id"]
+        for doc in iter_documents(collection_id, [Query.equal(owner_field, user_id)], select=["$id"])
+    ]
+    step["remaining"] = len(doc_ids)
+    step["failed"] = 0
+    jobs.set_progress(job_id, progress)
+
+    with ThreadPoolExecutor(max_workers=ACCOUNT_DELETE_WORKERS) as pool:
+        futures = [pool.submit(_delete_document, collection_id, doc_id) for doc_id in doc_ids]
+        for i, future in enumerate(as_completed(futures), 1):
+            try:
+                future.result()
+                step["deleted"] += 1
+            except Exception as e:
+                step["failed"] += 1
+                print(f"Failed to delete from {name}: {str(e)}")
+            step["remaining"] -= 1
+            if i % PROGRESS_EVERY == 0:
+                jobs.set_progress(job_id, progress)
+
+    step["done"] = step["failed"] == 0
+    jobs.set_progress(job_id, progress)
+
+
+def run_delete_account_job(job_id, payload):
+    """
+    Deletes everything a user owns, then the user. Progress is saved per
+    step, so a job resumed after a crash skips the steps already finished
+    and only re-enumerates what is left.
+    """
+    user_id = payload["userId"]
+    job = jobs.get(job_id)
+    progress = (job and job["progress"]) or {}
+
+    if not progress.get("avatar", {}).get("done"):
+        _delete_avatar(user_id)
+        progress["avatar"] = {"done": True}
+        jobs.set_progress(job_id, progress)
+
+    if not progress.get("xp_awards", {}).get("done"):
+        # Queued awards would otherwise recreate the progress doc, activities
+        # and leaderboard row after they are deleted
+        dropped = xp_pipeline.discard(user_id)
+        progress["xp_awards"] = {"done": True, "discarded": dropped}
+        jobs.set_progress(job_id, progress)
+
+    for name, collection_id, owner_field in DEPENDENT_COLLECTIONS:
+        _delete_collection(job_id, progress, name, collection_id, owner_field, user_id)
+
+    incomplete = [name for name, _, _ in DEPENDENT_COLLECTIONS if not progress[name]["done"]]
+    if incomplete:
+        # Keep the user so the account can be deleted again once the
+        # remaining data is gone
+        raise Exception(f"Failed to delete all user {', '.join(incomplete)}; user not deleted")
+
+    if not progress.get("progress", {}).get("done"):
+        _delete_document(USER_PROGRESS_COLLECTION_ID, user_id)
+        try:
+            leaderboard_store.remove(user_id)
+        except Exception as e:
+            print(f"Failed to remove user from leaderboard: {str(e)}")
+        progress["progress"] = {"done": True}
+        jobs.set_progress(job_id, progress)
+
+    try:
+        users.delete(user_id)
+    except AppwriteException as e:
+        if not _is_not_found(e):
+            raise
+    progress["user"] = {"done": True}
+    jobs.set_progress(job_id, progress)
+
+    return {
+        "userId": user_id,
+        "deleted": {name: progress[name]["deleted"] for name, _, _ in DEPENDENT_COLLECTIONS},
+    }
+
+
+jobs.register_handler("delete_account", run_delete_account_job)
+
 
 @delete_account_bp.route("/delete-account", methods=["POST", "OPTIONS"])
 def delete_account():
@@ -35,93 +166,27 @@ def delete_account():
         if not user_id:
             return jsonify({"error": "userId is required"}), 400
 
-        # 1) Delete avatar file if exists
-        try:
-            user_info = users.get(user_id)
-            avatar_file_id = user_info.get("prefs", {}).get("avatar")
-            if avatar_file_id:
-                storage.delete_file(AVATARS_BUCKET_ID, avatar_file_id)
-        except AppwriteException as e:
-            print(f"Failed to delete avatar: {str(e)}")
-
-        # 2) Delete all docs created by user
-        try:
-            docs = databases.list_documents(
-                database_id=DATABASE_ID,
-                collection_id=DOCS_COLLECTION_ID,
-                queries=[Query.equal("createdBy", user_id)],
-            )
-            for doc in docs.get("documents", []):
-                databases.delete_document(
-                    database_id=DATABASE_ID,
-                    collection_id=DOCS_COLLECTION_ID,
-                    document_id=doc["$id"],
-                )
-        except AppwriteException as e:
-            return jsonify({"error": f"Failed to delete user documents: {str(e)}"}), 400
-
-        # 3) Delete all challenge submissions by the user
-        try:
-            submissions = databases.list_documents(
-                database_id=DATABASE_ID,
-                collection_id=SUBMISSIONS_COLLECTION_ID,
-                queries=[Query.equal("user_id", user_id)],
-            )
-            for sub in submissions.get("documents", []):
-                databases.delete_document(
-                    database_id=DATABASE_ID,
-                    collection_id=SUBMISSIONS_COLLECTION_ID,
-                    document_id=sub["$id"],
-                )
-        except AppwriteException as e:
-            print(f"Failed to delete user submissions: {str(e)}")
-
-        # 4) Delete user progress
-        try:
-            databases.delete_document(
-                database_id=DATABASE_ID,
-                collection_id=USER_PROGRESS_COLLECTION_ID,
-                document_id=user_id,
-            )
-        except AppwriteException as e:
-            if "document not found" not in str(e).lower():
-                print(f"Failed to delete user progress: {str(e)}")
-
-        # 5) Delete all tips by user
-        try:
-            tips = databases.list_documents(
-                database_id=DATABASE_ID,
-                collection_id=TIPS_COLLECTION_ID,
-                queries=[Query.equal("user_id", user_id)],
-            )
-            for tip in tips.get("documents", []):
-                databases.delete_document(
-                    database_id=DATABASE_ID,
-                    collection_id=TIPS_COLLECTION_ID,
-                    document_id=tip["$id"],
-                )
-        except AppwriteException as e:
-            print(f"Failed to delete user tips: {str(e)}")
-
-        # 6) Finally, delete the user
-        users.delete(user_id)
+        # Deletion runs in the background; progress is at status_url
+        job_id = jobs.submit("delete_account", {"userId": user_id})
 
         return (
             jsonify(
                 {
                     "success": True,
-                    "message": "User, avatar, progress, submissions, tips, and all related documents deleted",
+                    "message": "Account deletion started",
+                    "job_id": job_id,
+                    "status_url": f"/api/jobs/{job_id}",
                 }
             ),
-            200,
+            202,
             {"Access-Control-Allow-Origin": FRONTEND_URL},
         )
 
-    except AppwriteException as e:
+    except jobs.QueueFull as e:
         return (
             jsonify({"error": str(e)}),
-            400,
-            {"Access-Control-Allow-Origin": FRONTEND_URL},
+            503,
+            {"Access-Control-Allow-Origin": FRONTEND_URL, "Retry-After": "30"},
         )
     except Exception as e:
         return (
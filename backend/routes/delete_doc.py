@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from appwrite.exception import AppwriteException
 from services.appwrite_client import databases
+from services import challenge_store
 import os
 
 delete_doc_bp = Blueprint("delete_doc", __name__)
@@ -30,13 +31,9 @@ def delete_doc():
         if not user_id or not doc_id:
             return jsonify({"error": "userId and docId are required"}), 400
 
-        # Fetch the document to verify ownership
+        # Fetch the owner (projected, not the full document) to verify ownership
         try:
-            doc = databases.get_document(
-                database_id=DATABASE_ID,
-                collection_id=DOCS_COLLECTION_ID,
-                document_id=doc_id
-            )
+            doc = challenge_store.get(doc_id)
 
             if doc.get("createdBy") != user_id:
                 return jsonify({"error": "Unauthorized to delete this document"}), 403
@@ -47,6 +44,7 @@ def delete_doc():
                 collection_id=DOCS_COLLECTION_ID,
                 document_id=doc_id
             )
+            challenge_store.invalidate(doc_id)
 
             return (
                 jsonify({"success": True, "message": "Document deleted successfully"}),
@@ -1,56 +1,58 @@
 from flask import Blueprint, request, jsonify
-from bs4 import BeautifulSoup
-import requests
 import validators
 from datetime import datetime
 from dotenv import load_dotenv
 import os
 from appwrite.query import Query
-from appwrite.client import Client
-from appwrite.services.databases import Databases
-import requests as pyrequests  
+from appwrite.exception import AppwriteException
+from services import page_cache, http_client, xp_pipeline
+from services.appwrite_client import databases
+from services.html_extract import extract_text_from_response
+from services.collection_iter import iter_documents
 
 load_dotenv()
 
-APPWRITE_ENDPOINT = os.getenv("APPWRITE_ENDPOINT")
-APPWRITE_PROJECT_ID = os.getenv("APPWRITE_PROJECT_ID")
-APPWRITE_API_KEY = os.getenv("APPWRITE_API_KEY")
 DATABASE_ID = os.getenv("APPWRITE_DATABASE_ID")
 DOCS_COLLECTION_ID = os.getenv("APPWRITE_DOCS_COLLECTION_ID")
 
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 GOOGLE_CX_ID = os.getenv("GOOGLE_CX_ID")
 
-BACKEND_URL = os.getenv("BACKEND_URL", "http://localhost:5000")
-
-PROGRESS_SERVICE_URL = f"{BACKEND_URL}/api/update_progress"
-
 fetch_clean_doc_bp = Blueprint("fetch_clean_doc", __name__)
 fetch_user_docs_bp = Blueprint("fetch_user_docs", __name__)
 
-# Initialize Appwrite client
-client = Client()
-client.set_endpoint(APPWRITE_ENDPOINT)
-client.set_project(APPWRITE_PROJECT_ID)
-client.set_key(APPWRITE_API_KEY)
-databases = Databases(client)
-
 
 def clean_text_from_url(url: str) -> str:
-    resp = requests.get(url, timeout=10, headers={"User-Agent": "Mozilla/5.0"})
-    resp.raise_for_status()
-    soup = BeautifulSoup(resp.text, "html.parser")
+    cache_key = page_cache.normalize_url(url)
+    cached = page_cache.get(cache_key)
+    if cached and page_cache.is_fresh(cached):
+        return cached["text"]
 
-    for tag in soup(["script", "style", "noscript"]):
-        tag.decompose()
+    headers = {"User-Agent": "Mozilla/5.0"}
+    if cached:
+        headers.update(page_cache.validator_headers(cached))
 
-    text = " ".join(soup.stripped_strings)
+    with http_client.get(url, headers=headers, stream=True, hedge=True) as resp:
+        # Page unchanged since last fetch → reuse the cleaned text
+        if cached and resp.status_code == 304:
+            page_cache.touch(cache_key)
+            return cached["text"]
+
+        resp.raise_for_status()
+        text = extract_text_from_response(resp)
 
     # Detect Cloudflare
     if "Just a moment" in text or "Verifying you are human" in text:
+        page_cache.invalidate(cache_key)
         raise Exception("Cloudflare protection detected")
 
-    return text[:1000000]
+    page_cache.put(
+        cache_key,
+        text,
+        etag=resp.headers.get("ETag"),
+        last_modified=resp.headers.get("Last-Modified"),
+    )
+    return text
 
 
 # Fallback method using Google Custom Search API
@@ -59,7 +61,7 @@ def fetch_via_google_cse(query: str) -> str:
         f"https://www.googleapis.com/customsearch/v1?q={query}"
         f"&key={GOOGLE_API_KEY}&cx={GOOGLE_CX_ID}"
     )
-    resp = requests.get(api_url, timeout=10)
+    resp = http_client.get(api_url, hedge=True)
     resp.raise_for_status()
     data = resp.json()
 
@@ -72,14 +74,9 @@ def fetch_via_google_cse(query: str) -> str:
 
 def award_xp(user_id: str, amount: int):
     try:
-        res = pyrequests.post(PROGRESS_SERVICE_URL, json={
-            "user_id": user_id,
-            "xp_earned": amount
-        }, timeout=5)
-        if res.status_code != 200:
-            print("⚠️ Failed to award XP:", res.text)
+        xp_pipeline.award(user_id, amount)
     except Exception as e:
-        print("⚠️ Error contacting progress service:", e)
+        print("⚠️ Failed to award XP:", e)
 
 
 @fetch_clean_doc_bp.route("/fetch_clean_doc", methods=["POST"])
@@ -134,33 +131,101 @@ def fetch_clean_doc():
         return jsonify({"error": f"Failed to create document: {str(e)}"}), 500
     
 
+# Listing with ?view=summary returns only these; full content comes from /docs/<id>
+DOC_SUMMARY_FIELDS = ["title", "createdAt"]
+DOCS_PAGE_MAX = 100
+
+
+def doc_payload(doc: dict) -> dict:
+    return {
+        "$id": doc.get("$id"),
+        "title": doc.get("title"),
+        "text": doc.get("text"),
+        "story": doc.get("story", ""),
+        "steps": doc.get("slider", ""),  
+        "challenges": doc.get("challenges", ""),
+        "flashcards": doc.get("flashcards", ""),
+        "createdAt": doc.get("createdAt"),
+    }
+
+
+def doc_summary(doc: dict) -> dict:
+    return {
+        "$id": doc.get("$id"),
+        "title": doc.get("title"),
+        "createdAt": doc.get("createdAt"),
+    }
+
+
 @fetch_user_docs_bp.route("/fetch_user_docs", methods=["GET"])
 def fetch_user_docs():
+    """
+    Lists a user's docs. `view=summary` projects title/createdAt only.
+    With `limit`, returns one page plus `next_cursor` (pass it back as
+    `cursor`); without it, every doc is returned.
+    """
     user_id = request.args.get("userId")
     if not user_id:
         return jsonify({"error": "userId is required"}), 400
 
+    summary = request.args.get("view") == "summary"
+    to_payload = doc_summary if summary else doc_payload
+    queries = [Query.equal("createdBy", user_id)]
+
     try:
-        docs_resp = databases.list_documents(
+        limit = request.args.get("limit")
+        if limit is None:
+            docs = [
+                to_payload(doc)
+                for doc in iter_documents(
+                    DOCS_COLLECTION_ID, queries, select=DOC_SUMMARY_FIELDS if summary else None
+                )
+            ]
+            return jsonify({"docs": docs}), 200
+
+        try:
+            limit = min(max(int(limit), 1), DOCS_PAGE_MAX)
+        except ValueError:
+            return jsonify({"error": "limit must be an integer"}), 400
+
+        if summary:
+            queries.append(Query.select(DOC_SUMMARY_FIELDS + ["$id"]))
+        queries.append(Query.limit(limit))
+        cursor = request.args.get("cursor")
+        if cursor:
+            queries.append(Query.cursor_after(cursor))
+
+        page = databases.list_documents(
             database_id=DATABASE_ID,
             collection_id=DOCS_COLLECTION_ID,
-            queries=[Query.equal("createdBy", user_id)]
-        )
-
-        docs = []
-        for doc in docs_resp.get("documents", []):
-            docs.append({
-                "$id": doc.get("$id"),
-                "title": doc.get("title"),
-                "text": doc.get("text"),
-                "story": doc.get("story", ""),
-                "steps": doc.get("slider", ""),  
-                "challenges": doc.get("challenges", ""),
-                "flashcards": doc.get("flashcards", ""),
-                "createdAt": doc.get("createdAt"),
-            })
-
-        return jsonify({"docs": docs}), 200
+            queries=queries,
+        ).get("documents", [])
+        next_cursor = page[-1]["$id"] if len(page) == limit else None
+        return jsonify({"docs": [to_payload(doc) for doc in page], "next_cursor": next_cursor}), 200
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+
+
+@fetch_user_docs_bp.route("/docs/<doc_id>", methods=["GET"])
+def fetch_doc(doc_id):
+    user_id = request.args.get("userId")
+    if not user_id:
+        return jsonify({"error": "userId is required"}), 400
+
+    try:
+        doc = databases.get_document(
+            database_id=DATABASE_ID,
+            collection_id=DOCS_COLLECTION_ID,
+            document_id=doc_id,
+        )
+    except AppwriteException as e:
+        if getattr(e, "code", None) == 404:
+            return jsonify({"error": "Document not found"}), 404
+        return jsonify({"error": str(e)}), 500
+
+    # Don't reveal whether someone else's doc exists
+    if doc.get("createdBy") != user_id:
+        return jsonify({"error": "Document not found"}), 404
+
+    return jsonify({"doc": doc_payload(doc)}), 200
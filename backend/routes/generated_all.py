@@ -1,44 +1,33 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 import requests
 import os
 import json
 import re
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
-from appwrite.client import Client
-from appwrite.services.databases import Databases
+from services import generation_cache, jobs, http_client, challenge_store, gemini_governor, resilience, llm_response
+from services.doc_chunker import split_document
+from services.appwrite_client import databases
 
 load_dotenv()
 
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-APPWRITE_ENDPOINT = os.getenv("APPWRITE_ENDPOINT")
-APPWRITE_PROJECT_ID = os.getenv("APPWRITE_PROJECT_ID")
-APPWRITE_API_KEY = os.getenv("APPWRITE_API_KEY")
 DATABASE_ID = os.getenv("APPWRITE_DATABASE_ID")
 DOCS_COLLECTION_ID = os.getenv("APPWRITE_DOCS_COLLECTION_ID")
 
-generate_all_bp = Blueprint("generate_all", __name__)
-
-# Initialize Appwrite client
-client = Client()
-client.set_endpoint(APPWRITE_ENDPOINT)
-client.set_project(APPWRITE_PROJECT_ID)
-client.set_key(APPWRITE_API_KEY)
-databases = Databases(client)
+# Docs longer than this are digested chunk by chunk before generation
+MAP_REDUCE_THRESHOLD_CHARS = int(os.getenv("MAP_REDUCE_THRESHOLD_CHARS", "120000"))
+MAP_CHUNK_CHARS = int(os.getenv("MAP_CHUNK_CHARS", "40000"))
+MAP_CONCURRENCY = int(os.getenv("MAP_CONCURRENCY", "4"))
 
+GEMINI_STREAM_ENDPOINT = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash:streamGenerateContent"
 
-@generate_all_bp.route("/generate_all", methods=["POST"])
-def generate_all():
-    data = request.json
-    text = data.get("text", "")
-    user_id = data.get("userId")
-    doc_id = data.get("docId")
-
-    if not text or not user_id or not doc_id:
-        return jsonify({"error": "Missing text, userId or docId"}), 400
+generate_all_bp = Blueprint("generate_all", __name__)
+logger = logging.getLogger(__name__)
 
-    doc_content = text.strip()
 
-    prompt = f"""
+PROMPT_TEMPLATE = """
 You are an AI tutor. Analyze the following documentation carefully.
 
 ### TASKS
@@ -81,76 +70,554 @@ Documentation:
 {doc_content}
 """
 
-    try:
-        payload = {"contents": [{"parts": [{"text": prompt}]}]}
+# Structured variant of PROMPT_TEMPLATE: the reply is JSON matching
+# SECTIONS_SCHEMA. The delimited PROMPT_TEMPLATE stays for streaming,
+# where sections are emitted as soon as their delimiter arrives.
+JSON_PROMPT_TEMPLATE = """
+You are an AI tutor. Analyze the following documentation carefully.
+
+Fill in every field of the JSON response:
+
+{instructions}
+
+Documentation:
+{doc_content}
+"""
+
+# Bump whenever PROMPT_TEMPLATE or JSON_PROMPT_TEMPLATE (or how their output
+# is parsed) changes so cached generations from the old prompt are no
+# longer served. Each template has its own entries (generation_version).
+PROMPT_VERSION = "2"
+
+MAP_PROMPT_TEMPLATE = """
+You are helping an AI tutor digest a long piece of documentation that has been split into parts.
+This is part {index} of {total}.
+
+Extract the essential content of this part as concise notes:
+- Key concepts and definitions
+- Important APIs, options and commands, and how they behave
+- Short code examples worth keeping, copied verbatim
+- Links to relevant resources mentioned in the text
+
+Keep the notes under 600 words. Do not add anything that is not in the text.
+
+Documentation part:
+{chunk}
+"""
+
+# Same rule as PROMPT_VERSION, for MAP_PROMPT_TEMPLATE
+MAP_PROMPT_VERSION = "1"
+
+SECTION_PROMPT_TEMPLATE = """
+You are an AI tutor. Analyze the following documentation carefully.
+
+### TASK
+
+{instructions}
+
+Put the section content in the `{field}` field of the JSON response, without a section heading.
+
+Documentation:
+{doc_content}
+"""
+
+SECTION_INSTRUCTIONS = {
+    "STORY": """**STORY**
+   - Convert the documentation into an engaging story as if teaching a beginner.
+   - Keep it fun, clear, and use analogies when possible.
+   - Add links to relevant resources, if and only if needed.""",
+    "STEPS": """**STEPS**
+   - Explain the concept step by step, like a guided walkthrough.
+   - Each step must be short, crisp, and easy to follow.
+   - One step per line (or per list item).
+   - Add links to relevant resources, if and only if needed.""",
+    "CHALLENGES": """**CHALLENGES**
+   - Create exactly 3 challenges (coding tasks, quiz-style, or thought exercises).
+   - Each challenge must end with the phrase `Challenge Ended`.
+   - Format:
+     Challenge 1: ...
+     Challenge Ended
+     Challenge 2: ...
+     Challenge Ended
+     Challenge 3: ...
+     Challenge Ended""",
+    "FLASHCARDS": """**FLASHCARDS**
+   - Generate 4–5 flashcards, each with a question and an answer.""",
+}
+
+# Same rule as PROMPT_VERSION, for the per-section prompts
+SECTION_PROMPT_VERSION = "2"
+
+SINGLE = "single"
+MAP_REDUCE = "map_reduce"
+SECTIONS = "sections"
 
-        resp = requests.post(
-            f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash:generateContent?key={GEMINI_API_KEY}",
-            headers={"Content-Type": "application/json"},
-            json=payload,
-            timeout=30
-        )
 
+class GeminiError(llm_response.LLMError):
+    pass
+
+
+def call_gemini(prompt: str, timeout=30) -> str:
+    """Sends a single prompt to Gemini and returns the reply text."""
+    return llm_response.generate_text(prompt, timeout=timeout)
+
+
+def stream_gemini(prompt: str, timeout=30):
+    """Yields reply text chunks from Gemini's streaming endpoint as they arrive."""
+    payload = {"contents": [{"parts": [{"text": prompt}]}]}
+
+    try:
+        # Admission covers starting the stream; the slot is released once
+        # the response headers are in
+        with gemini_governor.admit():
+            resp = http_client.post(
+                f"{GEMINI_STREAM_ENDPOINT}?alt=sse&key={GEMINI_API_KEY}",
+                headers={"Content-Type": "application/json"},
+                json=payload,
+                timeout=timeout,
+                stream=True
+            )
+    except requests.exceptions.RequestException as e:
+        print("Gemini request error:", e)
+        raise GeminiError("Failed to contact Gemini API")
+
+    with resp:
         if resp.status_code != 200:
             print("Gemini returned non-200:", resp.status_code, resp.text)
-            return jsonify({"error": f"Gemini API error: {resp.status_code}"}), 503
+            raise GeminiError(f"Gemini API error: {resp.status_code}")
 
         try:
-            resp_json = resp.json()
-            content = resp_json["candidates"][0]["content"]["parts"][0]["text"]
-        except Exception:
-            print("Gemini response parse error:", resp.text)
-            return jsonify({"error": "Invalid response from Gemini"}), 503
-
-        def extract_section(title):
-            pattern = rf"### {title}\s*(.*?)(?=###|$)"
-            match = re.search(pattern, content, re.DOTALL | re.IGNORECASE)
-            return match.group(1).strip() if match else ""
-
-        story = extract_section("STORY")
-        steps_raw = extract_section("STEPS")
-        challenges = extract_section("CHALLENGES")
-        flashcards_raw = extract_section("FLASHCARDS")
-
-        # Steps → list
-        steps = [s.strip("-*0123456789. ") for s in steps_raw.split("\n") if s.strip()]
-
-        # Flashcards → JSON parsing
-        flashcards_clean = flashcards_raw.strip()
-        if flashcards_clean.startswith("```"):
-            flashcards_clean = re.sub(r"^```[a-zA-Z0-9]*\s*", "", flashcards_clean)
-            flashcards_clean = re.sub(r"```$", "", flashcards_clean.strip())
+            for line in resp.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data:"):
+                    continue
+                try:
+                    chunk = json.loads(line[len("data:"):])
+                    parts = chunk["candidates"][0]["content"].get("parts", [])
+                except Exception:
+                    print("Gemini stream parse error:", line)
+                    raise GeminiError("Invalid response from Gemini")
+                text = "".join(part.get("text", "") for part in parts)
+                if text:
+                    yield text
+        except requests.exceptions.RequestException as e:
+            print("Gemini stream error:", e)
+            raise GeminiError("Gemini stream interrupted")
 
-        try:
-            flashcards = json.loads(flashcards_clean)
-        except Exception as e:
-            print("Flashcards parse error:", e)
-            flashcards = []
-
-        updated_doc = databases.update_document(
-            database_id=DATABASE_ID,
-            collection_id=DOCS_COLLECTION_ID,
-            document_id=doc_id,
-            data={
-                "story": story,
-                "slider": "\n".join(steps),
-                "challenges": challenges,
-                "flashcards": json.dumps(flashcards),
-            },
+
+SECTION_TITLES = ["STORY", "STEPS", "CHALLENGES", "FLASHCARDS"]
+
+SECTION_SCHEMAS = {
+    "STORY": {"type": "STRING"},
+    "STEPS": {"type": "ARRAY", "items": {"type": "STRING"}, "minItems": 1},
+    "CHALLENGES": {"type": "STRING"},
+    "FLASHCARDS": {
+        "type": "ARRAY",
+        "items": {
+            "type": "OBJECT",
+            "properties": {"question": {"type": "STRING"}, "answer": {"type": "STRING"}},
+            "required": ["question", "answer"],
+        },
+        "minItems": 1,
+    },
+}
+
+SECTIONS_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {title.lower(): SECTION_SCHEMAS[title] for title in SECTION_TITLES},
+    "required": [title.lower() for title in SECTION_TITLES],
+    "propertyOrdering": [title.lower() for title in SECTION_TITLES],
+}
+
+
+def extract_section(content: str, title: str) -> str:
+    pattern = rf"### {title}\s*(.*?)(?=###|$)"
+    match = re.search(pattern, content, re.DOTALL | re.IGNORECASE)
+    return match.group(1).strip() if match else ""
+
+
+def parse_section(title: str, raw: str):
+    """Converts one raw section into the shape stored and returned to clients."""
+    # Steps → list
+    if title == "STEPS":
+        return [s.strip("-*0123456789. ") for s in raw.split("\n") if s.strip()]
+
+    # Flashcards → first JSON list in the section (fences and prose are skipped)
+    if title == "FLASHCARDS":
+        flashcards = llm_response.parse_json(raw, expect=list)
+        if flashcards is None:
+            print("Flashcards parse error:", raw[:200])
+            return []
+        return flashcards
+
+    return raw
+
+
+def completed_sections(content: str, emitted: set):
+    """Yields titles whose section has been closed by a following `###` delimiter."""
+    for title in SECTION_TITLES:
+        if title in emitted:
+            continue
+        match = re.search(rf"### {title}\s*", content, re.IGNORECASE)
+        if match and "###" in content[match.end():]:
+            yield title
+
+
+def parse_sections(content: str) -> dict:
+    """Splits a delimited Gemini reply into story, steps, challenges and flashcards."""
+    return {
+        title.lower(): parse_section(title, extract_section(content, title))
+        for title in SECTION_TITLES
+    }
+
+
+def normalize_fields(fields: dict) -> dict:
+    """Brings validated JSON fields into the shape parse_sections produces."""
+    if "steps" in fields:
+        fields = {**fields, "steps": [s.strip("-*0123456789. ") for s in fields["steps"] if s.strip()]}
+    return fields
+
+
+def sections_from_json(data: dict) -> dict:
+    """Sections from a structured reply; fields that never validated are left empty."""
+    return {"story": "", "steps": [], "challenges": "", "flashcards": [], **normalize_fields(data)}
+
+
+def repair_sections(prompt: str, sections: dict):
+    """
+    Asks again for only the sections that came back missing or malformed.
+    Returns (sections, errors) with errors for those still invalid.
+    """
+    _, errors = llm_response.validate(sections, SECTIONS_SCHEMA)
+    if not errors:
+        return sections, {}
+    fixed, errors = llm_response.repair(prompt, SECTIONS_SCHEMA, errors)
+    return {**sections, **normalize_fields(fixed)}, errors
+
+
+def resolve_mode(doc_content: str, mode=None) -> str:
+    if mode in (SINGLE, MAP_REDUCE):
+        return mode
+    return MAP_REDUCE if len(doc_content) > MAP_REDUCE_THRESHOLD_CHARS else SINGLE
+
+
+def generation_version(mode: str, streamed=False) -> str:
+    """
+    Cache version for a generation. The streamed (delimited PROMPT_TEMPLATE)
+    and JSON (JSON_PROMPT_TEMPLATE) prompts answer differently, so each
+    gets its own entries.
+    """
+    version = f"{PROMPT_VERSION}-mr{MAP_PROMPT_VERSION}" if mode == MAP_REDUCE else PROMPT_VERSION
+    return f"{version}-stream" if streamed else f"{version}-json"
+
+
+def summarize_chunks(doc_content: str) -> str:
+    """Map step: condenses each structural chunk with bounded parallel Gemini calls."""
+    chunks = split_document(doc_content, MAP_CHUNK_CHARS)
+    total = len(chunks)
+
+    def summarize(indexed_chunk):
+        index, chunk = indexed_chunk
+        return call_gemini(MAP_PROMPT_TEMPLATE.format(index=index, total=total, chunk=chunk))
+
+    with ThreadPoolExecutor(max_workers=MAP_CONCURRENCY) as pool:
+        notes = list(pool.map(gemini_governor.bind(summarize), enumerate(chunks, start=1)))
+
+    return "\n\n".join(f"Part {i}:\n{n.strip()}" for i, n in enumerate(notes, start=1))
+
+
+def prompt_content(doc_content: str, mode: str) -> str:
+    """The doc text the generation prompt is built on; in map-reduce mode this runs the map step."""
+    return summarize_chunks(doc_content) if mode == MAP_REDUCE else doc_content
+
+
+def build_prompt(doc_content: str, mode: str) -> str:
+    """Returns the delimited generation prompt used for streaming."""
+    return PROMPT_TEMPLATE.format(doc_content=prompt_content(doc_content, mode))
+
+
+def build_json_prompt(doc_content: str, mode: str) -> str:
+    """Returns the structured generation prompt (reply matches SECTIONS_SCHEMA)."""
+    return JSON_PROMPT_TEMPLATE.format(
+        instructions="\n\n".join(
+            f"`{title.lower()}`: {SECTION_INSTRUCTIONS[title]}" for title in SECTION_TITLES
+        ),
+        doc_content=prompt_content(doc_content, mode),
+    )
+
+
+def generate_sections(doc_content: str, mode=None) -> dict:
+    """Returns generated sections for a doc, reusing cached output for identical text."""
+    mode = resolve_mode(doc_content, mode)
+    cache_key = generation_cache.make_key(doc_content, generation_version(mode))
+    cached = generation_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    data, errors = llm_response.generate_json(build_json_prompt(doc_content, mode), SECTIONS_SCHEMA)
+    sections = sections_from_json(data)
+    cache_sections(cache_key, sections, errors)
+    return sections
+
+
+def cache_sections(cache_key: str, sections: dict, errors: dict):
+    # Don't pin a reply with sections that never validated; the next
+    # attempt regenerates it
+    if errors:
+        logger.warning("Sections still invalid after repair, not caching: %s", errors)
+        return
+    if sections["story"] and sections["challenges"]:
+        generation_cache.put(cache_key, sections)
+
+
+def section_fields(sections: dict) -> dict:
+    """Maps parsed sections onto the docs collection attributes."""
+    fields = {}
+    if "story" in sections:
+        fields["story"] = sections["story"]
+    if "steps" in sections:
+        fields["slider"] = "\n".join(sections["steps"])
+    if "challenges" in sections:
+        fields["challenges"] = sections["challenges"]
+    if "flashcards" in sections:
+        fields["flashcards"] = json.dumps(sections["flashcards"])
+    return fields
+
+
+def save_sections(doc_id: str, sections: dict):
+    updated_doc = databases.update_document(
+        database_id=DATABASE_ID,
+        collection_id=DOCS_COLLECTION_ID,
+        document_id=doc_id,
+        data=section_fields(sections),
+    )
+    challenge_store.invalidate(doc_id)
+    return updated_doc
+
+
+def generate_section(title: str, doc_content: str):
+    """Generates one section with its own smaller prompt."""
+    field = title.lower()
+    data, errors = llm_response.generate_json(
+        SECTION_PROMPT_TEMPLATE.format(
+            instructions=SECTION_INSTRUCTIONS[title],
+            field=field,
+            doc_content=doc_content,
+        ),
+        {"type": "OBJECT", "properties": {field: SECTION_SCHEMAS[title]}, "required": [field]},
+    )
+    if errors:
+        raise GeminiError(f"Malformed {field} section from Gemini")
+    return normalize_fields(data)[field]
+
+
+def generate_sections_parallel(doc_content: str, doc_id: str):
+    """
+    Generates the four sections with concurrent section-specific calls.
+    Each section is cached and persisted as soon as it completes, so a
+    failure in one section doesn't discard the others and a retry only
+    regenerates what is missing.
+    Returns (updated_doc, sections, errors).
+    """
+    cache_keys = {
+        title: generation_cache.make_key(
+            doc_content, f"{PROMPT_VERSION}-s{SECTION_PROMPT_VERSION}-{title.lower()}"
         )
+        for title in SECTION_TITLES
+    }
+
+    sections, errors = {}, {}
+    updated_doc = None
+    for title in SECTION_TITLES:
+        cached = generation_cache.get(cache_keys[title])
+        if cached is not None:
+            sections[title.lower()] = cached
+    if sections:
+        updated_doc = save_sections(doc_id, sections)
+
+    missing = [title for title in SECTION_TITLES if title.lower() not in sections]
+    if not missing:
+        return updated_doc, sections, errors
+
+    if len(doc_content) > MAP_REDUCE_THRESHOLD_CHARS:
+        prompt_content = summarize_chunks(doc_content)
+    else:
+        prompt_content = doc_content
+
+    rejection = None
+    with ThreadPoolExecutor(max_workers=len(missing)) as pool:
+        section = gemini_governor.bind(generate_section)
+        futures = {pool.submit(section, title, prompt_content): title for title in missing}
+        for future in as_completed(futures):
+            title = futures[future]
+            try:
+                value = future.result()
+            except gemini_governor.Rejected as e:
+                rejection = e
+                errors[title.lower()] = str(e)
+                continue
+            except llm_response.LLMError as e:
+                errors[title.lower()] = str(e)
+                continue
+
+            # Cached first, so a retry after a failed save doesn't regenerate it
+            generation_cache.put(cache_keys[title], value)
+            try:
+                updated_doc = save_sections(doc_id, {title.lower(): value})
+            except Exception as e:
+                print(f"⚠️ Failed to save {title.lower()} section:", e)
+                errors[title.lower()] = f"Failed to save section: {e}"
+                continue
+            sections[title.lower()] = value
+
+    # Nothing to show for it: surface the rejection so the caller gets Retry-After
+    if rejection is not None and not sections:
+        raise rejection
+    return updated_doc, sections, errors
+
+
+def generate_and_save(doc_content: str, doc_id: str, mode=None) -> dict:
+    """Runs generation in the requested mode, persists it and returns the response payload."""
+    if mode == SECTIONS:
+        updated_doc, sections, errors = generate_sections_parallel(doc_content, doc_id)
+        if not sections:
+            raise GeminiError("; ".join(errors.values()))
+        return {"doc": updated_doc, **sections, "errors": errors}
+
+    sections = generate_sections(doc_content, mode)
+    updated_doc = save_sections(doc_id, sections)
+    return {"doc": updated_doc, **sections}
+
+
+def run_generate_all_job(job_id, payload):
+    with gemini_governor.request_context(gemini_governor.BULK, payload.get("userId")):
+        return generate_and_save(payload["text"], payload["docId"], payload.get("mode"))
+
+
+jobs.register_handler("generate_all", run_generate_all_job)
+
+
+@generate_all_bp.route("/generate_all", methods=["POST"])
+def generate_all():
+    data = request.json
+    text = data.get("text", "")
+    user_id = data.get("userId")
+    doc_id = data.get("docId")
+
+    if not text or not user_id or not doc_id:
+        return jsonify({"error": "Missing text, userId or docId"}), 400
+
+    doc_content = text.strip()
+
+    # Opt-in async mode: hand off to the job pool and let the client poll
+    if data.get("async") or request.args.get("async") == "1":
+        try:
+            job_id = jobs.submit("generate_all", {
+                "text": doc_content,
+                "userId": user_id,
+                "docId": doc_id,
+                "mode": data.get("mode"),
+            })
+        except jobs.QueueFull as e:
+            return jsonify({"error": str(e)}), 503, {"Retry-After": "30"}
 
         return jsonify({
-            "doc": updated_doc,
-            "story": story,
-            "steps": steps,
-            "challenges": challenges,
-            "flashcards": flashcards,
-        }), 200
+            "job_id": job_id,
+            "status_url": f"/api/jobs/{job_id}",
+        }), 202
 
-    except requests.exceptions.RequestException as e:
-        print("Gemini request error:", e)
-        return jsonify({"error": "Failed to contact Gemini API"}), 503
+    try:
+        with gemini_governor.request_context(gemini_governor.BULK, user_id):
+            return jsonify(generate_and_save(doc_content, doc_id, data.get("mode"))), 200
+
+    except gemini_governor.Rejected as e:
+        return jsonify({"error": str(e)}), e.status_code, {"Retry-After": str(e.retry_after)}
+
+    except llm_response.LLMError as e:
+        return jsonify({"error": str(e)}), 503
 
     except Exception as e:
         print("Generate All error:", e)
         return jsonify({"error": str(e)}), 500
+
+
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@generate_all_bp.route("/generate_all/stream", methods=["POST"])
+def generate_all_stream():
+    """
+    Streaming variant of /generate_all over server-sent events.
+    Emits a `section` event per section as soon as it is complete, then a
+    `done` event carrying the same payload /generate_all returns.
+    """
+    data = request.json
+    text = data.get("text", "")
+    user_id = data.get("userId")
+    doc_id = data.get("docId")
+
+    if not text or not user_id or not doc_id:
+        return jsonify({"error": "Missing text, userId or docId"}), 400
+
+    doc_content = text.strip()
+
+    def events():
+        emitted = set()
+        # The client reads the stream as it goes, so it isn't held to the
+        # request's latency budget; each Gemini call keeps its own timeout
+        with gemini_governor.request_context(gemini_governor.BULK, user_id), resilience.budget(None):
+            try:
+                mode = resolve_mode(doc_content, data.get("mode"))
+                cache_key = generation_cache.make_key(doc_content, generation_version(mode, streamed=True))
+                sections = generation_cache.get(cache_key)
+
+                if sections is None:
+                    prompt = build_prompt(doc_content, mode)
+                    content = ""
+                    for chunk in stream_gemini(prompt):
+                        content += chunk
+                        for title in completed_sections(content, emitted):
+                            emitted.add(title)
+                            yield sse_event("section", {
+                                "name": title.lower(),
+                                "content": parse_section(title, extract_section(content, title)),
+                            })
+
+                    # Sections that came out malformed are re-requested on
+                    # their own and sent again
+                    parsed = parse_sections(content)
+                    sections, errors = repair_sections(prompt, parsed)
+                    for title in SECTION_TITLES:
+                        name = title.lower()
+                        if title in emitted and sections[name] is not parsed[name]:
+                            yield sse_event("section", {"name": name, "content": sections[name]})
+                    cache_sections(cache_key, sections, errors)
+
+                for title in SECTION_TITLES:
+                    if title not in emitted:
+                        yield sse_event("section", {"name": title.lower(), "content": sections[title.lower()]})
+
+                updated_doc = save_sections(doc_id, sections)
+                yield sse_event("done", {"doc": updated_doc, **sections})
+
+            except gemini_governor.Rejected as e:
+                yield sse_event("error", {"error": str(e), "retry_after": e.retry_after})
+
+            except llm_response.LLMError as e:
+                yield sse_event("error", {"error": str(e)})
+
+            except Exception as e:
+                print("Generate All stream error:", e)
+                yield sse_event("error", {"error": str(e)})
+
+    return Response(
+        stream_with_context(events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@generate_all_bp.route("/generate_all/cache", methods=["GET"])
+def generate_all_cache():
+    # Read-only: cached output is invalidated by bumping PROMPT_VERSION
+    return jsonify({"prompt_version": PROMPT_VERSION, **generation_cache.stats()}), 200
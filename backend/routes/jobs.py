@@ -0,0 +1,24 @@
+from flask import Blueprint, jsonify
+from services import jobs
+
+jobs_bp = Blueprint("jobs", __name__)
+
+
+@jobs_bp.before_app_request
+def start_job_workers():
+    # Runs in each worker after gunicorn forks, so threads are never
+    # created in the master process.
+    jobs.ensure_started()
+
+
+@jobs_bp.route("/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job), 200
+
+
+@jobs_bp.route("/jobs", methods=["GET"])
+def jobs_stats():
+    return jsonify(jobs.stats()), 200
@@ -1,65 +1,54 @@
 import os
-from flask import Blueprint, jsonify
-from appwrite.client import Client
-from appwrite.services.databases import Databases
-from appwrite.services.users import Users
-
-# Initialize Appwrite client
-client = Client()
-client.set_endpoint(os.getenv("APPWRITE_ENDPOINT"))
-client.set_project(os.getenv("APPWRITE_PROJECT_ID"))
-client.set_key(os.getenv("APPWRITE_API_KEY"))
-
-db = Databases(client)
-users_service = Users(client)
+from flask import Blueprint, jsonify, request
+from services import leaderboard_store
 
 leaderboard_bp = Blueprint("leaderboard", __name__, url_prefix="/api")
 
-DATABASE_ID = os.getenv("APPWRITE_DATABASE_ID")
-USER_PROGRESS_COLLECTION = os.getenv("APPWRITE_USER_PROGRESS_COLLECTION_ID")
+LEADERBOARD_DEFAULT_LIMIT = int(os.getenv("LEADERBOARD_DEFAULT_LIMIT", "100"))
+LEADERBOARD_MAX_LIMIT = int(os.getenv("LEADERBOARD_MAX_LIMIT", "500"))
 
 @leaderboard_bp.route("/leaderboard", methods=["GET"])
 def leaderboard():
     try:
-        res = db.list_documents(
-            database_id=DATABASE_ID,
-            collection_id=USER_PROGRESS_COLLECTION
-        )
-        user_docs = res.get("documents", [])
+        limit = int(request.args.get("limit", LEADERBOARD_DEFAULT_LIMIT))
+        offset = int(request.args.get("offset", 0))
+    except ValueError:
+        return jsonify({"error": "limit and offset must be integers"}), 400
+    limit = max(1, min(limit, LEADERBOARD_MAX_LIMIT))
+    offset = max(0, offset)
 
-        leaderboard = []
-        for doc in user_docs:
-            user_id = doc.get("user_id") or doc.get("$id")
-            username = "Unknown"
-            avatar_id = None
+    try:
+        entries, next_cursor = leaderboard_store.page(
+            limit=limit,
+            offset=offset,
+            cursor=request.args.get("cursor"),
+        )
+        return jsonify({"leaderboard": entries, "next_cursor": next_cursor})
 
-            try:
-                user_info = users_service.get(user_id)
-                username = user_info.get("name") or user_info.get("email")
-                avatar_id = user_info.get("prefs", {}).get("avatar")
-            except:
-                pass
+    except leaderboard_store.InvalidCursor as e:
+        return jsonify({"error": str(e)}), 400
 
-            badges = doc.get("badges", [])
-            if isinstance(badges, str):
-                badges = [b.strip() for b in badges.split(",") if b.strip()]
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        print("Error generating leaderboard:", e)
+        return jsonify({"error": "Failed to fetch leaderboard"}), 500
 
-            leaderboard.append({
-                "$id": user_id,
-                "name": username,
-                "xp": doc.get("xp", 0),
-                "streak": doc.get("streak", 0),
-                "badges": badges,
-                "avatar": avatar_id
-            })
 
-        # Sorting for leaderboard
-        leaderboard_sorted = sorted(leaderboard, key=lambda x: x["xp"], reverse=True)
+@leaderboard_bp.route("/leaderboard/rank", methods=["GET"])
+def leaderboard_rank():
+    user_id = request.args.get("user_id")
+    if not user_id:
+        return jsonify({"error": "user_id is required"}), 400
 
-        return jsonify({"leaderboard": leaderboard_sorted})
+    try:
+        entry = leaderboard_store.rank(user_id)
+        if entry is None:
+            return jsonify({"error": "User not on leaderboard"}), 404
+        return jsonify(entry)
 
     except Exception as e:
         import traceback
         traceback.print_exc()
-        print("Error generating leaderboard:", e)
-        return jsonify({"error": "Failed to fetch leaderboard"}), 500
+        print("Error fetching leaderboard rank:", e)
+        return jsonify({"error": "Failed to fetch leaderboard rank"}), 500
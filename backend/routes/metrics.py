@@ -0,0 +1,22 @@
+from flask import Blueprint, jsonify
+from services import gemini_governor, resilience, llm_response
+
+metrics_bp = Blueprint("metrics", __name__)
+
+
+@metrics_bp.route("/metrics/gemini", methods=["GET"])
+def gemini_metrics():
+    """Admission-control state for this worker: queue depth, waits, rejections."""
+    return jsonify(gemini_governor.metrics()), 200
+
+
+@metrics_bp.route("/metrics/dependencies", methods=["GET"])
+def dependency_metrics():
+    """Circuit breaker state and latency per outbound dependency, plus hedging counts."""
+    return jsonify(resilience.stats()), 200
+
+
+@metrics_bp.route("/metrics/llm", methods=["GET"])
+def llm_metrics():
+    """How Gemini replies were parsed, and how many fields needed a repair request."""
+    return jsonify(llm_response.stats()), 200
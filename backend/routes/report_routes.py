@@ -1,41 +1,34 @@
 import os
-import re
 import json
-import requests
-import textwrap
-from io import BytesIO
 from flask import Blueprint, request, jsonify, send_file
-from appwrite.client import Client
-from appwrite.services.databases import Databases
 from appwrite.query import Query
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
+from services import generation_cache, pdf_report, gemini_governor, llm_response
+from services.report_aggregate import aggregate_submissions, SUBMISSION_FIELDS
+from services.appwrite_client import databases
+from services.collection_iter import iter_documents
 
 report_bp = Blueprint("report", __name__)
 
-# Initialize Appwrite client
-client = Client()
-client.set_endpoint(os.getenv("APPWRITE_ENDPOINT"))
-client.set_project(os.getenv("APPWRITE_PROJECT_ID"))
-client.set_key(os.getenv("APPWRITE_API_KEY"))
-databases = Databases(client)
-
 DB_ID = os.getenv("APPWRITE_DATABASE_ID")
 PROGRESS_COLLECTION_ID = os.getenv("APPWRITE_USER_PROGRESS_COLLECTION_ID")
 SUBMISSIONS_COLLECTION_ID = os.getenv("APPWRITE_SUMBMIT_CHALLENGE_COLLECTION_ID")
 
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-GEMINI_ENDPOINT = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash:generateContent"
-
-def extract_json_from_text(text: str):
-    """Extract first JSON object from text."""
-    try:
-        match = re.search(r"\{.*\}", text, re.DOTALL)
-        if match:
-            return json.loads(match.group())
-    except Exception:
-        pass
-    return None
+# Bump when the report prompt changes so cached reports are regenerated
+REPORT_PROMPT_VERSION = "2"
+
+REPORT_SECTIONS = [
+    ("technical_knowledge", "Technical Knowledge"),
+    ("communication_skills", "Communication Skills"),
+    ("strengths", "Strengths"),
+    ("areas_of_improvement", "Areas Of Improvement"),
+    ("overall_analysis", "Overall Analysis"),
+]
+REPORT_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {field: {"type": "STRING"} for field, _ in REPORT_SECTIONS},
+    "required": [field for field, _ in REPORT_SECTIONS],
+    "propertyOrdering": [field for field, _ in REPORT_SECTIONS],
+}
 
 def clean_text(text):
     """Clean text for report (handles strings, lists, None)."""
@@ -69,12 +62,23 @@ def generate_report():
         xp = progress_doc.get("xp", 0)
         streak = progress_doc.get("streak", 0)
 
-        # Fetch user challenge submissions
-        submissions = databases.list_documents(
-            DB_ID,
+        # Fetch user challenge submissions and compact them into per-doc stats
+        submissions = list(iter_documents(
             SUBMISSIONS_COLLECTION_ID,
-            queries=[Query.equal("user_id", user_id)]
-        )["documents"]
+            [Query.equal("user_id", user_id)],
+            select=SUBMISSION_FIELDS,
+            database_id=DB_ID
+        ))
+        summary = aggregate_submissions(submissions)
+
+        # Unchanged progress and history → same report
+        cache_key = generation_cache.make_key(
+            json.dumps({"xp": xp, "streak": streak, "submissions": summary}, sort_keys=True),
+            f"report-{REPORT_PROMPT_VERSION}",
+        )
+        cached = generation_cache.get(cache_key)
+        if cached is not None:
+            return jsonify({"report": cached, "cached": True})
 
         prompt = f"""
 Generate a professional progress report for a user. Base it on the following data. You can add relevant emojis where appropriate, but keep it professional.
@@ -83,7 +87,7 @@ User Progress:
 - XP: {xp}
 - Streak: {streak}
 
-Challenge Submissions: {json.dumps(submissions)}
+Challenge Submissions (aggregated per doc, with sample answers): {json.dumps(summary)}
 
 Report should include:
 1) Technical Knowledge
@@ -91,32 +95,20 @@ Report should include:
 3) Strengths
 4) Areas Of Improvement
 5) Overall Analysis
-
-Return JSON:
-{{
-  "technical_knowledge": "...",
-  "communication_skills": "...",
-  "strengths": "...",
-  "areas_of_improvement": "...",
-  "overall_analysis": "..."
-}}
 """
 
-        response = requests.post(
-            f"{GEMINI_ENDPOINT}?key={GEMINI_API_KEY}",
-            headers={"Content-Type": "application/json"},
-            json={"contents": [{"parts": [{"text": prompt}]}]},
-            timeout=30
-        )
-
-        if response.status_code != 200:
-            return jsonify({"error": "Gemini API failed", "details": response.text}), 500
-
-        raw_text = response.json()["candidates"][0]["content"]["parts"][0]["text"]
-        parsed = extract_json_from_text(raw_text)
+        try:
+            with gemini_governor.request_context(gemini_governor.STANDARD, user_id):
+                parsed, errors = llm_response.generate_json(prompt, REPORT_SCHEMA)
+        except gemini_governor.Rejected as e:
+            return jsonify({"error": str(e)}), e.status_code, {"Retry-After": str(e.retry_after)}
+        except llm_response.LLMError as e:
+            return jsonify({"error": "Gemini API failed", "details": e.details}), 500
 
         if not parsed:
             return jsonify({"error": "Failed to parse Gemini response"}), 500
+        if errors:
+            print("⚠️ Report fields still invalid after repair:", errors)
 
         # Convert to Markdown
         markdown_report = f"""
@@ -138,7 +130,10 @@ Return JSON:
 {clean_text(parsed.get('overall_analysis', 'N/A'))}
 """
 
-        return jsonify({"report": markdown_report})
+        # A report with sections left as N/A is regenerated next time
+        if not errors:
+            generation_cache.put(cache_key, markdown_report)
+        return jsonify({"report": markdown_report, "cached": False})
 
     except Exception as e:
         import traceback
@@ -157,36 +152,21 @@ def download_report_pdf():
         if not report_text:
             return jsonify({"error": "Report text is required"}), 400
 
-        buffer = BytesIO()
-        c = canvas.Canvas(buffer, pagesize=A4)
-        width, height = A4
-
-        margin = 40
-        y = height - margin
-        font_size = 12
-        line_height = font_size + 4
-
-        c.setFont("Helvetica", font_size)
-
-        for line in report_text.split("\n"):
-            wrapped_lines = textwrap.wrap(line, width=95)
-            for wrapped_line in wrapped_lines:
-                if y <= margin:
-                    c.showPage()
-                    c.setFont("Helvetica", font_size)
-                    y = height - margin
-                c.drawString(margin, y, wrapped_line)
-                y -= line_height
-
-        c.save()
-        buffer.seek(0)
-
-        return send_file(
-            buffer,
-            as_attachment=True,
-            download_name="progress_report.pdf",
-            mimetype="application/pdf"
-        )
+        def send(pdf):
+            return send_file(
+                pdf,
+                as_attachment=True,
+                download_name="progress_report.pdf",
+                mimetype="application/pdf"
+            )
+
+        # Identical reports are served from the PDF cache without re-rendering
+        path, spool = pdf_report.get_pdf(report_text)
+        try:
+            return send(path or spool)
+        except FileNotFoundError:
+            # Pruned by another worker between the lookup and sending it
+            return send(pdf_report.get_pdf(report_text, use_cache=False)[1])
 
     except Exception as e:
         import traceback
@@ -1,41 +1,48 @@
 from flask import Blueprint, request, jsonify
-from appwrite.client import Client
-from appwrite.services.databases import Databases
 from appwrite.id import ID
+from services import xp_pipeline, evaluation_cache, challenge_store, gemini_governor, llm_response
+from services.appwrite_client import databases
+from concurrent.futures import ThreadPoolExecutor
 import os
-import requests
-import json
 import re
+import json
 
 submit_challenge_bp = Blueprint("submit_challenge", __name__)
 
-# Initialize Appwrite client
-client = Client()
-client.set_endpoint(os.getenv("APPWRITE_ENDPOINT"))
-client.set_project(os.getenv("APPWRITE_PROJECT_ID"))
-client.set_key(os.getenv("APPWRITE_API_KEY"))
-
-databases = Databases(client)
-
 DB_ID = os.getenv("APPWRITE_DATABASE_ID")
 DOCS_COLLECTION_ID = os.getenv("APPWRITE_DOCS_COLLECTION_ID")
 SUBMISSIONS_COLLECTION_ID = os.getenv("APPWRITE_SUMBMIT_CHALLENGE_COLLECTION_ID")
 PROGRESS_COLLECTION_ID = os.getenv("APPWRITE_USER_PROGRESS_COLLECTION_ID")
 
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-GEMINI_ENDPOINT = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash:generateContent"
+BATCH_MAX_ANSWERS = int(os.getenv("BATCH_MAX_ANSWERS", "10"))
+SUBMISSION_WRITE_WORKERS = 8
 
-BACKEND_URL = os.getenv("BACKEND_URL")
 
-
-def extract_json_from_text(text):
-    try:
-        match = re.search(r"\{.*\}", text, re.DOTALL)
-        if match:
-            return json.loads(match.group())
-    except Exception:
-        pass
-    return None
+GRADE_PROPERTIES = {
+    "success": {"type": "BOOLEAN"},
+    "feedback": {"type": "STRING"},
+    "xp": {"type": "INTEGER", "description": "0-10"},
+}
+EVALUATION_SCHEMA = {
+    "type": "OBJECT",
+    "properties": GRADE_PROPERTIES,
+    "required": list(GRADE_PROPERTIES),
+}
+BATCH_EVALUATION_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "results": {
+            "type": "ARRAY",
+            "items": {
+                "type": "OBJECT",
+                "properties": {"id": {"type": "STRING"}, **GRADE_PROPERTIES},
+                "required": ["id", *GRADE_PROPERTIES],
+            },
+            "minItems": 1,
+        },
+    },
+    "required": ["results"],
+}
 
 
 def clean_feedback(feedback_raw):
@@ -57,6 +64,48 @@ def clean_feedback(feedback_raw):
     return feedback_text or "No feedback provided."
 
 
+def parse_xp(xp_raw) -> int:
+    try:
+        return int(str(xp_raw or 0).strip())
+    except Exception:
+        return 0
+
+
+class EvaluationError(llm_response.LLMError):
+    pass
+
+
+def grade(result: dict) -> dict:
+    return {
+        "success": bool(result.get("success", False)),
+        "feedback": clean_feedback(result.get("feedback", "")),
+        "xp": parse_xp(result.get("xp", 0)),
+    }
+
+
+def evaluate_solution(challenge_text: str, user_solution: str) -> dict:
+    """Grades a solution with Gemini; returns {"success", "feedback", "xp"}."""
+    prompt = f"""
+Challenge:
+{challenge_text}
+
+User Solution:
+{user_solution}
+
+Please evaluate the user's solution: whether it succeeds, short feedback,
+and the XP earned (an integer from 0 to 10).
+"""
+
+    try:
+        result, errors = llm_response.generate_json(prompt, EVALUATION_SCHEMA)
+    except llm_response.LLMError as e:
+        raise EvaluationError("Gemini API failed", e.details)
+    # Raising keeps a failed grade out of the evaluation cache
+    if errors:
+        raise EvaluationError("Gemini returned an invalid evaluation", json.dumps(errors))
+    return grade(result)
+
+
 @submit_challenge_bp.route("/submit_challenge", methods=["POST"])
 def submit_challenge():
     try:
@@ -68,97 +117,268 @@ def submit_challenge():
         if not user_id or not doc_id or not user_solution:
             return jsonify({"error": "Missing required fields"}), 400
 
-        # 1) Fetch challenge text
-        challenge_doc = databases.get_document(DB_ID, DOCS_COLLECTION_ID, doc_id)
+        # 1) Fetch challenge text (title and challenges only)
+        challenge_doc = challenge_store.get(doc_id)
         challenge_text = challenge_doc.get("challenges", "")
         if not challenge_text:
             return jsonify({"error": "Challenge text not found"}), 404
 
-        # 2) Build Gemini prompt
-        prompt = f"""
-Challenge:
-{challenge_text}
-
-User Solution:
-{user_solution}
+        # 2) Grade with Gemini, reusing the result for an identical answer
+        #    to the same challenge text (or joining one already in flight)
+        cache_key = evaluation_cache.make_key(doc_id, challenge_text, user_solution)
+        try:
+            with gemini_governor.request_context(gemini_governor.INTERACTIVE, user_id):
+                evaluation, source = evaluation_cache.get_or_compute(
+                    cache_key, lambda: evaluate_solution(challenge_text, user_solution)
+                )
+        except gemini_governor.Rejected as e:
+            return jsonify({"error": str(e)}), e.status_code, {"Retry-After": str(e.retry_after)}
+        except EvaluationError as e:
+            return jsonify({"error": str(e), "details": e.details}), 500
 
-Please evaluate the user's solution.
-Respond in the format:
-{{
-  "success": true/false,
-  "feedback": "<short feedback text>",
-  "xp": <integer 0-10>
-}}
-"""
+        success = evaluation["success"]
+        feedback = evaluation["feedback"]
 
-        # 3) Call Gemini API
-        response = requests.post(
-            f"{GEMINI_ENDPOINT}?key={GEMINI_API_KEY}",
-            headers={"Content-Type": "application/json"},
-            json={"contents": [{"parts": [{"text": prompt}]}]},
-            timeout=30
-        )
-
-        if response.status_code != 200:
-            return jsonify({"error": "Gemini API failed", "details": response.text}), 500
-
-        gemini_result = response.json()
-        raw_text = gemini_result["candidates"][0]["content"]["parts"][0]["text"]
-
-        # 4) Extract JSON safely
-        parsed = extract_json_from_text(raw_text)
-        if parsed:
-            success = parsed.get("success", False)
-            xp_raw = parsed.get("xp", 0) or 0
-            try:
-                xp_awarded = int(str(xp_raw).strip())
-            except Exception:
-                xp_awarded = 0
-            feedback = clean_feedback(parsed)
-        else:
-            success = False
+        # 3) A user only earns a given answer's XP once
+        xp_awarded = evaluation["xp"]
+        already_awarded = xp_awarded > 0 and not evaluation_cache.claim_award(cache_key, str(user_id))
+        if already_awarded:
             xp_awarded = 0
-            feedback = clean_feedback(raw_text)
 
-        print(f"DEBUG: XP to save: {xp_awarded} Type: {type(xp_awarded)}")
-        print(f"DEBUG: Feedback type: {type(feedback)}")
+        # 4) Save submission in Appwrite; if it isn't saved the XP isn't
+        #    paid either, so the claim is released for the next attempt
+        try:
+            databases.create_document(
+                DB_ID,
+                SUBMISSIONS_COLLECTION_ID,
+                ID.unique(),
+                {
+                    "user_id": str(user_id),
+                    "doc_id": str(doc_id),
+                    "user_solution": str(user_solution),
+                    "feedback": str(feedback),
+                    "xp_awarded": int(xp_awarded)
+                }
+            )
+        except Exception:
+            if xp_awarded > 0:
+                evaluation_cache.release_award(cache_key, str(user_id))
+            raise
 
-        # 5) Save submission in Appwrite
-        databases.create_document(
-            DB_ID,
-            SUBMISSIONS_COLLECTION_ID,
-            ID.unique(),
-            {
-                "user_id": str(user_id),
-                "doc_id": str(doc_id),
-                "user_solution": str(user_solution),
-                "feedback": str(feedback),
-                "xp_awarded": int(xp_awarded)
-            }
-        )
-
-        # 6) Update user progress using update_progress route
+        # 5) Update user progress (queued; applied in the background)
         if xp_awarded > 0:
             try:
-                requests.post(
-                    f"{BACKEND_URL}/api/update_progress",
-                    json={
-                        "user_id": user_id,
-                        "xp_earned": xp_awarded,
-                        "challenge_title": challenge_doc.get("title", "a challenge")
-                    },
-                    timeout=10
+                xp_pipeline.award(
+                    user_id,
+                    xp_awarded,
+                    challenge_doc.get("title", "a challenge")
                 )
             except Exception as e:
-                print("Failed to call /update_progress:", str(e))
+                evaluation_cache.release_award(cache_key, str(user_id))
+                print("Failed to update progress:", str(e))
 
         return jsonify({
             "feedback": str(feedback),
             "xp_awarded": int(xp_awarded),
-            "success": bool(success)
+            "success": bool(success),
+            "cached": source != evaluation_cache.COMPUTED,
+            "already_awarded": already_awarded
         }), 200
 
     except Exception as e:
         import traceback
         traceback.print_exc()  
         return jsonify({"error": str(e)}), 500
+
+
+def answer_id(raw, items: dict):
+    """
+    Maps the id Gemini echoed back to one of `items`' ids (numeric strings),
+    tolerating forms like " 0", "Answer 0", "answer_0" or "01". None if unknown.
+    """
+    text = str(raw).strip()
+    if text in items:
+        return text
+    digits = re.findall(r"\d+", text)
+    if len(digits) == 1 and str(int(digits[0])) in items:
+        return str(int(digits[0]))
+    return None
+
+
+def evaluate_batch(items: dict, retry_missing=True) -> dict:
+    """
+    Grades several answers in one Gemini call. `items` maps an answer id to
+    (challenge_text, user_solution); returns answer id -> {"success",
+    "feedback", "xp"} for every answer Gemini returned a grade for.
+    Answers missing from the reply are asked for once more, on their own.
+    """
+    blocks = "\n\n".join(
+        f"### Answer {item_id}\nChallenge:\n{challenge_text}\n\nUser Solution:\n{user_solution}"
+        for item_id, (challenge_text, user_solution) in items.items()
+    )
+    prompt = f"""
+Evaluate each of the following user solutions independently.
+
+{blocks}
+
+Give one result per answer, with the answer's number as its id (e.g. "0"), whether it succeeds,
+short feedback, and the XP earned (an integer from 0 to 10).
+"""
+
+    try:
+        parsed, errors = llm_response.generate_json(prompt, BATCH_EVALUATION_SCHEMA)
+    except llm_response.LLMError as e:
+        raise EvaluationError("Gemini API failed", e.details)
+    if errors:
+        raise EvaluationError("Gemini returned an invalid evaluation", json.dumps(errors))
+
+    # Results that failed validation were already dropped by generate_json;
+    # their answers come back ungraded and are never cached
+    graded = {}
+    for result in parsed.get("results", []):
+        item_id = answer_id(result["id"], items)
+        if item_id is not None and item_id not in graded:
+            graded[item_id] = grade(result)
+
+    missing = {item_id: item for item_id, item in items.items() if item_id not in graded}
+    if missing and graded and retry_missing:
+        try:
+            graded.update(evaluate_batch(missing, retry_missing=False))
+        except EvaluationError as e:
+            # The answers graded so far still count; the rest come back ungraded
+            print("⚠️ Retry for ungraded answers failed:", e)
+    return graded
+
+
+def save_submissions(records: list):
+    """Writes all submission records concurrently, in one pass."""
+    def create(record):
+        databases.create_document(DB_ID, SUBMISSIONS_COLLECTION_ID, ID.unique(), record)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(SUBMISSION_WRITE_WORKERS, len(records)))) as pool:
+        list(pool.map(create, records))
+
+
+@submit_challenge_bp.route("/submit_challenges_batch", methods=["POST"])
+def submit_challenges_batch():
+    """
+    Grades several answers (possibly for different docs) together.
+    Body: {"user_id", "answers": [{"doc_id", "user_solution"}, ...]}
+    """
+    try:
+        data = request.json
+        user_id = data.get("user_id")
+        answers = data.get("answers")
+
+        if not user_id or not isinstance(answers, list) or not answers:
+            return jsonify({"error": "user_id and a non-empty answers list are required"}), 400
+        if len(answers) > BATCH_MAX_ANSWERS:
+            return jsonify({"error": f"At most {BATCH_MAX_ANSWERS} answers per batch"}), 400
+        if not all(isinstance(a, dict) and a.get("doc_id") and a.get("user_solution") for a in answers):
+            return jsonify({"error": "Each answer needs doc_id and user_solution"}), 400
+
+        # 1) Fetch challenge text for each doc involved
+        docs = {doc_id: challenge_store.get(doc_id) for doc_id in {a["doc_id"] for a in answers}}
+        missing = [doc_id for doc_id, doc in docs.items() if not doc.get("challenges")]
+        if missing:
+            return jsonify({"error": "Challenge text not found", "doc_ids": missing}), 404
+
+        # 2) Reuse cached grades; grade everything else in one Gemini call
+        keys = [
+            evaluation_cache.make_key(a["doc_id"], docs[a["doc_id"]]["challenges"], a["user_solution"])
+            for a in answers
+        ]
+        evaluations, cached, pending = {}, set(), {}
+        for i, (answer, key) in enumerate(zip(answers, keys)):
+            if key in evaluations or key in pending:
+                continue
+            hit = evaluation_cache.get(key)
+            if hit is not None:
+                evaluations[key] = hit
+                cached.add(key)
+            else:
+                pending[key] = str(i)
+
+        if pending:
+            try:
+                with gemini_governor.request_context(gemini_governor.INTERACTIVE, user_id):
+                    graded = evaluate_batch({
+                        pending[key]: (docs[answers[int(pending[key])]["doc_id"]]["challenges"],
+                                       answers[int(pending[key])]["user_solution"])
+                        for key in pending
+                    })
+            except gemini_governor.Rejected as e:
+                return jsonify({"error": str(e)}), e.status_code, {"Retry-After": str(e.retry_after)}
+            except EvaluationError as e:
+                return jsonify({"error": str(e), "details": e.details}), 500
+            for key, item_id in pending.items():
+                if item_id in graded:
+                    evaluation_cache.put(key, graded[item_id])
+                    evaluations[key] = graded[item_id]
+
+        # 3) Per-answer results; a user only earns a given answer's XP once
+        results, records, titles, claimed = [], [], [], []
+        total_xp = 0
+        for answer, key in zip(answers, keys):
+            doc_id = answer["doc_id"]
+            evaluation = evaluations.get(key)
+            if evaluation is None:
+                results.append({"doc_id": doc_id, "error": "Answer was not graded, please resubmit",
+                                "success": False, "xp_awarded": 0})
+                continue
+
+            xp_awarded = evaluation["xp"]
+            already_awarded = xp_awarded > 0 and not evaluation_cache.claim_award(key, str(user_id))
+            if already_awarded:
+                xp_awarded = 0
+            elif xp_awarded > 0:
+                claimed.append(key)
+
+            results.append({
+                "doc_id": doc_id,
+                "feedback": str(evaluation["feedback"]),
+                "xp_awarded": int(xp_awarded),
+                "success": bool(evaluation["success"]),
+                "cached": key in cached,
+                "already_awarded": already_awarded,
+            })
+            records.append({
+                "user_id": str(user_id),
+                "doc_id": str(doc_id),
+                "user_solution": str(answer["user_solution"]),
+                "feedback": str(evaluation["feedback"]),
+                "xp_awarded": int(xp_awarded),
+            })
+            if xp_awarded > 0:
+                total_xp += xp_awarded
+                titles.append(docs[doc_id].get("title") or "a challenge")
+
+        def release_claims():
+            for key in claimed:
+                evaluation_cache.release_award(key, str(user_id))
+
+        # 4) Save all submissions; unsaved answers keep their XP claimable
+        if records:
+            try:
+                save_submissions(records)
+            except Exception:
+                release_claims()
+                raise
+
+        # 5) One combined progress update (queued; applied in the background)
+        if total_xp > 0:
+            awarded_count = len(titles)
+            titles = list(dict.fromkeys(titles))
+            title = titles[0] if awarded_count == 1 else f"{awarded_count} challenges ({', '.join(titles)})"
+            try:
+                xp_pipeline.award(user_id, total_xp, title)
+            except Exception as e:
+                release_claims()
+                print("Failed to update progress:", str(e))
+
+        return jsonify({"results": results, "xp_awarded": int(total_xp)}), 200
+
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
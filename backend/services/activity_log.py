@@ -0,0 +1,105 @@
+# User activity history
+#
+# The progress document only keeps the newest ACTIVITY_RING_SIZE entries, a
+# bounded ring buffer that get_progress can serve without a separate query.
+# The full history is appended to its own collection
+# (APPWRITE_ACTIVITIES_COLLECTION_ID: userId, message, badges[], timestamp,
+# indexed on userId + timestamp) and paged with cursors. If that collection
+# isn't configured, only the ring buffer is kept.
+import os
+import json
+from appwrite.id import ID
+from appwrite.query import Query
+from appwrite.permission import Permission
+from appwrite.role import Role
+from services.appwrite_client import databases
+
+DATABASE_ID = os.getenv("APPWRITE_DATABASE_ID")
+ACTIVITIES_COLLECTION_ID = os.getenv("APPWRITE_ACTIVITIES_COLLECTION_ID")
+ACTIVITY_RING_SIZE = int(os.getenv("ACTIVITY_RING_SIZE", "10"))
+
+
+def _load(raw):
+    if isinstance(raw, str):
+        try:
+            raw = json.loads(raw)
+        except Exception:
+            return []
+    return raw or []
+
+
+def _parse(entry):
+    if isinstance(entry, str):
+        try:
+            return json.loads(entry)
+        except Exception:
+            return None
+    return entry
+
+
+def push_recent(raw_activities, activity: dict) -> list:
+    """Appends to the ring buffer stored on the progress doc and drops the oldest entries."""
+    activities = list(_load(raw_activities))
+    activities.append(json.dumps(activity))
+    return activities[-ACTIVITY_RING_SIZE:]
+
+
+def recent(raw_activities, limit: int = ACTIVITY_RING_SIZE) -> list:
+    """Newest-first activities from the progress doc, parsing only its tail."""
+    # Entries are appended in time order, so older (possibly unbounded,
+    # pre-ring-buffer) arrays never need to be parsed in full
+    tail = [_parse(a) for a in _load(raw_activities)[-limit:]]
+    tail = [a for a in tail if a]
+    return sorted(tail, key=lambda a: a.get("timestamp", 0), reverse=True)
+
+
+def append(user_id: str, activity: dict):
+    if not ACTIVITIES_COLLECTION_ID:
+        return
+    databases.create_document(
+        database_id=DATABASE_ID,
+        collection_id=ACTIVITIES_COLLECTION_ID,
+        document_id=ID.unique(),
+        data={
+            "userId": user_id,
+            "message": activity["message"],
+            "badges": activity["badges"],
+            "timestamp": activity["timestamp"],
+        },
+        permissions=[Permission.read(Role.user(user_id))],
+    )
+
+
+def page(user_id: str, limit: int, cursor: str = None, raw_activities=None):
+    """
+    Returns (activities, next_cursor), newest first.
+    Without the activities collection, falls back to the ring buffer.
+    """
+    if not ACTIVITIES_COLLECTION_ID:
+        return recent(raw_activities, limit), None
+
+    queries = [
+        Query.equal("userId", user_id),
+        Query.order_desc("timestamp"),
+        Query.limit(limit),
+    ]
+    if cursor:
+        queries.append(Query.cursor_after(cursor))
+
+    docs = databases.list_documents(
+        database_id=DATABASE_ID,
+        collection_id=ACTIVITIES_COLLECTION_ID,
+        queries=queries,
+    ).get("documents", [])
+
+    activities = [
+        {
+            "$id": doc["$id"],
+            "message": doc.get("message", ""),
+            "badges": doc.get("badges", []),
+            "timestamp": doc.get("timestamp", 0),
+        }
+        for doc in docs
+    ]
+    next_cursor = docs[-1]["$id"] if len(docs) == limit else None
+    return activities, next_cursor
@@ -1,20 +1,105 @@
 # Appwrite client setup
+#
+# One Client per process, shared by every route. The SDK issues each call
+# through `requests.request`, which opens a fresh connection every time, so
+# calls are routed through a pooled keep-alive session instead. The session
+# is created lazily and rebuilt after a fork, so gunicorn workers never
+# share sockets inherited from the master.
 import os
+import time
+import threading
+import requests
+import appwrite.client
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
 from appwrite.client import Client
 from appwrite.services.users import Users
 from appwrite.services.databases import Databases
 from appwrite.services.storage import Storage
 
-client = Client()
 load_dotenv()
 
+APPWRITE_POOL_MAXSIZE = int(os.getenv("APPWRITE_POOL_MAXSIZE", "20"))
+APPWRITE_TIMEOUT = (
+    float(os.getenv("APPWRITE_CONNECT_TIMEOUT", "5")),
+    float(os.getenv("APPWRITE_READ_TIMEOUT", "30")),
+)
+APPWRITE_SLOW_CALL_MS = float(os.getenv("APPWRITE_SLOW_CALL_MS", "1000"))
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+_latency_hooks = []
+
+
+def get_session():
+    """Returns this process' pooled session, creating it on first use after a fork."""
+    global _session, _session_pid
+    pid = os.getpid()
+    if _session is None or _session_pid != pid:
+        with _session_lock:
+            if _session is None or _session_pid != pid:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=APPWRITE_POOL_MAXSIZE)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _session, _session_pid = session, pid
+    return _session
+
+
+class _PooledRequests:
+    """Stands in for `requests` inside appwrite.client so SDK calls use the pooled session."""
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", APPWRITE_TIMEOUT)
+        return get_session().request(method, url, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(requests, name)
+
+
+appwrite.client.requests = _PooledRequests()
+
+
+def add_latency_hook(hook):
+    """Registers `hook(method, path, seconds, error)`, called after every Appwrite call."""
+    _latency_hooks.append(hook)
+
+
+def log_slow_calls(method, path, seconds, error):
+    if seconds * 1000 >= APPWRITE_SLOW_CALL_MS:
+        print(f"⚠️ Slow Appwrite call: {method.upper()} {path} took {seconds * 1000:.0f} ms")
+
+
+add_latency_hook(log_slow_calls)
+
+
+class RegistryClient(Client):
+    def call(self, method, path='', headers=None, params=None, response_type='json'):
+        start = time.perf_counter()
+        error = None
+        try:
+            return super().call(method, path, headers, params, response_type)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            for hook in _latency_hooks:
+                try:
+                    hook(method, path, elapsed, error)
+                except Exception as e:
+                    print("Appwrite latency hook error:", e)
+
+
+client = RegistryClient()
+
 (client
-    .set_endpoint(os.getenv("APPWRITE_ENDPOINT"))  
+    .set_endpoint(os.getenv("APPWRITE_ENDPOINT"))
     .set_project(os.getenv("APPWRITE_PROJECT_ID"))
-    .set_key(os.getenv("APPWRITE_API_KEY"))  
+    .set_key(os.getenv("APPWRITE_API_KEY"))
 )
 
 users = Users(client)
 databases = Databases(client)
-storage = Storage(client)  
\ No newline at end of file
+storage = Storage(client)
@@ -0,0 +1,57 @@
+# Challenge lookups for grading, projected and cached per doc
+#
+# Grading only needs a doc's title and challenge text (and ownership checks
+# its creator), so only those attributes are fetched (Query.select) instead of the whole record with
+# its up-to-1 MB `text`. Results are kept in an in-process LRU; routes
+# that rewrite or delete a doc call invalidate(), and the TTL bounds how
+# long another worker's copy can lag behind.
+import os
+import time
+import threading
+from collections import OrderedDict
+from appwrite.query import Query
+from services.appwrite_client import databases
+
+DATABASE_ID = os.getenv("APPWRITE_DATABASE_ID")
+DOCS_COLLECTION_ID = os.getenv("APPWRITE_DOCS_COLLECTION_ID")
+CHALLENGE_CACHE_MAX_ENTRIES = int(os.getenv("CHALLENGE_CACHE_MAX_ENTRIES", "1024"))
+CHALLENGE_CACHE_TTL = int(os.getenv("CHALLENGE_CACHE_TTL", "300"))
+
+CHALLENGE_FIELDS = ["title", "challenges", "createdBy"]
+
+_lock = threading.Lock()
+_entries = OrderedDict()   # doc_id -> (stored_at, challenge dict)
+
+
+def get(doc_id: str) -> dict:
+    """Returns {"$id", "title", "challenges", "createdBy"} for a doc."""
+    with _lock:
+        cached = _entries.get(doc_id)
+        if cached and time.time() - cached[0] <= CHALLENGE_CACHE_TTL:
+            _entries.move_to_end(doc_id)
+            return cached[1]
+
+    doc = databases.get_document(
+        DATABASE_ID,
+        DOCS_COLLECTION_ID,
+        doc_id,
+        queries=[Query.select(CHALLENGE_FIELDS + ["$id"])],
+    )
+    challenge = {
+        "$id": doc.get("$id", doc_id),
+        "title": doc.get("title"),
+        "challenges": doc.get("challenges", ""),
+        "createdBy": doc.get("createdBy"),
+    }
+
+    with _lock:
+        _entries[doc_id] = (time.time(), challenge)
+        _entries.move_to_end(doc_id)
+        while len(_entries) > CHALLENGE_CACHE_MAX_ENTRIES:
+            _entries.popitem(last=False)
+    return challenge
+
+
+def invalidate(doc_id: str):
+    with _lock:
+        _entries.pop(doc_id, None)
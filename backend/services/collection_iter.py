@@ -0,0 +1,61 @@
+# Lazy, cursor-paginated iteration over Appwrite collections
+import os
+from concurrent.futures import ThreadPoolExecutor
+from appwrite.query import Query
+from services.appwrite_client import databases
+
+DATABASE_ID = os.getenv("APPWRITE_DATABASE_ID")
+PAGE_SIZE = int(os.getenv("APPWRITE_PAGE_SIZE", "100"))
+
+_prefetch_pool = ThreadPoolExecutor(
+    max_workers=int(os.getenv("APPWRITE_PREFETCH_WORKERS", "8")),
+    thread_name_prefix="appwrite-prefetch",
+)
+
+
+def iter_documents(collection_id, queries=None, select=None, page_size=PAGE_SIZE,
+                   database_id=None, prefetch=True):
+    """
+    Yields every document matching `queries`, one page at a time.
+
+    Pages are walked with Query.cursorAfter, so results are never capped at
+    the server's default page size. While the caller works through one
+    page, the next is fetched in the background. `select` limits the
+    attributes returned.
+
+    Don't delete documents while iterating; the cursor document may vanish.
+    Collect the ids first instead.
+    """
+    database_id = database_id or DATABASE_ID
+    base_queries = list(queries or [])
+    if select:
+        fields = list(select)
+        if "$id" not in fields:
+            fields.append("$id")
+        base_queries.append(Query.select(fields))
+
+    def fetch(cursor):
+        page_queries = base_queries + [Query.limit(page_size)]
+        if cursor:
+            page_queries.append(Query.cursor_after(cursor))
+        return databases.list_documents(
+            database_id=database_id,
+            collection_id=collection_id,
+            queries=page_queries,
+        ).get("documents", [])
+
+    page = fetch(None)
+    while page:
+        next_page = None
+        if len(page) == page_size:
+            if prefetch:
+                next_page = _prefetch_pool.submit(fetch, page[-1]["$id"])
+            else:
+                next_page = page[-1]["$id"]
+
+        for doc in page:
+            yield doc
+
+        if next_page is None:
+            return
+        page = next_page.result() if prefetch else fetch(next_page)
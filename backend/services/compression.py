@@ -0,0 +1,85 @@
+# Response compression and ETag revalidation, applied app-wide in app.py
+#
+# Bodies of at least COMPRESS_MIN_BYTES with a compressible mimetype are
+# sent as brotli or gzip, whichever the client prefers (brotli only if the
+# `brotli` package is installed). GET/HEAD responses get a strong ETag over
+# the payload, suffixed with the content coding so each encoded variant has
+# its own validator, and a matching If-None-Match is answered with 304.
+# Streamed responses (SSE, send_file) are left untouched.
+import os
+import gzip
+import hashlib
+from flask import request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
+
+COMPRESSIBLE_MIMETYPES = frozenset([
+    "application/json",
+    "application/javascript",
+    "text/plain",
+    "text/html",
+    "text/css",
+    "text/csv",
+])
+
+
+def _encoders():
+    encoders = {}
+    if brotli is not None:
+        encoders["br"] = lambda body: brotli.compress(body, quality=BROTLI_QUALITY)
+    encoders["gzip"] = lambda body: gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    return encoders
+
+
+ENCODERS = _encoders()
+
+
+def negotiate_encoding(accept_encodings, body_size: int, mimetype: str):
+    """Returns the content coding to use ("br", "gzip") or None for identity."""
+    if body_size < COMPRESS_MIN_BYTES or mimetype not in COMPRESSIBLE_MIMETYPES:
+        return None
+    return accept_encodings.best_match(list(ENCODERS))
+
+
+def make_etag(body: bytes, encoding=None) -> str:
+    digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+    return f"{digest}-{encoding}" if encoding else digest
+
+
+def finalize_response(response):
+    """after_request hook: ETag/304 for GET and HEAD, then compression."""
+    if (
+        response.direct_passthrough
+        or response.is_streamed
+        or response.mimetype == "text/event-stream"
+        or "Content-Encoding" in response.headers
+        or response.status_code != 200
+    ):
+        return response
+
+    body = response.get_data()
+    encoding = negotiate_encoding(request.accept_encodings, len(body), response.mimetype)
+    if response.mimetype in COMPRESSIBLE_MIMETYPES:
+        response.vary.add("Accept-Encoding")
+
+    if request.method in ("GET", "HEAD"):
+        etag = make_etag(body, encoding)
+        response.set_etag(etag)
+        if request.if_none_match.contains(etag) or request.if_none_match.star_tag:
+            response.status_code = 304
+            response.set_data(b"")
+            response.headers.pop("Content-Length", None)
+            return response
+
+    if encoding:
+        response.set_data(ENCODERS[encoding](body))
+        response.headers["Content-Encoding"] = encoding
+
+    return response
@@ -0,0 +1,53 @@
+# Splits long documentation text into chunks on structural boundaries
+import re
+
+# (pattern, joiner) pairs, coarsest boundary first: markdown headings,
+# paragraphs, lines, sentences, then any whitespace.
+SEPARATORS = [
+    (r"\n(?=#{1,6}\s)", "\n\n"),
+    (r"\n\s*\n", "\n\n"),
+    (r"\n", "\n"),
+    (r"(?<=[.!?])\s+", " "),
+    (r"\s+", " "),
+]
+
+
+def split_document(text: str, max_chars: int, separators=SEPARATORS) -> list:
+    """
+    Returns chunks of at most `max_chars`, cutting on the coarsest boundary
+    that exists in the text. Falls back to hard cuts only when a single
+    run of text has no boundary at all.
+    """
+    text = text.strip()
+    if not text:
+        return []
+    if len(text) <= max_chars:
+        return [text]
+
+    for level, (sep, joiner) in enumerate(separators):
+        pieces = [p.strip() for p in re.split(sep, text) if p.strip()]
+        if len(pieces) > 1:
+            break
+    else:
+        return [text[i:i + max_chars] for i in range(0, len(text), max_chars)]
+
+    chunks = []
+    current = ""
+    for piece in pieces:
+        if len(piece) > max_chars:
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.extend(split_document(piece, max_chars, separators[level + 1:]))
+            continue
+
+        candidate = f"{current}{joiner}{piece}" if current else piece
+        if len(candidate) > max_chars:
+            chunks.append(current)
+            current = piece
+        else:
+            current = candidate
+
+    if current:
+        chunks.append(current)
+    return chunks
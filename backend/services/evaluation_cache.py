@@ -0,0 +1,140 @@
+# In-process cache of challenge grading results, with single-flight
+#
+# Keyed by (doc_id, hash of the challenge text, hash of the whitespace-
+# normalized solution), so a regenerated challenge never reuses old grades.
+# Concurrent identical submissions share one in-flight Gemini call. Each
+# entry also remembers which users were already given its XP, so resending
+# the same answer doesn't pay out again while the entry is alive.
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from services.generation_cache import normalize_text
+
+EVAL_CACHE_TTL = int(os.getenv("EVAL_CACHE_TTL", str(24 * 3600)))
+EVAL_CACHE_MAX_ENTRIES = int(os.getenv("EVAL_CACHE_MAX_ENTRIES", "2048"))
+
+# How a result was obtained
+COMPUTED = "computed"
+CACHED = "cached"
+SHARED = "shared"   # joined an identical in-flight evaluation
+
+_lock = threading.Lock()
+_entries = OrderedDict()   # key -> {"result", "stored_at", "awarded": set of user ids}
+_inflight = {}             # key -> Future
+_stats = {"hits": 0, "misses": 0, "shared": 0}
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def make_key(doc_id: str, challenge_text: str, user_solution: str) -> str:
+    return f"{doc_id}:{_digest(challenge_text)}:{_digest(normalize_text(user_solution))}"
+
+
+def _live_entry(key: str):
+    entry = _entries.get(key)
+    if entry is None:
+        return None
+    if time.time() - entry["stored_at"] > EVAL_CACHE_TTL:
+        del _entries[key]
+        return None
+    _entries.move_to_end(key)
+    return entry
+
+
+def _store(key: str, result):
+    # Caller holds _lock; keeps award claims if the entry is being refreshed
+    entry = _entries.get(key)
+    awarded = entry["awarded"] if entry else set()
+    _entries[key] = {"result": result, "stored_at": time.time(), "awarded": awarded}
+    _entries.move_to_end(key)
+    while len(_entries) > EVAL_CACHE_MAX_ENTRIES:
+        _entries.popitem(last=False)
+
+
+def get(key: str):
+    """Cached result for `key`, or None. Doesn't join in-flight evaluations."""
+    with _lock:
+        entry = _live_entry(key)
+        if entry is None:
+            _stats["misses"] += 1
+            return None
+        _stats["hits"] += 1
+        return entry["result"]
+
+
+def put(key: str, result):
+    with _lock:
+        _store(key, result)
+
+
+def get_or_compute(key: str, compute):
+    """
+    Returns (result, source). `compute()` runs at most once at a time per
+    key; callers arriving meanwhile wait for and share its result.
+    Exceptions are propagated to every waiter and nothing is cached.
+    """
+    with _lock:
+        entry = _live_entry(key)
+        if entry is not None:
+            _stats["hits"] += 1
+            return entry["result"], CACHED
+        future = _inflight.get(key)
+        leader = future is None
+        if leader:
+            future = _inflight[key] = Future()
+            _stats["misses"] += 1
+        else:
+            _stats["shared"] += 1
+
+    if not leader:
+        return future.result(), SHARED
+
+    try:
+        result = compute()
+    except Exception as e:
+        with _lock:
+            _inflight.pop(key, None)
+        future.set_exception(e)
+        raise
+
+    with _lock:
+        _store(key, result)
+        _inflight.pop(key, None)
+    future.set_result(result)
+    return result, COMPUTED
+
+
+def claim_award(key: str, user_id: str) -> bool:
+    """True the first time `user_id` claims XP for this entry, False after that."""
+    with _lock:
+        entry = _entries.get(key)
+        if entry is None:
+            return True
+        if user_id in entry["awarded"]:
+            return False
+        entry["awarded"].add(user_id)
+        return True
+
+
+def release_award(key: str, user_id: str):
+    """Undoes claim_award, e.g. when saving the submission or queueing the XP failed."""
+    with _lock:
+        entry = _entries.get(key)
+        if entry is not None:
+            entry["awarded"].discard(user_id)
+
+
+def stats() -> dict:
+    with _lock:
+        total = _stats["hits"] + _stats["misses"] + _stats["shared"]
+        return {
+            **_stats,
+            "entries": len(_entries),
+            "in_flight": len(_inflight),
+            "hit_rate": round((_stats["hits"] + _stats["shared"]) / total, 3) if total else 0.0,
+        }
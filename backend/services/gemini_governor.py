@@ -0,0 +1,259 @@
+# Admission control for Gemini calls
+#
+# Every Gemini request passes through admit(). A process-wide token bucket
+# (GEMINI_RATE_PER_SEC, GEMINI_BURST) and an in-flight cap bound the load
+# we send upstream. Waiting callers are served by priority class, so a
+# user's grading request overtakes queued bulk generation. Each user also
+# has their own bucket, so one heavy user can't take the whole budget.
+# The user's bucket is charged once per user-facing request: fan-out under
+# it (map chunks, parallel sections, repairs) draws only on the global
+# bucket, so a long document isn't rejected halfway through its own work.
+# Queues are bounded per class and waits time out quickly; rejected
+# callers get a Retry-After hint. Limits are per worker process, so size
+# GEMINI_RATE_PER_SEC as the upstream quota divided by the worker count.
+#
+# Routes declare who is calling with request_context(priority, user_id);
+# code deeper down (call_gemini and friends) just calls admit(). Work
+# handed to a thread pool keeps the caller's context (including the
+# request's latency budget) via bind().
+import os
+import math
+import time
+import heapq
+import itertools
+import threading
+import contextvars
+from collections import OrderedDict
+from contextlib import contextmanager
+from services import resilience
+
+INTERACTIVE = 0   # a user is waiting on the answer (challenge grading)
+STANDARD = 1      # user-initiated but heavier (reports)
+BULK = 2          # content generation, background jobs
+PRIORITY_NAMES = {INTERACTIVE: "interactive", STANDARD: "standard", BULK: "bulk"}
+
+GEMINI_RATE_PER_SEC = float(os.getenv("GEMINI_RATE_PER_SEC", "5"))
+GEMINI_BURST = float(os.getenv("GEMINI_BURST", "10"))
+GEMINI_MAX_IN_FLIGHT = int(os.getenv("GEMINI_MAX_IN_FLIGHT", "16"))
+GEMINI_USER_RATE_PER_MIN = float(os.getenv("GEMINI_USER_RATE_PER_MIN", "30"))
+GEMINI_USER_BURST = float(os.getenv("GEMINI_USER_BURST", "20"))
+GEMINI_QUEUE_MAX = int(os.getenv("GEMINI_QUEUE_MAX", "50"))
+QUEUE_TIMEOUTS = {
+    INTERACTIVE: float(os.getenv("GEMINI_QUEUE_TIMEOUT_INTERACTIVE", "5")),
+    STANDARD: float(os.getenv("GEMINI_QUEUE_TIMEOUT_STANDARD", "10")),
+    BULK: float(os.getenv("GEMINI_QUEUE_TIMEOUT_BULK", "20")),
+}
+MAX_TRACKED_USERS = 10000
+
+
+class Rejected(Exception):
+    status_code = 503
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = max(1, int(math.ceil(retry_after)))
+
+
+class Overloaded(Rejected):
+    status_code = 503
+
+
+class QuotaExceeded(Rejected):
+    status_code = 429
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now) -> float:
+        """Seconds until a token is available (0 if one is available now)."""
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self, now):
+        self._refill(now)
+        self.tokens -= 1
+
+    def refund(self):
+        self.tokens = min(self.burst, self.tokens + 1)
+
+
+class _Caller:
+    """Who a request's Gemini calls are attributed to; shared by its fan-out via bind()."""
+
+    def __init__(self, priority, user_id):
+        self.priority = priority
+        self.user_id = user_id
+        self.charged = False   # the user's bucket has paid for this request
+
+
+_context = contextvars.ContextVar("gemini_caller", default=_Caller(BULK, None))
+
+_cond = threading.Condition()
+_bucket = TokenBucket(GEMINI_RATE_PER_SEC, GEMINI_BURST)
+_user_buckets = OrderedDict()
+_waiters = []           # heap of [priority, seq]
+_queued = {p: 0 for p in PRIORITY_NAMES}
+_in_flight = 0
+_seq = itertools.count()
+_metrics = {
+    p: {"admitted": 0, "rejected_queue_full": 0, "rejected_timeout": 0,
+        "rejected_quota": 0, "wait_seconds_total": 0.0, "wait_seconds_max": 0.0}
+    for p in PRIORITY_NAMES
+}
+
+
+@contextmanager
+def request_context(priority: int, user_id=None):
+    """Attributes Gemini calls made inside the block to `user_id` at `priority`."""
+    token = _context.set(_Caller(priority, user_id))
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+def bind(fn):
+    """Wraps `fn` so it runs with the current caller context, e.g. on a thread pool."""
+    context = contextvars.copy_context()
+
+    def bound(*args, **kwargs):
+        # Each call gets its own copy; a Context can't be entered by two threads at once
+        return context.copy().run(fn, *args, **kwargs)
+    return bound
+
+
+def _user_bucket(user_id):
+    bucket = _user_buckets.get(user_id)
+    if bucket is None:
+        bucket = _user_buckets[user_id] = TokenBucket(GEMINI_USER_RATE_PER_MIN / 60, GEMINI_USER_BURST)
+        while len(_user_buckets) > MAX_TRACKED_USERS:
+            _user_buckets.popitem(last=False)
+    _user_buckets.move_to_end(user_id)
+    return bucket
+
+
+def _queue_retry_after() -> float:
+    return (len(_waiters) + 1) / GEMINI_RATE_PER_SEC
+
+
+def _refund(caller, user_bucket):
+    # Called with _cond held; the request's next call pays for it instead
+    if user_bucket is not None:
+        user_bucket.refund()
+        caller.charged = False
+
+
+def _acquire(caller):
+    global _in_flight
+    priority = caller.priority
+    metrics = _metrics[priority]
+    start = time.monotonic()
+    timeout = QUEUE_TIMEOUTS[priority]
+    budget_left = resilience.remaining()
+    if budget_left is not None:
+        timeout = min(timeout, budget_left)
+    deadline = start + timeout
+
+    user_bucket = None
+    user_wait = 0.0
+    with _cond:
+        if caller.user_id and not caller.charged:
+            user_bucket = _user_bucket(caller.user_id)
+            # A short wait for the user's own refill is fine; a long one is a quota rejection
+            user_wait = user_bucket.wait_time(start)
+            if user_wait > timeout:
+                metrics["rejected_quota"] += 1
+                raise QuotaExceeded("Too many AI requests, please slow down", user_wait)
+            user_bucket.take(start)
+            caller.charged = True
+    # Wait outside the queue so a throttled user never holds up the head of it
+    if user_wait > 0:
+        time.sleep(user_wait)
+
+    with _cond:
+        if _queued[priority] >= GEMINI_QUEUE_MAX:
+            metrics["rejected_queue_full"] += 1
+            _refund(caller, user_bucket)
+            raise Overloaded("AI service is busy, please retry shortly", _queue_retry_after())
+
+        entry = [priority, next(_seq)]
+        heapq.heappush(_waiters, entry)
+        _queued[priority] += 1
+        try:
+            while True:
+                now = time.monotonic()
+                wait = None
+                if _waiters[0] is entry and _in_flight < GEMINI_MAX_IN_FLIGHT:
+                    wait = _bucket.wait_time(now)
+                    if wait <= 0:
+                        _bucket.take(now)
+                        heapq.heappop(_waiters)
+                        _in_flight += 1
+                        waited = now - start
+                        metrics["admitted"] += 1
+                        metrics["wait_seconds_total"] += waited
+                        metrics["wait_seconds_max"] = max(metrics["wait_seconds_max"], waited)
+                        return
+
+                remaining = deadline - now
+                if remaining <= 0:
+                    _waiters.remove(entry)
+                    heapq.heapify(_waiters)
+                    metrics["rejected_timeout"] += 1
+                    _refund(caller, user_bucket)
+                    raise Overloaded("AI service is busy, please retry shortly", _queue_retry_after())
+                _cond.wait(min(wait, remaining) if wait else remaining)
+        finally:
+            _queued[priority] -= 1
+            # The head may have changed (admitted, timed out); let the next one look
+            _cond.notify_all()
+
+
+def _release():
+    global _in_flight
+    with _cond:
+        _in_flight -= 1
+        _cond.notify_all()
+
+
+@contextmanager
+def admit():
+    """
+    Blocks until this Gemini call may proceed, for the caller set with
+    request_context(). Raises QuotaExceeded or Overloaded (both carry
+    `retry_after` seconds) instead of waiting past the class's timeout.
+    """
+    _acquire(_context.get())
+    try:
+        yield
+    finally:
+        _release()
+
+
+def metrics() -> dict:
+    with _cond:
+        classes = {}
+        for priority, name in PRIORITY_NAMES.items():
+            m = _metrics[priority]
+            classes[name] = {
+                **m,
+                "queued": _queued[priority],
+                "wait_seconds_avg": round(m["wait_seconds_total"] / m["admitted"], 4) if m["admitted"] else 0.0,
+            }
+        return {
+            "in_flight": _in_flight,
+            "max_in_flight": GEMINI_MAX_IN_FLIGHT,
+            "rate_per_sec": GEMINI_RATE_PER_SEC,
+            "tokens": round(_bucket.tokens, 2),
+            "tracked_users": len(_user_buckets),
+            "classes": classes,
+        }
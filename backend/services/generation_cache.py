@@ -0,0 +1,57 @@
+# In-process cache of generated story/steps/challenges/flashcards and reports
+import os
+import re
+import hashlib
+import threading
+from collections import OrderedDict
+
+GENERATION_CACHE_MAX_ENTRIES = int(os.getenv("GENERATION_CACHE_MAX_ENTRIES", "512"))
+
+_lock = threading.Lock()
+_entries = OrderedDict()
+_stats = {"hits": 0, "misses": 0}
+
+
+def normalize_text(text: str) -> str:
+    """Collapses whitespace so trivially different copies share a key."""
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def make_key(text: str, prompt_version: str) -> str:
+    digest = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+    return f"{prompt_version}:{digest}"
+
+
+def get(key: str):
+    with _lock:
+        sections = _entries.get(key)
+        if sections is None:
+            _stats["misses"] += 1
+            return None
+        _entries.move_to_end(key)
+        _stats["hits"] += 1
+        return sections
+
+
+def put(key: str, sections: dict):
+    with _lock:
+        _entries[key] = sections
+        _entries.move_to_end(key)
+        while len(_entries) > GENERATION_CACHE_MAX_ENTRIES:
+            _entries.popitem(last=False)
+
+
+def clear():
+    """Empties the cache (benchmarks); in production, bump the prompt version instead."""
+    with _lock:
+        _entries.clear()
+
+
+def stats() -> dict:
+    with _lock:
+        total = _stats["hits"] + _stats["misses"]
+        return {
+            **_stats,
+            "entries": len(_entries),
+            "hit_rate": round(_stats["hits"] / total, 3) if total else 0.0,
+        }
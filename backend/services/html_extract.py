@@ -0,0 +1,120 @@
+# Streaming, size-capped text extraction for fetched HTML pages
+import os
+import codecs
+from html.parser import HTMLParser
+
+MAX_PAGE_BYTES = int(os.getenv("MAX_PAGE_BYTES", str(5 * 1024 * 1024)))
+MAX_TEXT_CHARS = 1000000
+CHUNK_SIZE = 64 * 1024
+
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+SKIPPED_TAGS = {"script", "style", "noscript"}
+
+
+class UnsupportedContentType(Exception):
+    pass
+
+
+class TextExtractor(HTMLParser):
+    """
+    Incremental HTML → text parser.
+    Drops script/style/noscript content and stops collecting once the
+    character budget is reached.
+    """
+
+    def __init__(self, max_chars=MAX_TEXT_CHARS):
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self.parts = []
+        self.length = 0
+        self.skip_depth = 0
+        # A text node can arrive split across feed() calls, so it is
+        # buffered until the next markup event
+        self.pending = []
+
+    @property
+    def done(self):
+        return self.length >= self.max_chars
+
+    def flush(self):
+        if not self.pending:
+            return
+        piece = "".join(self.pending).strip()
+        self.pending = []
+        if not piece or self.done:
+            return
+        self.parts.append(piece)
+        # +1 accounts for the joining space
+        self.length += len(piece) + 1
+
+    def handle_starttag(self, tag, attrs):
+        self.flush()
+        if tag in SKIPPED_TAGS:
+            self.skip_depth += 1
+
+    def handle_endtag(self, tag):
+        self.flush()
+        if tag in SKIPPED_TAGS and self.skip_depth > 0:
+            self.skip_depth -= 1
+
+    def handle_comment(self, data):
+        self.flush()
+
+    def handle_decl(self, decl):
+        self.flush()
+
+    def handle_data(self, data):
+        if self.skip_depth or self.done:
+            return
+        self.pending.append(data)
+
+    def close(self):
+        super().close()
+        self.flush()
+
+    def text(self):
+        return " ".join(self.parts)[:self.max_chars]
+
+
+def is_html_content_type(content_type) -> bool:
+    # Servers that omit the header are given the benefit of the doubt
+    if not content_type:
+        return True
+    mime = content_type.split(";")[0].strip().lower()
+    return mime in HTML_CONTENT_TYPES
+
+
+def _incremental_decoder(encoding):
+    try:
+        return codecs.getincrementaldecoder(encoding or "utf-8")(errors="replace")
+    except LookupError:
+        return codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+
+def extract_text_from_response(resp, max_bytes=MAX_PAGE_BYTES, max_chars=MAX_TEXT_CHARS) -> str:
+    """
+    Reads a streamed `requests` response chunk by chunk and returns its text.
+    Stops at whichever comes first: end of body, byte ceiling, or char budget.
+    """
+    content_type = resp.headers.get("Content-Type", "")
+    if not is_html_content_type(content_type):
+        raise UnsupportedContentType(f"Unsupported content type: {content_type}")
+
+    decoder = _incremental_decoder(resp.encoding if "charset" in content_type.lower() else None)
+    parser = TextExtractor(max_chars=max_chars)
+    read = 0
+
+    for chunk in resp.iter_content(chunk_size=CHUNK_SIZE):
+        if not chunk:
+            continue
+        if read + len(chunk) > max_bytes:
+            chunk = chunk[:max_bytes - read]
+        read += len(chunk)
+        parser.feed(decoder.decode(chunk))
+        if parser.done or read >= max_bytes:
+            break
+    else:
+        parser.feed(decoder.decode(b"", final=True))
+
+    parser.close()
+    return parser.text()
@@ -0,0 +1,263 @@
+# Shared HTTP client for all outbound calls (Gemini, Google CSE, scraping)
+import os
+import socket
+import inspect
+import logging
+import threading
+import weakref
+import contextvars
+import urllib3
+import requests
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from services import resilience
+
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "20"))
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "10"))
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "2"))
+HTTP_BACKOFF_FACTOR = float(os.getenv("HTTP_BACKOFF_FACTOR", "0.3"))
+HTTP_BACKOFF_JITTER = float(os.getenv("HTTP_BACKOFF_JITTER", "0.3"))
+# Longest Retry-After we honour; a longer one is cut to this (and to the budget)
+HTTP_RETRY_AFTER_MAX = float(os.getenv("HTTP_RETRY_AFTER_MAX", "5"))
+
+# Per-destination settings, matched by URL prefix. `timeout` is
+# (connect, read) and applies when the caller doesn't pass its own.
+# Calls slower than `slow_call` seconds count against the circuit breaker.
+DESTINATIONS = {
+    "gemini": {
+        "prefix": "https://generativelanguage.googleapis.com/",
+        "timeout": (5, 30),
+        "slow_call": 25,
+        "pool_maxsize": int(os.getenv("GEMINI_POOL_MAXSIZE", "20")),
+    },
+    "google_cse": {
+        "prefix": "https://www.googleapis.com/",
+        "timeout": (5, 10),
+        "slow_call": 5,
+        "pool_maxsize": HTTP_POOL_MAXSIZE,
+    },
+}
+DEFAULT_TIMEOUT = (5, 10)
+# Scraped sites get one breaker per host
+DEFAULT_SLOW_CALL = 8
+
+# Only idempotent requests are retried; POSTs fail straight through
+IDEMPOTENT_METHODS = frozenset(["GET", "HEAD", "OPTIONS"])
+
+
+logger = logging.getLogger(__name__)
+
+# The hedged request this thread is sending as the first attempt
+_primary = contextvars.ContextVar("hedge_primary", default=None)
+# Connection -> the primary it is checked out to, until it goes back to the pool
+_checked_out = weakref.WeakKeyDictionary()
+_checked_out_lock = threading.Lock()
+
+
+class _Primary:
+    """
+    The first attempt of a hedged request. Remembers the connection it is
+    sent on while it has it checked out, so a hedge that answers first can
+    shut its socket down without touching a connection back in the pool.
+    """
+
+    def __init__(self):
+        self.interrupted = False
+        self._conn = None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def sending(self):
+        token = _primary.set(self)
+        try:
+            yield
+        finally:
+            _primary.reset(token)
+            with self._lock:
+                self._conn = None
+
+    def use(self, conn):
+        with self._lock:
+            self._conn = conn
+
+    def release(self, conn) -> bool:
+        """Forgets `conn` as it goes back to the pool; True if we shut it down."""
+        with self._lock:
+            if self._conn is conn:
+                self._conn = None
+            return self.interrupted
+
+    def interrupt(self):
+        with self._lock:
+            self.interrupted = True
+            sock = getattr(self._conn, "sock", None)
+            if sock is not None:
+                try:
+                    sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+
+
+class _TrackedPoolMixin:
+    def _get_conn(self, timeout=None):
+        conn = super()._get_conn(timeout)
+        primary = _primary.get()
+        if primary is not None:
+            with _checked_out_lock:
+                _checked_out[conn] = primary
+            primary.use(conn)
+        return conn
+
+    def _put_conn(self, conn):
+        # Released after the response, or before a retry's backoff: from here
+        # on the connection may belong to another request
+        if conn is not None:
+            with _checked_out_lock:
+                primary = _checked_out.pop(conn, None)
+            if primary is not None and primary.release(conn):
+                conn.close()   # its socket may have been shut down
+        super()._put_conn(conn)
+
+
+class _TrackedHTTPConnectionPool(_TrackedPoolMixin, HTTPConnectionPool):
+    pass
+
+
+class _TrackedHTTPSConnectionPool(_TrackedPoolMixin, HTTPSConnectionPool):
+    pass
+
+
+class _BudgetRetry(Retry):
+    """Stops retrying once the caller's latency budget is spent, or a hedge has won."""
+
+    def is_exhausted(self):
+        left = resilience.remaining()
+        primary = _primary.get()
+        return (
+            super().is_exhausted()
+            or (left is not None and left <= 0)
+            or (primary is not None and primary.interrupted)
+        )
+
+    def get_retry_after(self, response):
+        # Never sleep past HTTP_RETRY_AFTER_MAX or the remaining budget,
+        # whatever the upstream asks for
+        retry_after = super().get_retry_after(response)
+        if retry_after is None:
+            return None
+        retry_after = min(retry_after, HTTP_RETRY_AFTER_MAX)
+        left = resilience.remaining()
+        if left is not None:
+            retry_after = min(retry_after, max(0.0, left))
+        return retry_after
+
+
+def _retry_policy():
+    kwargs = dict(
+        total=HTTP_RETRIES,
+        backoff_factor=HTTP_BACKOFF_FACTOR,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=IDEMPOTENT_METHODS,
+        raise_on_status=False,
+        respect_retry_after_header=True,
+    )
+    # Newer urllib3 options, each passed only where this urllib3 has it.
+    # Without retry_after_max, _BudgetRetry.get_retry_after still caps the wait.
+    supported = inspect.signature(Retry.__init__).parameters
+    for name, value in (("backoff_jitter", HTTP_BACKOFF_JITTER), ("retry_after_max", HTTP_RETRY_AFTER_MAX)):
+        if name in supported:
+            kwargs[name] = value
+        else:
+            logger.warning("urllib3 %s has no Retry(%s=...); running without it", urllib3.__version__, name)
+    return _BudgetRetry(**kwargs)
+
+
+def _adapter(**kwargs):
+    adapter = HTTPAdapter(**kwargs)
+    adapter.poolmanager.pool_classes_by_scheme = {
+        "http": _TrackedHTTPConnectionPool,
+        "https": _TrackedHTTPSConnectionPool,
+    }
+    return adapter
+
+
+def _build_session():
+    session = requests.Session()
+    retry = _retry_policy()
+
+    # Default adapter keeps one keep-alive pool per host for scraped sites
+    default_adapter = _adapter(
+        pool_connections=HTTP_POOL_CONNECTIONS,
+        pool_maxsize=HTTP_POOL_MAXSIZE,
+        max_retries=retry,
+    )
+    session.mount("http://", default_adapter)
+    session.mount("https://", default_adapter)
+
+    for destination in DESTINATIONS.values():
+        session.mount(destination["prefix"], _adapter(
+            pool_connections=1,
+            pool_maxsize=destination["pool_maxsize"],
+            max_retries=retry,
+        ))
+    return session
+
+
+session = _build_session()
+
+
+def _destination(url: str):
+    for name, destination in DESTINATIONS.items():
+        if url.startswith(destination["prefix"]):
+            return name, destination
+    return None, None
+
+
+def default_timeout(url: str):
+    _, destination = _destination(url)
+    return destination["timeout"] if destination else DEFAULT_TIMEOUT
+
+
+def _breaker(url: str):
+    name, destination = _destination(url)
+    if destination:
+        return resilience.breaker(name, destination["slow_call"])
+    return resilience.breaker(f"site:{urlsplit(url).netloc.lower()}", DEFAULT_SLOW_CALL)
+
+
+def request(method: str, url: str, hedge=False, **kwargs):
+    """
+    Sends a request behind the destination's circuit breaker, with the
+    timeout cut to the caller's latency budget. `hedge=True` allows a
+    second attempt for slow idempotent requests.
+    """
+    timeout, clamped = resilience.clamp_timeout(kwargs.get("timeout") or default_timeout(url))
+    kwargs["timeout"] = timeout
+    breaker = _breaker(url)
+
+    def attempt():
+        return resilience.call(breaker, lambda: session.request(method, url, **kwargs), clamped)
+
+    if hedge and method.upper() in IDEMPOTENT_METHODS:
+        primary = _Primary()
+
+        def first_attempt():
+            with primary.sending():
+                return resilience.call(
+                    breaker, lambda: session.request(method, url, **kwargs), clamped,
+                    interrupted=lambda: primary.interrupted,
+                )
+
+        return resilience.hedged(breaker, first_attempt, attempt, primary.interrupt)
+    return attempt()
+
+
+def get(url: str, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+def post(url: str, **kwargs):
+    return request("POST", url, **kwargs)
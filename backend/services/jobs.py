@@ -0,0 +1,265 @@
+# Background job runner persisted to a local SQLite file
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+import traceback
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+JOBS_DB_PATH = os.getenv("JOBS_DB_PATH", os.path.join(os.path.dirname(os.path.dirname(__file__)), "jobs.db"))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_MAX_QUEUE = int(os.getenv("JOB_MAX_QUEUE", "100"))
+JOB_RETENTION_SECONDS = int(os.getenv("JOB_RETENTION_SECONDS", str(24 * 3600)))
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+_handlers = {}
+_executor = None
+_pending = 0
+_lock = threading.Lock()
+
+
+class QueueFull(Exception):
+    pass
+
+
+@contextmanager
+def _connect():
+    conn = sqlite3.connect(JOBS_DB_PATH, timeout=30)
+    conn.row_factory = sqlite3.Row
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+def _init_db():
+    with _connect() as conn:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                state TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                progress TEXT,
+                result TEXT,
+                error TEXT,
+                owner_pid INTEGER,
+                owner_token TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+        if "owner_token" not in columns:
+            conn.execute("ALTER TABLE jobs ADD COLUMN owner_token TEXT")
+        conn.execute("CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state)")
+
+
+def register_handler(kind: str, handler):
+    """
+    Registers `handler(job_id, payload) -> result` for a job kind.
+    The result must be JSON-serializable.
+    """
+    _handlers[kind] = handler
+
+
+def _pid_alive(pid) -> bool:
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _process_token(pid):
+    """
+    The pid plus the process' start time, so a pid reused by another
+    process doesn't pass for the job's owner. None where /proc is missing.
+    """
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            # starttime is field 22; split after the command name, which may contain spaces
+            return f"{pid}:{f.read().rsplit(')', 1)[1].split()[19]}"
+    except (OSError, IndexError):
+        return None
+
+
+def _owner_alive(pid, token) -> bool:
+    if not _pid_alive(pid):
+        return False
+    if token is None:
+        return True   # claimed before tokens were recorded, or no /proc
+    current = _process_token(pid)
+    return current is None or current == token
+
+
+def ensure_started():
+    """
+    Creates the worker pool for this process (call after fork) and picks up
+    jobs left queued or orphaned by a worker that died mid-run.
+    """
+    global _executor
+    with _lock:
+        if _executor is not None:
+            return
+        _init_db()
+        _executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="job")
+
+    now = time.time()
+    with _connect() as conn:
+        conn.execute(
+            "DELETE FROM jobs WHERE state IN (?, ?) AND updated_at < ?",
+            (SUCCEEDED, FAILED, now - JOB_RETENTION_SECONDS),
+        )
+        running = conn.execute(
+            "SELECT id, owner_pid, owner_token FROM jobs WHERE state = ?", (RUNNING,)
+        ).fetchall()
+        for row in running:
+            if not _owner_alive(row["owner_pid"], row["owner_token"]):
+                conn.execute(
+                    "UPDATE jobs SET state = ?, owner_pid = NULL, owner_token = NULL, updated_at = ? "
+                    "WHERE id = ? AND state = ?",
+                    (QUEUED, now, row["id"], RUNNING),
+                )
+        queued = conn.execute(
+            "SELECT id FROM jobs WHERE state = ? ORDER BY created_at", (QUEUED,)
+        ).fetchall()
+
+    for row in queued:
+        _schedule(row["id"])
+
+
+def _schedule(job_id: str, reserved=False):
+    global _pending
+    if not reserved:
+        with _lock:
+            _pending += 1
+    _executor.submit(_run, job_id)
+
+
+def submit(kind: str, payload: dict) -> str:
+    """Persists a new job and queues it on this process' worker pool."""
+    global _pending
+    if kind not in _handlers:
+        raise ValueError(f"No handler registered for job kind: {kind}")
+    ensure_started()
+    # Check and take the slot together, or concurrent submits overshoot the cap
+    with _lock:
+        if _pending >= JOB_MAX_QUEUE:
+            raise QueueFull("Job queue is full")
+        _pending += 1
+
+    job_id = uuid.uuid4().hex
+    now = time.time()
+    try:
+        with _connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, state, payload, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, kind, QUEUED, json.dumps(payload), now, now),
+            )
+    except Exception:
+        with _lock:
+            _pending -= 1
+        raise
+    _schedule(job_id, reserved=True)
+    return job_id
+
+
+def _claim(job_id: str):
+    """Atomically moves a queued job to running; returns its row or None if taken."""
+    with _connect() as conn:
+        cur = conn.execute(
+            "UPDATE jobs SET state = ?, owner_pid = ?, owner_token = ?, updated_at = ? WHERE id = ? AND state = ?",
+            (RUNNING, os.getpid(), _process_token(os.getpid()), time.time(), job_id, QUEUED),
+        )
+        if cur.rowcount != 1:
+            return None
+        return conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+
+
+def _finish(job_id: str, state: str, result=None, error=None):
+    with _connect() as conn:
+        conn.execute(
+            "UPDATE jobs SET state = ?, result = ?, error = ?, updated_at = ? WHERE id = ?",
+            (state, json.dumps(result) if result is not None else None, error, time.time(), job_id),
+        )
+
+
+def _run(job_id: str):
+    global _pending
+    try:
+        row = _claim(job_id)
+        if row is None:
+            return
+        handler = _handlers.get(row["kind"])
+        if handler is None:
+            _finish(job_id, FAILED, error=f"No handler registered for job kind: {row['kind']}")
+            return
+        try:
+            result = handler(job_id, json.loads(row["payload"]))
+            _finish(job_id, SUCCEEDED, result=result)
+        except Exception as e:
+            traceback.print_exc()
+            _finish(job_id, FAILED, error=str(e))
+    finally:
+        with _lock:
+            _pending -= 1
+
+
+def set_progress(job_id: str, progress: dict):
+    with _connect() as conn:
+        conn.execute(
+            "UPDATE jobs SET progress = ?, updated_at = ? WHERE id = ?",
+            (json.dumps(progress), time.time(), job_id),
+        )
+
+
+def get(job_id: str):
+    ensure_started()
+    with _connect() as conn:
+        row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    if row is None:
+        return None
+    return {
+        "id": row["id"],
+        "kind": row["kind"],
+        "state": row["state"],
+        "progress": json.loads(row["progress"]) if row["progress"] else None,
+        "result": json.loads(row["result"]) if row["result"] else None,
+        "error": row["error"],
+        "created_at": row["created_at"],
+        "updated_at": row["updated_at"],
+    }
+
+
+def stats() -> dict:
+    """Queue depth across all processes plus this process' in-flight count."""
+    ensure_started()
+    with _connect() as conn:
+        rows = conn.execute("SELECT state, COUNT(*) AS n FROM jobs GROUP BY state").fetchall()
+    counts = {QUEUED: 0, RUNNING: 0, SUCCEEDED: 0, FAILED: 0}
+    counts.update({row["state"]: row["n"] for row in rows})
+    with _lock:
+        pending = _pending
+    return {
+        "states": counts,
+        "queue_depth": counts[QUEUED],
+        "local_pending": pending,
+        "local_workers": JOB_WORKERS,
+        "local_max_queue": JOB_MAX_QUEUE,
+    }
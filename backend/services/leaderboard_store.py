@@ -0,0 +1,258 @@
+# Materialized leaderboard
+#
+# Rows (XP, streak, badges plus denormalized name/avatar) are persisted in a
+# local SQLite file shared by all workers on the host. Every write bumps a
+# version number; each process mirrors the table into an in-memory list kept
+# sorted by (-xp, user_id) and replays only rows newer than the last version
+# it has seen. Rank lookups and cursor seeks are binary searches on that list.
+import os
+import json
+import time
+import base64
+import sqlite3
+import binascii
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from bisect import bisect_left, bisect_right, insort
+from contextlib import contextmanager
+from services.appwrite_client import users
+from services.collection_iter import iter_documents
+
+LEADERBOARD_DB_PATH = os.getenv(
+    "LEADERBOARD_DB_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "leaderboard.db"),
+)
+LEADERBOARD_PROFILE_TTL = int(os.getenv("LEADERBOARD_PROFILE_TTL", str(24 * 3600)))
+LEADERBOARD_PROFILE_WORKERS = int(os.getenv("LEADERBOARD_PROFILE_WORKERS", "8"))
+
+DATABASE_ID = os.getenv("APPWRITE_DATABASE_ID")
+USER_PROGRESS_COLLECTION = os.getenv("APPWRITE_USER_PROGRESS_COLLECTION_ID")
+
+_lock = threading.RLock()
+_ranking = []   # sorted [(-xp, user_id)]
+_rows = {}      # user_id -> row dict
+_seen_version = 0
+_initialized = False
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+@contextmanager
+def _connect():
+    conn = sqlite3.connect(LEADERBOARD_DB_PATH, timeout=30)
+    conn.row_factory = sqlite3.Row
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+def _init_db():
+    with _connect() as conn:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS leaderboard (
+                user_id TEXT PRIMARY KEY,
+                xp INTEGER NOT NULL,
+                streak INTEGER NOT NULL,
+                badges TEXT NOT NULL,
+                name TEXT,
+                avatar TEXT,
+                profile_at REAL,
+                deleted INTEGER NOT NULL DEFAULT 0,
+                version INTEGER NOT NULL
+            )
+            """
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS leaderboard_version ON leaderboard (version)")
+        conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+
+def _fetch_profile(user_id: str):
+    """Returns (name, avatar), or None if the lookup failed so it is tried again later."""
+    try:
+        user_info = users.get(user_id)
+        name = user_info.get("name") or user_info.get("email")
+        avatar = user_info.get("prefs", {}).get("avatar")
+        return name or "Unknown", avatar
+    except Exception as e:
+        print(f"⚠️ Failed to fetch profile for {user_id}:", e)
+        return None
+
+
+def _write(conn, user_id, xp, streak, badges, profile=None, deleted=False):
+    # Callers hold a BEGIN IMMEDIATE transaction, so versions are handed
+    # out and committed in order across processes.
+    version = conn.execute("SELECT COALESCE(MAX(version), 0) + 1 FROM leaderboard").fetchone()[0]
+    name, avatar = profile if profile else (None, None)
+    conn.execute(
+        """
+        INSERT INTO leaderboard (user_id, xp, streak, badges, name, avatar, profile_at, deleted, version)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(user_id) DO UPDATE SET
+            xp = excluded.xp,
+            streak = excluded.streak,
+            badges = excluded.badges,
+            name = COALESCE(excluded.name, leaderboard.name),
+            avatar = CASE WHEN excluded.profile_at IS NULL THEN leaderboard.avatar ELSE excluded.avatar END,
+            profile_at = COALESCE(excluded.profile_at, leaderboard.profile_at),
+            deleted = excluded.deleted,
+            version = excluded.version
+        """,
+        (
+            user_id, int(xp), int(streak), json.dumps(list(badges)), name, avatar,
+            time.time() if profile else None, 1 if deleted else 0, version,
+        ),
+    )
+
+
+def _bootstrap():
+    """One-off rebuild from the progress collection, the first time the table is used."""
+    with _connect() as conn:
+        if conn.execute("SELECT value FROM meta WHERE key = 'bootstrapped'").fetchone():
+            return
+
+    docs = list(iter_documents(
+        USER_PROGRESS_COLLECTION,
+        select=["userId", "xp", "streak", "badges"],
+        database_id=DATABASE_ID,
+    ))
+
+    # Failed lookups are stored without a profile and retried on the user's next progress write
+    user_ids = [doc.get("userId") or doc.get("$id") for doc in docs]
+    with ThreadPoolExecutor(max_workers=LEADERBOARD_PROFILE_WORKERS) as pool:
+        profiles = dict(zip(user_ids, pool.map(_fetch_profile, user_ids)))
+
+    with _connect() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        for doc in docs:
+            user_id = doc.get("userId") or doc.get("$id")
+            existing = conn.execute("SELECT 1 FROM leaderboard WHERE user_id = ?", (user_id,)).fetchone()
+            if existing:
+                continue
+            _write(conn, user_id, doc.get("xp", 0), doc.get("streak", 0),
+                   parse_badges(doc.get("badges")), profiles[user_id])
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('bootstrapped', ?)", (str(time.time()),))
+
+
+def parse_badges(badges):
+    if isinstance(badges, str):
+        return [b.strip() for b in badges.split(",") if b.strip()]
+    return list(badges or [])
+
+
+def _ensure_initialized():
+    global _initialized
+    if _initialized:
+        return
+    with _lock:
+        if _initialized:
+            return
+        _init_db()
+        _bootstrap()
+        _initialized = True
+
+
+def _sync():
+    """Applies rows written (by any process) since this process last looked."""
+    global _seen_version
+    _ensure_initialized()
+    with _connect() as conn:
+        changed = conn.execute(
+            "SELECT * FROM leaderboard WHERE version > ? ORDER BY version", (_seen_version,)
+        ).fetchall()
+    if not changed:
+        return
+
+    with _lock:
+        for row in changed:
+            if row["version"] <= _seen_version:
+                continue
+            old = _rows.pop(row["user_id"], None)
+            if old is not None:
+                i = bisect_left(_ranking, (-old["xp"], old["$id"]))
+                if i < len(_ranking) and _ranking[i] == (-old["xp"], old["$id"]):
+                    del _ranking[i]
+            if not row["deleted"]:
+                entry = {
+                    "$id": row["user_id"],
+                    "name": row["name"] or "Unknown",
+                    "xp": row["xp"],
+                    "streak": row["streak"],
+                    "badges": json.loads(row["badges"]),
+                    "avatar": row["avatar"],
+                }
+                _rows[row["user_id"]] = entry
+                insort(_ranking, (-entry["xp"], entry["$id"]))
+            _seen_version = max(_seen_version, row["version"])
+
+
+def record_progress(user_id: str, xp: int, streak: int, badges):
+    """Called after every progress write to keep the leaderboard current."""
+    _ensure_initialized()
+    with _connect() as conn:
+        row = conn.execute("SELECT profile_at FROM leaderboard WHERE user_id = ?", (user_id,)).fetchone()
+    profile = None
+    if row is None or not row["profile_at"] or time.time() - row["profile_at"] > LEADERBOARD_PROFILE_TTL:
+        profile = _fetch_profile(user_id)
+
+    with _connect() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        _write(conn, user_id, xp, streak, badges, profile)
+    _sync()
+
+
+def remove(user_id: str):
+    _ensure_initialized()
+    with _connect() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        _write(conn, user_id, 0, 0, [], deleted=True)
+    _sync()
+
+
+def encode_cursor(entry) -> str:
+    raw = f"{entry['xp']}:{entry['$id']}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor: str):
+    """Raises InvalidCursor for anything encode_cursor didn't produce."""
+    try:
+        xp, user_id = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8").split(":", 1)
+        return -int(xp), user_id
+    except (ValueError, binascii.Error):
+        raise InvalidCursor("Malformed cursor")
+
+
+def _with_rank(entry):
+    # Competition ranking: users with equal XP share a rank
+    return {**entry, "rank": bisect_left(_ranking, (-entry["xp"], "")) + 1}
+
+
+def page(limit: int, offset: int = 0, cursor: str = None):
+    """
+    Returns (entries, next_cursor) ordered by XP descending.
+    `cursor` (from a previous page) takes precedence over `offset`.
+    Raises InvalidCursor.
+    """
+    _sync()
+    with _lock:
+        start = bisect_right(_ranking, decode_cursor(cursor)) if cursor else max(offset, 0)
+        keys = _ranking[start:start + limit]
+        entries = [_with_rank(_rows[user_id]) for _, user_id in keys]
+        has_more = start + limit < len(_ranking)
+    next_cursor = encode_cursor(entries[-1]) if entries and has_more else None
+    return entries, next_cursor
+
+
+def rank(user_id: str):
+    _sync()
+    with _lock:
+        entry = _rows.get(user_id)
+        if entry is None:
+            return None
+        return {**_with_rank(entry), "total": len(_ranking)}
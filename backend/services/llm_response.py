@@ -0,0 +1,277 @@
+# Structured replies from Gemini
+#
+# generate_json() asks Gemini for JSON matching a response schema
+# (responseMimeType + responseSchema), so replies no longer need to be
+# dug out of free text. Replies are still parsed defensively: straight
+# json.loads first, then a balanced-brace scan that finds the first
+# complete JSON value in prose or code fences (replies streamed from the
+# text prompt, or a model ignoring the schema). Each top-level field is
+# checked against the schema; if some are missing or malformed, only
+# those fields are asked for again instead of regenerating the whole
+# reply.
+#
+# Schemas use the subset of OpenAPI that Gemini accepts: type,
+# properties, required, items, minItems, propertyOrdering, description.
+import os
+import json
+import threading
+import requests
+from services import http_client, gemini_governor
+
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+GEMINI_ENDPOINT = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash:generateContent"
+
+LLM_REPAIR_ATTEMPTS = int(os.getenv("LLM_REPAIR_ATTEMPTS", "1"))
+
+REPAIR_PROMPT_TEMPLATE = """{prompt}
+
+Your previous reply had problems with these fields:
+{problems}
+
+Respond with JSON containing only these fields, filled in correctly as instructed above.
+"""
+
+_lock = threading.Lock()
+_stats = {"replies": 0, "parsed_direct": 0, "parsed_fallback": 0, "unparseable": 0,
+          "repairs": 0, "fields_repaired": 0, "fields_failed": 0}
+
+
+class LLMError(Exception):
+    def __init__(self, message, details=""):
+        super().__init__(message)
+        self.details = details
+
+
+def _count(**increments):
+    with _lock:
+        for name, amount in increments.items():
+            _stats[name] += amount
+
+
+def generate_text(prompt: str, schema=None, timeout=30) -> str:
+    """
+    Sends one prompt to Gemini and returns the reply text. With `schema`,
+    the reply is constrained to JSON matching it. Raises LLMError.
+    """
+    payload = {"contents": [{"parts": [{"text": prompt}]}]}
+    if schema is not None:
+        payload["generationConfig"] = {
+            "responseMimeType": "application/json",
+            "responseSchema": schema,
+        }
+
+    try:
+        with gemini_governor.admit():
+            resp = http_client.post(
+                f"{GEMINI_ENDPOINT}?key={GEMINI_API_KEY}",
+                headers={"Content-Type": "application/json"},
+                json=payload,
+                timeout=timeout
+            )
+    except requests.exceptions.RequestException as e:
+        print("Gemini request error:", e)
+        raise LLMError("Failed to contact Gemini API", str(e))
+
+    if resp.status_code != 200:
+        print("Gemini returned non-200:", resp.status_code, resp.text)
+        raise LLMError(f"Gemini API error: {resp.status_code}", resp.text)
+
+    try:
+        parts = resp.json()["candidates"][0]["content"]["parts"]
+        return "".join(part.get("text", "") for part in parts)
+    except Exception:
+        print("Gemini response parse error:", resp.text)
+        raise LLMError("Invalid response from Gemini", resp.text)
+
+
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+def _balanced_end(text: str, start: int) -> int:
+    """Index just past the value opened at `start`, or -1 if it never closes."""
+    stack = []
+    in_string = escaped = False
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in _CLOSERS:
+            stack.append(_CLOSERS[ch])
+        elif ch in "}]":
+            if not stack or stack.pop() != ch:
+                return -1
+            if not stack:
+                return i + 1
+    return -1
+
+
+def parse_json(text: str, expect=(dict, list)):
+    """
+    Returns the first JSON value of type `expect` found in `text`, or None.
+    Tries the whole text first, then each balanced {...} / [...] span.
+    """
+    if not text:
+        return None
+    stripped = text.strip()
+    try:
+        value = json.loads(stripped)
+        if isinstance(value, expect):
+            return value
+    except ValueError:
+        pass
+
+    start = 0
+    while True:
+        candidates = [i for i in (stripped.find("{", start), stripped.find("[", start)) if i != -1]
+        if not candidates:
+            return None
+        start = min(candidates)
+        end = _balanced_end(stripped, start)
+        if end != -1:
+            try:
+                value = json.loads(stripped[start:end])
+                if isinstance(value, expect):
+                    return value
+            except ValueError:
+                pass
+        start += 1
+
+
+def _check(value, schema):
+    """Returns (ok, value or reason); coerces numeric/boolean strings."""
+    kind = schema.get("type", "").upper()
+    if kind == "STRING":
+        if isinstance(value, str) and value.strip():
+            return True, value
+        return False, "expected non-empty text"
+    if kind == "INTEGER":
+        if isinstance(value, bool):
+            return False, "expected an integer"
+        try:
+            number = float(str(value).strip())
+        except ValueError:
+            return False, "expected an integer"
+        return (True, int(number)) if number.is_integer() else (False, "expected an integer")
+    if kind == "NUMBER":
+        try:
+            return True, float(str(value).strip())
+        except ValueError:
+            return False, "expected a number"
+    if kind == "BOOLEAN":
+        if isinstance(value, bool):
+            return True, value
+        if str(value).strip().lower() in ("true", "false"):
+            return True, str(value).strip().lower() == "true"
+        return False, "expected true or false"
+    if kind == "ARRAY":
+        if not isinstance(value, list):
+            return False, "expected a list"
+        items = []
+        for item in value:
+            ok, checked = _check(item, schema.get("items", {}))
+            if ok:
+                items.append(checked)
+        if len(items) < schema.get("minItems", 0):
+            return False, f"expected at least {schema['minItems']} valid items"
+        return True, items
+    if kind == "OBJECT":
+        if not isinstance(value, dict):
+            return False, "expected an object"
+        checked, errors = validate(value, schema)
+        if errors:
+            return False, "; ".join(f"{field}: {reason}" for field, reason in errors.items())
+        return True, checked
+    return True, value
+
+
+def validate(data: dict, schema: dict):
+    """
+    Checks each property of an object schema. Returns (valid, errors):
+    the fields that passed (coerced) and field -> reason for the rest.
+    """
+    valid, errors = {}, {}
+    for field, field_schema in schema.get("properties", {}).items():
+        if field not in data or data[field] is None:
+            if field in schema.get("required", []):
+                errors[field] = "missing"
+            continue
+        ok, result = _check(data[field], field_schema)
+        if ok:
+            valid[field] = result
+        else:
+            errors[field] = result
+    return valid, errors
+
+
+def _subschema(schema: dict, fields) -> dict:
+    properties = {f: schema["properties"][f] for f in fields}
+    return {"type": "OBJECT", "properties": properties, "required": list(properties)}
+
+
+def repair(prompt: str, schema: dict, errors: dict, timeout=30):
+    """
+    Asks again for only the fields in `errors`, with the original prompt
+    as context. Returns (fixed, still_failing).
+    """
+    _count(repairs=1)
+    problems = "\n".join(f"- {field}: {reason}" for field, reason in errors.items())
+    try:
+        text = generate_text(
+            REPAIR_PROMPT_TEMPLATE.format(prompt=prompt, problems=problems),
+            schema=_subschema(schema, errors),
+            timeout=timeout,
+        )
+    except LLMError as e:
+        print("⚠️ Repair request failed:", e)
+        _count(fields_failed=len(errors))
+        return {}, errors
+
+    fixed, still_failing = validate(_parse_reply(text), _subschema(schema, errors))
+    _count(fields_repaired=len(fixed), fields_failed=len(still_failing))
+    return fixed, still_failing
+
+
+def _parse_reply(text: str) -> dict:
+    _count(replies=1)
+    try:
+        value = json.loads(text)
+        if isinstance(value, dict):
+            _count(parsed_direct=1)
+            return value
+    except ValueError:
+        pass
+    value = parse_json(text, expect=dict)
+    if value is None:
+        print("⚠️ Unparseable Gemini reply:", text[:200])
+        _count(unparseable=1)
+        return {}
+    _count(parsed_fallback=1)
+    return value
+
+
+def generate_json(prompt: str, schema: dict, timeout=30):
+    """
+    Returns (data, errors) for a reply constrained to the object `schema`:
+    the valid fields, and field -> reason for any still invalid after
+    LLM_REPAIR_ATTEMPTS targeted retries. Raises LLMError if the first
+    call fails outright.
+    """
+    data, errors = validate(_parse_reply(generate_text(prompt, schema=schema, timeout=timeout)), schema)
+    for _ in range(LLM_REPAIR_ATTEMPTS):
+        if not errors:
+            break
+        fixed, errors = repair(prompt, schema, errors, timeout=timeout)
+        data.update(fixed)
+    return data, errors
+
+
+def stats() -> dict:
+    with _lock:
+        return dict(_stats)
@@ -0,0 +1,98 @@
+# In-process cache for fetched and cleaned doc pages
+import os
+import time
+import threading
+from collections import OrderedDict
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+PAGE_CACHE_TTL = int(os.getenv("PAGE_CACHE_TTL", "3600"))
+PAGE_CACHE_MAX_ENTRIES = int(os.getenv("PAGE_CACHE_MAX_ENTRIES", "256"))
+PAGE_CACHE_MAX_CHARS = int(os.getenv("PAGE_CACHE_MAX_CHARS", "50000000"))
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+_lock = threading.Lock()
+_entries = OrderedDict()
+_total_chars = 0
+
+
+def normalize_url(url: str) -> str:
+    """Lowercases scheme/host, drops default ports, fragments and sorts the query."""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != _DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    path = parts.path or "/"
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, path, query, ""))
+
+
+def get(key: str):
+    """Returns the cached entry for a normalized URL, or None."""
+    with _lock:
+        entry = _entries.get(key)
+        if entry is not None:
+            _entries.move_to_end(key)
+        return entry
+
+
+def is_fresh(entry) -> bool:
+    return time.time() - entry["fetched_at"] < PAGE_CACHE_TTL
+
+
+def validator_headers(entry) -> dict:
+    """Builds If-None-Match / If-Modified-Since headers for revalidation."""
+    headers = {}
+    if entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
+
+
+def touch(key: str):
+    """Marks an entry as freshly revalidated (e.g. after a 304)."""
+    with _lock:
+        entry = _entries.get(key)
+        if entry is not None:
+            entry["fetched_at"] = time.time()
+            _entries.move_to_end(key)
+
+
+def put(key: str, text: str, etag=None, last_modified=None):
+    global _total_chars
+    with _lock:
+        old = _entries.pop(key, None)
+        if old is not None:
+            _total_chars -= len(old["text"])
+
+        _entries[key] = {
+            "text": text,
+            "etag": etag,
+            "last_modified": last_modified,
+            "fetched_at": time.time(),
+        }
+        _total_chars += len(text)
+
+        # Evict least recently used pages until within both bounds
+        while _entries and (
+            len(_entries) > PAGE_CACHE_MAX_ENTRIES or _total_chars > PAGE_CACHE_MAX_CHARS
+        ):
+            _, evicted = _entries.popitem(last=False)
+            _total_chars -= len(evicted["text"])
+
+
+def invalidate(key: str):
+    global _total_chars
+    with _lock:
+        old = _entries.pop(key, None)
+        if old is not None:
+            _total_chars -= len(old["text"])
+
+
+def clear():
+    global _total_chars
+    with _lock:
+        _entries.clear()
+        _total_chars = 0
@@ -0,0 +1,213 @@
+# Markdown report → PDF
+#
+# Lines are wrapped with reportlab's font metrics, so wrapping follows the
+# real glyph widths instead of a fixed character count. Headings (#, ##,
+# ###), bullet and numbered lists are laid out with their own fonts and
+# hanging indents; paired **bold**/`code` markers are dropped. Rendering goes to a
+# spooled temp file (memory for small reports, disk beyond
+# PDF_SPOOL_MAX_BYTES) and finished PDFs are kept in a content-addressed
+# directory keyed by the hash of the report text, shared by all workers.
+import os
+import re
+import hashlib
+import shutil
+import tempfile
+from reportlab.lib.pagesizes import A4
+from functools import lru_cache
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfgen import canvas
+
+# Bump when the layout changes so cached PDFs are re-rendered
+RENDERER_VERSION = "2"
+
+PDF_SPOOL_MAX_BYTES = int(os.getenv("PDF_SPOOL_MAX_BYTES", str(1024 * 1024)))
+PDF_CACHE_DIR = os.getenv("PDF_CACHE_DIR", os.path.join(tempfile.gettempdir(), "fundocs-report-pdfs"))
+PDF_CACHE_MAX_FILES = int(os.getenv("PDF_CACHE_MAX_FILES", "500"))
+
+MARGIN = 40
+BODY_FONT = ("Helvetica", 12)
+STYLES = {
+    "h1": ("Helvetica-Bold", 18),
+    "h2": ("Helvetica-Bold", 14),
+    "h3": ("Helvetica-Bold", 12),
+    "body": BODY_FONT,
+}
+LIST_INDENT = 16
+
+_HEADING = re.compile(r"^(#{1,3})\s+(.*)$")
+_BULLET = re.compile(r"^(\s*)[-*+]\s+(.*)$")
+_NUMBERED = re.compile(r"^(\s*)(\d+[.)])\s+(.*)$")
+_CODE_SPAN = re.compile(r"`([^`]+)`")
+_BOLD = re.compile(r"\*\*(?=\S)(.+?)(?<=\S)\*\*")
+
+
+def report_hash(markdown: str) -> str:
+    return hashlib.sha256(f"{RENDERER_VERSION}\n{markdown}".encode("utf-8")).hexdigest()
+
+
+def _blocks(markdown: str):
+    """Yields (style, marker, text, indent_level) per markdown line; None for blank lines."""
+    for line in markdown.splitlines():
+        if not line.strip():
+            yield None
+            continue
+        heading = _HEADING.match(line)
+        if heading:
+            yield f"h{len(heading.group(1))}", None, heading.group(2), 0
+            continue
+        bullet = _BULLET.match(line)
+        if bullet:
+            yield "body", "•", bullet.group(2), len(bullet.group(1).expandtabs(4)) // 2 + 1
+            continue
+        numbered = _NUMBERED.match(line)
+        if numbered:
+            yield "body", numbered.group(2), numbered.group(3), len(numbered.group(1).expandtabs(4)) // 2 + 1
+            continue
+        yield "body", None, line.strip(), 0
+
+
+def strip_inline(text: str) -> str:
+    """Drops paired **bold** and `code` markers; code spans are kept verbatim."""
+    # split() leaves code span contents at the odd indices
+    parts = _CODE_SPAN.split(text)
+    return "".join(part if i % 2 else _BOLD.sub(r"\1", part) for i, part in enumerate(parts))
+
+
+@lru_cache(maxsize=16384)
+def _width(text: str, name: str, size: int) -> float:
+    return stringWidth(text, name, size)
+
+
+def _split_word(word: str, name: str, size: int, max_width: float) -> list:
+    """Cuts a word wider than a line (a URL, a long identifier) into line-sized pieces."""
+    pieces, start, width = [], 0, 0.0
+    for i, ch in enumerate(word):
+        w = _width(ch, name, size)
+        if i > start and width + w > max_width:
+            pieces.append(word[start:i])
+            start, width = i, 0.0
+        width += w
+    pieces.append(word[start:])
+    return pieces
+
+
+def wrap(text: str, font, max_width: float) -> list:
+    """Greedy word wrap using the font's glyph widths (word widths are cached)."""
+    name, size = font
+    space = _width(" ", name, size)
+    lines, current, current_width = [], [], 0.0
+    words = []
+    for word in text.split():
+        if _width(word, name, size) > max_width:
+            words.extend(_split_word(word, name, size, max_width))
+        else:
+            words.append(word)
+    for word in words:
+        w = _width(word, name, size)
+        if current and current_width + space + w > max_width:
+            lines.append(" ".join(current))
+            current, current_width = [], 0.0
+        current_width += (space if current else 0) + w
+        current.append(word)
+    if current:
+        lines.append(" ".join(current))
+    return lines
+
+
+class _Writer:
+    def __init__(self, fileobj):
+        self.canvas = canvas.Canvas(fileobj, pagesize=A4)
+        self.width, self.height = A4
+        self.y = self.height - MARGIN
+        self.font = None
+
+    def space(self, points):
+        self.y -= points
+
+    def line(self, x, text, font, marker=None, marker_x=None):
+        name, size = font
+        line_height = size + 4
+        if self.y - line_height < MARGIN:
+            self.canvas.showPage()
+            self.y = self.height - MARGIN
+            self.font = None  # each page starts with the default font
+        self.y -= line_height
+        if self.font != font:
+            self.canvas.setFont(name, size)
+            self.font = font
+        if marker:
+            self.canvas.drawString(marker_x, self.y, marker)
+        self.canvas.drawString(x, self.y, text)
+
+    def save(self):
+        self.canvas.save()
+
+
+def render(markdown: str, fileobj):
+    """Renders `markdown` as a PDF into the binary file object `fileobj`."""
+    writer = _Writer(fileobj)
+    for block in _blocks(markdown):
+        if block is None:
+            writer.space(BODY_FONT[1] // 2)
+            continue
+        style, marker, text, level = block
+        font = STYLES[style]
+        text = strip_inline(text)
+        if style != "body":
+            writer.space(font[1] // 2)
+
+        x = MARGIN + (level - 1) * LIST_INDENT if level else MARGIN
+        text_x = x + LIST_INDENT if marker else x
+        max_width = writer.width - MARGIN - text_x
+        for i, wrapped in enumerate(wrap(text, font, max_width) or [""]):
+            writer.line(text_x, wrapped, font, marker if i == 0 else None, x)
+    writer.save()
+
+
+def _prune_cache():
+    try:
+        entries = [os.path.join(PDF_CACHE_DIR, name) for name in os.listdir(PDF_CACHE_DIR) if name.endswith(".pdf")]
+        if len(entries) <= PDF_CACHE_MAX_FILES:
+            return
+        entries.sort(key=os.path.getmtime)
+        for path in entries[:len(entries) - PDF_CACHE_MAX_FILES]:
+            os.remove(path)
+    except OSError as e:
+        print("⚠️ Failed to prune PDF cache:", e)
+
+
+def get_pdf(markdown: str, use_cache=True):
+    """
+    Returns (path, None) for a cached PDF of `markdown`, rendering it first
+    if needed. If the cache directory isn't writable, or `use_cache` is
+    False, returns (None, fileobj) with the rendered PDF rewound in a
+    spooled temp file instead.
+    """
+    path = os.path.join(PDF_CACHE_DIR, report_hash(markdown) + ".pdf")
+    if use_cache and os.path.exists(path):
+        try:
+            os.utime(path)  # keeps recently served reports out of pruning
+        except OSError:
+            pass
+        return path, None
+
+    spool = tempfile.SpooledTemporaryFile(max_size=PDF_SPOOL_MAX_BYTES)
+    render(markdown, spool)
+    spool.seek(0)
+    if not use_cache:
+        return None, spool
+
+    try:
+        os.makedirs(PDF_CACHE_DIR, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=PDF_CACHE_DIR, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            shutil.copyfileobj(spool, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print("⚠️ Failed to cache report PDF:", e)
+        spool.seek(0)
+        return None, spool
+
+    spool.close()
+    _prune_cache()
+    return path, None
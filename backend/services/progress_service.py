@@ -0,0 +1,156 @@
+# XP, streak and badge updates, callable in-process from any route
+import os
+import time
+from datetime import datetime, timedelta
+from appwrite.permission import Permission
+from appwrite.role import Role
+from services.appwrite_client import databases as db
+from services import leaderboard_store, activity_log
+
+USER_PROGRESS_COLLECTION = os.getenv("APPWRITE_USER_PROGRESS_COLLECTION_ID")
+DATABASE_ID = os.getenv("APPWRITE_DATABASE_ID")
+
+BADGE_RULES = [
+    # 🎯 Streak
+    {"name": "Consistency Champ", "streak": 5},        # 5-day streak
+    {"name": "Streak Star", "streak": 10},             # 10-day streak
+    {"name": "Streak Legend", "streak": 30},           # 30-day streak
+    {"name": "Unstoppable", "streak": 100},            # 100-day streak
+
+    # ⚡ XP
+    {"name": "Layout Sprout", "xp": 10},               # First 10 XP
+    {"name": "Progress Pioneer", "xp": 15},            # 15 XP
+    {"name": "Going Strong", "xp": 25},                # 25 XP
+    {"name": "Rising Coder", "xp": 50},                # 50 XP
+    {"name": "Challenge Master", "xp": 100},           # 100 XP
+    {"name": "XP Grinder", "xp": 500},                 # 500 XP
+    {"name": "Elite Learner", "xp": 1000},             # 1000 XP
+    {"name": "Knowledge Titan", "xp": 5000},           # 5000 XP
+
+    # 🏆 Special milestone
+    {"name": "Fast Starter", "streak": 1},             # Logged Day 1
+    {"name": "Dedication Pro", "xp": 500, "streak": 10},  # Both XP + streak
+    {"name": "Ultimate Scholar", "xp": 2000, "streak": 50}, # Hardcore combo
+]
+
+def get_iso_now():
+    """Returns current UTC time in ISO 8601 format for Appwrite."""
+    return datetime.utcnow().isoformat() + "Z"
+
+
+class ProgressUpdateError(Exception):
+    pass
+
+
+def update_progress(user_id: str, xp_earned: int = 0, challenge_title: str = "") -> dict:
+    """
+    Awards XP to a user, updating streak, badges and activities.
+    Returns the new progress state; raises ProgressUpdateError if the
+    progress document can't be written.
+
+    This is a plain read-modify-write; concurrent callers should go through
+    services.xp_pipeline, which serializes and coalesces awards per user.
+    """
+    return apply_awards(user_id, [(xp_earned, challenge_title)])
+
+
+def apply_awards(user_id: str, awards: list) -> dict:
+    """
+    Applies several (xp_earned, challenge_title) awards with a single read
+    and a single write of the progress document.
+    """
+    try:
+        user_doc = db.get_document(
+            database_id=DATABASE_ID,
+            collection_id=USER_PROGRESS_COLLECTION,
+            document_id=user_id
+        )
+    except Exception:
+        user_doc = db.create_document(
+            database_id=DATABASE_ID,
+            collection_id=USER_PROGRESS_COLLECTION,
+            document_id=user_id,
+            data={
+                "userId": user_id,
+                "xp": 0,
+                "streak": 0,
+                "badges": "",
+                "activities": [],
+                "updatedAt": get_iso_now()
+            },
+            permissions=[
+                Permission.read(Role.user(user_id)),
+                Permission.update(Role.user(user_id))
+            ]
+        )
+
+    current_xp = user_doc.get("xp", 0)
+    streak = user_doc.get("streak", 0)
+    last_update_str = user_doc.get("updatedAt")
+
+    today = datetime.utcnow().date()
+    if last_update_str:
+        last_date = datetime.fromisoformat(last_update_str.replace("Z", "")).date()
+        if last_date == today - timedelta(days=1):
+            streak += 1
+        elif last_date < today - timedelta(days=1):
+            streak = 1
+    else:
+        streak = 1
+
+    new_xp = current_xp + sum(xp_earned for xp_earned, _ in awards)
+
+    badges = set(user_doc.get("badges", "").split(",")) if user_doc.get("badges") else set()
+    for rule in BADGE_RULES:
+        if "xp" in rule and new_xp >= rule["xp"]:
+            badges.add(rule["name"])
+        if "streak" in rule and streak >= rule["streak"]:
+            badges.add(rule["name"])
+    badges_str = ",".join(badges)
+
+    new_activities = [
+        {
+            "message": f"Earned {xp_earned} XP from {challenge_title}. Streak is now {streak} day(s).",
+            "badges": list(badges),
+            "timestamp": int(time.time())
+        }
+        for xp_earned, challenge_title in awards
+    ]
+    activities = user_doc.get("activities", [])
+    for new_activity in new_activities:
+        activities = activity_log.push_recent(activities, new_activity)
+
+    try:
+        db.update_document(
+            database_id=DATABASE_ID,
+            collection_id=USER_PROGRESS_COLLECTION,
+            document_id=user_id,
+            data={
+                "xp": new_xp,
+                "streak": streak,
+                "badges": badges_str,
+                "activities": activities,
+                "updatedAt": get_iso_now()
+            }
+        )
+    except Exception as e:
+        raise ProgressUpdateError(f"Failed to update document: {str(e)}")
+
+    for new_activity in new_activities:
+        try:
+            activity_log.append(user_id, new_activity)
+        except Exception as e:
+            print("⚠️ Failed to append activity:", e)
+
+    try:
+        leaderboard_store.record_progress(user_id, new_xp, streak, badges)
+    except Exception as e:
+        print("⚠️ Failed to update leaderboard:", e)
+
+    return {
+        "xp": new_xp,
+        "streak": streak,
+        "badges": list(badges),
+        "latest_activity": new_activities[-1],
+        "activities": activity_log.recent(activities)
+    }
@@ -0,0 +1,122 @@
+# Compacts a user's challenge submissions into report input
+#
+# The report prompt used to embed every raw submission (full solutions plus
+# Appwrite system fields), so it grew without bound. Submissions are now
+# reduced to per-doc statistics with a few short sample answers, and the
+# samples are trimmed until the whole summary fits REPORT_TOKEN_BUDGET.
+import os
+import json
+from collections import defaultdict
+
+REPORT_TOKEN_BUDGET = int(os.getenv("REPORT_TOKEN_BUDGET", "6000"))
+REPORT_MAX_DOCS = int(os.getenv("REPORT_MAX_DOCS", "20"))
+REPORT_SAMPLES_PER_DOC = 2
+REPORT_SAMPLE_CHARS = 600
+
+# Fields the aggregation reads; pass as `select` when listing submissions
+SUBMISSION_FIELDS = ["doc_id", "user_solution", "feedback", "xp_awarded", "$createdAt"]
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token is close enough for budgeting English/code
+    return len(text) // 4 + 1
+
+
+def _truncate(text, limit: int) -> str:
+    text = " ".join(str(text or "").split())
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+
+def _xp(sub) -> int:
+    try:
+        return int(sub.get("xp_awarded") or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _doc_stats(doc_id, subs):
+    subs = sorted(subs, key=lambda s: s.get("$createdAt") or "")
+    xps = [_xp(s) for s in subs]
+    return {
+        "doc_id": doc_id,
+        "attempts": len(subs),
+        "passed": sum(1 for xp in xps if xp > 0),
+        "total_xp": sum(xps),
+        "avg_xp": round(sum(xps) / len(xps), 2),
+        "best_xp": max(xps),
+        "first_attempt": subs[0].get("$createdAt"),
+        "last_attempt": subs[-1].get("$createdAt"),
+        "_subs": subs,
+    }
+
+
+def _samples(subs, count: int, chars: int):
+    """The latest attempt plus the best-scoring earlier one."""
+    if count <= 0 or chars <= 0:
+        return []
+    picked = [subs[-1]]
+    earlier = subs[:-1]
+    if count > 1 and earlier:
+        picked.insert(0, max(earlier, key=_xp))
+    return [
+        {
+            "xp": _xp(s),
+            "solution": _truncate(s.get("user_solution"), chars),
+            "feedback": _truncate(s.get("feedback"), chars // 2),
+        }
+        for s in picked
+    ]
+
+
+def aggregate_submissions(submissions, token_budget: int = REPORT_TOKEN_BUDGET) -> dict:
+    """
+    Returns a JSON-serializable summary: overall totals, per-doc stats for
+    the most recently practised docs, and sample answers sized to fit
+    `token_budget`. Same input always gives the same output, so the result
+    can be hashed as a cache key.
+    """
+    by_doc = defaultdict(list)
+    for sub in submissions:
+        by_doc[sub.get("doc_id") or "unknown"].append(sub)
+
+    docs = [_doc_stats(doc_id, subs) for doc_id, subs in by_doc.items()]
+    docs.sort(key=lambda d: (d["last_attempt"] or "", d["doc_id"]), reverse=True)
+
+    all_xp = [_xp(s) for s in submissions]
+    summary = {
+        "total_submissions": len(submissions),
+        "docs_attempted": len(docs),
+        "passed": sum(1 for xp in all_xp if xp > 0),
+        "total_xp_awarded": sum(all_xp),
+        "docs": [],
+    }
+    omitted = docs[REPORT_MAX_DOCS:]
+    if omitted:
+        summary["older_docs"] = {
+            "count": len(omitted),
+            "attempts": sum(d["attempts"] for d in omitted),
+            "total_xp": sum(d["total_xp"] for d in omitted),
+        }
+    docs = docs[:REPORT_MAX_DOCS]
+
+    # Shrink samples until the summary fits: shorter text first, then
+    # fewer samples, then samples only for the most recent docs
+    sample_chars, samples_per_doc, docs_with_samples = REPORT_SAMPLE_CHARS, REPORT_SAMPLES_PER_DOC, len(docs)
+    while True:
+        summary["docs"] = [
+            {
+                **{k: v for k, v in d.items() if k != "_subs"},
+                "samples": _samples(d["_subs"], samples_per_doc if i < docs_with_samples else 0, sample_chars),
+            }
+            for i, d in enumerate(docs)
+        ]
+        if estimate_tokens(json.dumps(summary)) <= token_budget:
+            return summary
+        if sample_chars > 150:
+            sample_chars //= 2
+        elif samples_per_doc > 1:
+            samples_per_doc -= 1
+        elif docs_with_samples > 0:
+            docs_with_samples //= 2
+        else:
+            return summary
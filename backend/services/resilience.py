@@ -0,0 +1,405 @@
+# Circuit breakers, latency budgets and hedged reads for outbound calls
+#
+# http_client routes every request through here. Each dependency (Gemini,
+# Google CSE, and each scraped host) has a circuit breaker: once most of
+# its recent calls fail or time out, calls fail fast with CircuitOpen
+# (a requests.ConnectionError, so existing error handling applies) until
+# a cool-down passes and a single probe succeeds.
+#
+# Incoming requests get a latency budget (REQUEST_BUDGET_SECONDS, or less
+# if the client sends X-Request-Timeout). Outbound timeouts are clamped to
+# what is left of it, and once it is spent further calls fail immediately
+# with BudgetExceeded instead of each waiting out its own timeout. The
+# budget bounds connect and per-read waits, not a trickling body.
+#
+# Idempotent reads can be hedged: if the first attempt hasn't answered
+# after the dependency's recent p95 latency, a second one is sent from a
+# small pool and the first usable response wins. The first attempt runs on
+# the caller's thread; if the hedge wins, the first attempt's socket is
+# shut down so the caller can return at once.
+import os
+import time
+import math
+import heapq
+import itertools
+import threading
+import contextvars
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+import requests
+
+CB_WINDOW = int(os.getenv("CB_WINDOW", "20"))
+CB_MIN_CALLS = int(os.getenv("CB_MIN_CALLS", "5"))
+CB_FAILURE_RATIO = float(os.getenv("CB_FAILURE_RATIO", "0.5"))
+CB_OPEN_SECONDS = float(os.getenv("CB_OPEN_SECONDS", "30"))
+MAX_TRACKED_DEPENDENCIES = 1000
+
+REQUEST_BUDGET_SECONDS = float(os.getenv("REQUEST_BUDGET_SECONDS", "60"))
+# Kept back from the budget for our own work after the last outbound call
+REQUEST_BUDGET_RESERVE = float(os.getenv("REQUEST_BUDGET_RESERVE", "0.5"))
+
+HEDGE_DEFAULT_DELAY = float(os.getenv("HEDGE_DEFAULT_DELAY", "2"))
+HEDGE_MIN_DELAY = float(os.getenv("HEDGE_MIN_DELAY", "0.05"))
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+HEDGE_MAX_IN_FLIGHT = int(os.getenv("HEDGE_MAX_IN_FLIGHT", "4"))
+LATENCY_SAMPLES = 200
+
+# Breaker states
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpen(requests.exceptions.ConnectionError):
+    def __init__(self, dependency, retry_after):
+        super().__init__(f"{dependency} is unavailable, failing fast")
+        self.dependency = dependency
+        self.retry_after = max(1, int(math.ceil(retry_after)))
+
+
+class BudgetExceeded(requests.exceptions.Timeout):
+    pass
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, slow_call: float):
+        self.name = name
+        self.slow_call = slow_call
+        self.state = CLOSED
+        self.outcomes = deque(maxlen=CB_WINDOW)   # True = success
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+        self.opened_at = 0.0
+        self.probing = False
+        self.counts = {"calls": 0, "failures": 0, "rejected": 0, "opened": 0}
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """Raises CircuitOpen if the call shouldn't be attempted."""
+        with self._lock:
+            if self.state == OPEN:
+                remaining = self.opened_at + CB_OPEN_SECONDS - time.monotonic()
+                if remaining > 0:
+                    self.counts["rejected"] += 1
+                    raise CircuitOpen(self.name, remaining)
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN:
+                # One probe at a time decides whether the dependency is back
+                if self.probing:
+                    self.counts["rejected"] += 1
+                    raise CircuitOpen(self.name, 1)
+                self.probing = True
+            self.counts["calls"] += 1
+
+    def record(self, ok: bool, latency: float = None):
+        with self._lock:
+            self.probing = False
+            if latency is not None:
+                self.latencies.append(latency)
+            if not ok:
+                self.counts["failures"] += 1
+
+            if self.state == HALF_OPEN:
+                if ok:
+                    self.state = CLOSED
+                    self.outcomes.clear()
+                else:
+                    self._open()
+                return
+
+            self.outcomes.append(ok)
+            failures = self.outcomes.count(False)
+            if len(self.outcomes) >= CB_MIN_CALLS and failures / len(self.outcomes) >= CB_FAILURE_RATIO:
+                self._open()
+
+    def abandon(self):
+        """The call ended without telling us anything about the dependency."""
+        with self._lock:
+            self.probing = False
+
+    def _open(self):
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self.outcomes.clear()
+        self.counts["opened"] += 1
+
+    def p95(self):
+        with self._lock:
+            if len(self.latencies) < HEDGE_MIN_SAMPLES:
+                return None
+            ordered = sorted(self.latencies)
+        return ordered[int(len(ordered) * 0.95) - 1]
+
+    def snapshot(self) -> dict:
+        p95 = self.p95()
+        with self._lock:
+            return {
+                "state": self.state,
+                "recent_failure_ratio": round(self.outcomes.count(False) / len(self.outcomes), 3) if self.outcomes else 0.0,
+                "p95_seconds": round(p95, 3) if p95 is not None else None,
+                **self.counts,
+            }
+
+
+_lock = threading.Lock()
+_breakers = OrderedDict()
+
+
+def breaker(name: str, slow_call: float) -> CircuitBreaker:
+    with _lock:
+        b = _breakers.get(name)
+        if b is None:
+            b = _breakers[name] = CircuitBreaker(name, slow_call)
+            while len(_breakers) > MAX_TRACKED_DEPENDENCIES:
+                _breakers.popitem(last=False)
+        _breakers.move_to_end(name)
+        return b
+
+
+# --- Latency budgets ---
+
+_deadline = contextvars.ContextVar("request_deadline", default=None)
+
+
+def start_request_budget(requested=None):
+    """
+    Starts the budget for the incoming request on this thread. `requested`
+    is the client's X-Request-Timeout in seconds; it can only shorten ours.
+    """
+    budget = REQUEST_BUDGET_SECONDS
+    try:
+        if requested:
+            budget = min(budget, float(requested))
+    except ValueError:
+        pass
+    _deadline.set(time.monotonic() + max(0.0, budget - REQUEST_BUDGET_RESERVE))
+
+
+def end_request_budget():
+    _deadline.set(None)
+
+
+@contextmanager
+def budget(seconds):
+    """Runs the block with its own budget; None lifts it (e.g. for streams)."""
+    token = _deadline.set(time.monotonic() + seconds if seconds is not None else None)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining():
+    """Seconds left in the current budget, or None if there is none."""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def clamp_timeout(timeout):
+    """
+    Returns (timeout, clamped): `timeout` (a number or (connect, read))
+    cut down to the remaining budget. Raises BudgetExceeded if it's spent.
+    """
+    left = remaining()
+    if left is None:
+        return timeout, False
+    if left <= 0:
+        raise BudgetExceeded("Request latency budget exhausted")
+    if isinstance(timeout, tuple):
+        clamped = tuple(min(t, left) if t is not None else left for t in timeout)
+    else:
+        clamped = min(timeout, left) if timeout is not None else left
+    return clamped, clamped != timeout
+
+
+# --- Guarded calls and hedging ---
+
+def is_failure(resp) -> bool:
+    return resp.status_code >= 500 or resp.status_code == 429
+
+
+def call(b: CircuitBreaker, send, clamped=False, interrupted=None):
+    """
+    Runs `send()` behind breaker `b`, recording the outcome. `interrupted()`
+    tells whether a failure was us cutting the call short (a hedge won).
+    """
+    b.before_call()
+    start = time.monotonic()
+    try:
+        resp = send()
+    except requests.exceptions.RequestException:
+        # Running out of our own budget says nothing about the dependency
+        left = remaining()
+        if (clamped and left is not None and left <= 0) or (interrupted and interrupted()):
+            b.abandon()
+        else:
+            b.record(False)
+        raise
+    except BaseException:
+        b.abandon()
+        raise
+
+    latency = time.monotonic() - start
+    b.record(not is_failure(resp) and latency < b.slow_call, latency)
+    return resp
+
+
+class _Timers:
+    """One thread running callbacks after a delay; hedges are launched from it."""
+
+    def __init__(self):
+        self._heap = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def call_later(self, delay, fn):
+        entry = [time.monotonic() + delay, next(self._seq), fn]
+        with self._cond:
+            heapq.heappush(self._heap, entry)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="hedge-timer", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return entry
+
+    @staticmethod
+    def cancel(entry):
+        entry[2] = None   # dropped when it comes due
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._heap or self._heap[0][0] > time.monotonic():
+                    self._cond.wait(self._heap[0][0] - time.monotonic() if self._heap else None)
+                fn = heapq.heappop(self._heap)[2]
+            if fn is not None:
+                try:
+                    fn()
+                except Exception as e:
+                    print("⚠️ Hedge launch failed:", e)
+
+
+_timers = _Timers()
+# Only hedges run here; primaries stay on the caller's thread
+_hedge_pool = ThreadPoolExecutor(max_workers=HEDGE_MAX_IN_FLIGHT, thread_name_prefix="hedge")
+_hedges_in_flight = 0
+_hedge_stats = {"hedged": 0, "hedge_won": 0}
+
+
+def _discard(future):
+    # The losing attempt: close its response so the connection goes back to the pool
+    try:
+        future.result().close()
+    except Exception:
+        pass
+
+
+class _HedgeRace:
+    def __init__(self, hedge, interrupt):
+        self.hedge = hedge
+        self.interrupt = interrupt
+        # The hedge keeps the caller's budget
+        self.context = contextvars.copy_context()
+        self.primary_done = False
+        self.future = None
+        self.won = None
+        self._lock = threading.Lock()
+
+    def launch(self):
+        global _hedges_in_flight
+        with self._lock:
+            if self.primary_done:
+                return
+            with _lock:
+                if _hedges_in_flight >= HEDGE_MAX_IN_FLIGHT:
+                    return
+                _hedges_in_flight += 1
+                _hedge_stats["hedged"] += 1
+            self.future = _hedge_pool.submit(self.context.run, self._run)
+
+    def _run(self):
+        global _hedges_in_flight
+        try:
+            resp = self.hedge()
+        finally:
+            with _lock:
+                _hedges_in_flight -= 1
+        with self._lock:
+            if not self.primary_done and not is_failure(resp):
+                # Free the caller, who is still waiting on the primary
+                self.won = resp
+                self.interrupt()
+        return resp
+
+    def _hedge_won(self, resp, loser):
+        if loser is not None:
+            loser.close()
+        with _lock:
+            _hedge_stats["hedge_won"] += 1
+        return resp
+
+    def finish(self, resp):
+        """
+        Called once the primary has returned `resp` (None if it raised);
+        returns the response to use, or None to re-raise.
+        """
+        with self._lock:
+            self.primary_done = True
+            future, won = self.future, self.won
+        if won is not None:
+            return self._hedge_won(won, resp)
+        if future is None:
+            return resp
+        if resp is not None and not is_failure(resp):
+            future.add_done_callback(_discard)
+            return resp
+
+        # The primary failed while the hedge is still out: wait for it
+        try:
+            hedge_resp = future.result()
+        except requests.exceptions.RequestException:
+            return resp
+        if is_failure(hedge_resp):
+            if resp is None:
+                return hedge_resp
+            hedge_resp.close()
+            return resp
+        return self._hedge_won(hedge_resp, resp)
+
+
+def hedged(b: CircuitBreaker, primary, hedge, interrupt):
+    """
+    Runs `primary()` on the caller's thread. If it hasn't returned after
+    the dependency's p95 latency, `hedge()` is started on the hedge pool;
+    if that answers first with a usable response, `interrupt()` aborts the
+    primary and the hedge's response is returned. Only for idempotent
+    requests.
+    """
+    delay = b.p95() or HEDGE_DEFAULT_DELAY
+    left = remaining()
+    if left is not None and left <= delay:
+        return primary()   # no time for a second try to help
+
+    race = _HedgeRace(hedge, interrupt)
+    timer = _timers.call_later(max(delay, HEDGE_MIN_DELAY), race.launch)
+    try:
+        resp = primary()
+    except requests.exceptions.RequestException:
+        _timers.cancel(timer)
+        resp = race.finish(None)
+        if resp is None:
+            raise
+        return resp
+    _timers.cancel(timer)
+    return race.finish(resp)
+
+
+def stats() -> dict:
+    with _lock:
+        breakers = list(_breakers.values())
+        hedging = {**_hedge_stats, "in_flight": _hedges_in_flight}
+    return {
+        "dependencies": {b.name: b.snapshot() for b in breakers},
+        "hedging": hedging,
+    }
@@ -0,0 +1,279 @@
+# Coalescing, per-user serialized XP awards
+#
+# A progress update is a read-modify-write of the user's progress document,
+# and Appwrite has no conditional (compare-and-swap) update, so two awards
+# racing for the same user overwrite each other's XP. Awards are queued here
+# instead: events for the same user that arrive within XP_COALESCE_WINDOW
+# are merged into one batch, and each batch is applied with a single read
+# and write while holding a per-user lock file that all workers on the host
+# share. A failed batch is retried with a fresh read.
+#
+# Queued awards are also journaled to a local SQLite file and removed once
+# applied. Pending batches are flushed at interpreter exit, and awards a
+# crashed worker left in the journal are re-queued by the next process to
+# start after XP_RECOVER_AFTER seconds (at-least-once: a crash between the
+# progress write and the journal delete applies that batch twice).
+# discard() drops a user's queued awards when the account is deleted, and
+# refuses new ones, so a late batch can't recreate the progress document.
+import os
+import time
+import uuid
+import queue
+import atexit
+import random
+import sqlite3
+import hashlib
+import tempfile
+import threading
+from contextlib import contextmanager
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from services import progress_service
+
+try:
+    import fcntl
+except ImportError:
+    # No flock (Windows dev boxes): awards are only serialized in-process
+    fcntl = None
+
+XP_COALESCE_WINDOW = float(os.getenv("XP_COALESCE_WINDOW", "0.2"))
+XP_MAX_BATCH = int(os.getenv("XP_MAX_BATCH", "50"))
+XP_MAX_RETRIES = int(os.getenv("XP_MAX_RETRIES", "3"))
+XP_RETRY_BACKOFF = float(os.getenv("XP_RETRY_BACKOFF", "0.2"))
+XP_FLUSH_WORKERS = int(os.getenv("XP_FLUSH_WORKERS", "4"))
+XP_RESULT_TIMEOUT = float(os.getenv("XP_RESULT_TIMEOUT", "30"))
+XP_LOCK_DIR = os.getenv("XP_LOCK_DIR", os.path.join(tempfile.gettempdir(), "fundocs-xp-locks"))
+XP_JOURNAL_PATH = os.getenv(
+    "XP_JOURNAL_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "xp_awards.db"),
+)
+# Journaled awards older than this are taken to belong to a dead worker
+XP_RECOVER_AFTER = float(os.getenv("XP_RECOVER_AFTER", "300"))
+XP_DRAIN_TIMEOUT = float(os.getenv("XP_DRAIN_TIMEOUT", "10"))
+
+_queue = None
+_executor = None
+_worker_pid = None
+_start_lock = threading.Lock()
+_fallback_lock = threading.Lock()
+
+
+@contextmanager
+def _connect():
+    conn = sqlite3.connect(XP_JOURNAL_PATH, timeout=30)
+    conn.row_factory = sqlite3.Row
+    # WAL + NORMAL survives a worker crash, which is what the journal is for
+    conn.execute("PRAGMA synchronous=NORMAL")
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+class AccountDeleted(Exception):
+    pass
+
+
+def _init_journal():
+    with _connect() as conn:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS xp_awards (
+                id TEXT PRIMARY KEY,
+                user_id TEXT NOT NULL,
+                xp INTEGER NOT NULL,
+                title TEXT NOT NULL,
+                queued_at REAL NOT NULL
+            )
+            """
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS xp_awards_user ON xp_awards (user_id)")
+        conn.execute("CREATE TABLE IF NOT EXISTS discarded_users (user_id TEXT PRIMARY KEY, discarded_at REAL NOT NULL)")
+
+
+def _recover():
+    """Takes over awards left in the journal by a worker that died, and returns them."""
+    now = time.time()
+    with _connect() as conn:
+        rows = conn.execute(
+            "SELECT id, user_id, xp, title FROM xp_awards WHERE queued_at < ?",
+            (now - XP_RECOVER_AFTER,),
+        ).fetchall()
+        recovered = []
+        for row in rows:
+            # Another worker starting at the same time may claim it first
+            cur = conn.execute(
+                "UPDATE xp_awards SET queued_at = ? WHERE id = ? AND queued_at < ?",
+                (now, row["id"], now - XP_RECOVER_AFTER),
+            )
+            if cur.rowcount == 1:
+                recovered.append(row)
+    if recovered:
+        print(f"⚠️ Re-queueing {len(recovered)} XP award(s) left by a stopped worker")
+    return recovered
+
+
+def _journaled(award_ids) -> set:
+    """The ids among `award_ids` still in the journal, i.e. not discarded."""
+    with _connect() as conn:
+        rows = conn.execute(
+            f"SELECT id FROM xp_awards WHERE id IN ({', '.join('?' * len(award_ids))})", award_ids
+        ).fetchall()
+    return {row["id"] for row in rows}
+
+
+def _forget(award_ids):
+    try:
+        with _connect() as conn:
+            conn.executemany("DELETE FROM xp_awards WHERE id = ?", [(award_id,) for award_id in award_ids])
+    except sqlite3.Error as e:
+        print("⚠️ Failed to clear applied XP awards from the journal:", e)
+
+
+@contextmanager
+def _user_lock(user_id: str):
+    if fcntl is None:
+        with _fallback_lock:
+            yield
+        return
+
+    name = hashlib.sha1(user_id.encode("utf-8")).hexdigest()
+    with open(os.path.join(XP_LOCK_DIR, name + ".lock"), "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _ensure_started():
+    """Starts this process' coalescing thread, again after a fork."""
+    global _queue, _executor, _worker_pid
+    pid = os.getpid()
+    if _worker_pid == pid:
+        return
+    with _start_lock:
+        if _worker_pid == pid:
+            return
+        os.makedirs(XP_LOCK_DIR, exist_ok=True)
+        _init_journal()
+        _queue = queue.Queue()
+        _executor = ThreadPoolExecutor(max_workers=XP_FLUSH_WORKERS, thread_name_prefix="xp-flush")
+        drained = Future()
+        threading.Thread(target=_coalesce, args=(_queue, _executor, drained), name="xp-coalesce", daemon=True).start()
+        atexit.register(_drain, pid, _queue, drained)
+        _worker_pid = pid
+
+        for row in _recover():
+            _queue.put((row["id"], row["user_id"], row["xp"], row["title"], Future()))
+
+
+def _drain(pid, events, drained):
+    """Flushes every pending batch now instead of at its deadline (interpreter exit)."""
+    if os.getpid() != pid:
+        return   # inherited across a fork; the coalescing thread didn't come along
+    events.put(None)
+    try:
+        leftover = drained.result(timeout=XP_DRAIN_TIMEOUT)
+    except FutureTimeout:
+        return
+    # The flush pool is already shut down by the time atexit handlers run
+    for user_id, batch in leftover:
+        _flush(user_id, batch)
+
+
+def _coalesce(events, executor, drained):
+    pending = {}  # user_id -> [deadline, [(award_id, xp, title, future)]]
+    draining = False
+    while True:
+        timeout = None
+        if pending:
+            timeout = max(min(batch[0] for batch in pending.values()) - time.monotonic(), 0)
+        try:
+            event = events.get(timeout=timeout)
+        except queue.Empty:
+            pass
+        else:
+            if event is None:
+                draining = True
+            else:
+                award_id, user_id, xp_earned, challenge_title, future = event
+                batch = pending.setdefault(user_id, [time.monotonic() + XP_COALESCE_WINDOW, []])
+                batch[1].append((award_id, xp_earned, challenge_title, future))
+                if len(batch[1]) >= XP_MAX_BATCH:
+                    batch[0] = 0
+
+        if draining:
+            drained.set_result([(user_id, batch[1]) for user_id, batch in pending.items()])
+            return
+        now = time.monotonic()
+        for user_id in [u for u, batch in pending.items() if batch[0] <= now]:
+            executor.submit(_flush, user_id, pending.pop(user_id)[1])
+
+
+def _flush(user_id: str, batch: list):
+    attempt = 0
+    while True:
+        try:
+            with _user_lock(user_id):
+                # Awards missing from the journal were discarded with the account
+                live = _journaled([award_id for award_id, _, _, _ in batch])
+                awards = [(xp_earned, title) for award_id, xp_earned, title, _ in batch if award_id in live]
+                result = progress_service.apply_awards(user_id, awards) if awards else None
+            break
+        except Exception as e:
+            attempt += 1
+            if attempt > XP_MAX_RETRIES:
+                print(f"⚠️ Failed to award XP to {user_id} after {attempt} attempts:", e)
+                # Callers are told it failed, so it must not be re-applied later
+                _forget([award_id for award_id, _, _, _ in batch])
+                for _, _, _, future in batch:
+                    future.set_exception(e)
+                return
+            time.sleep(XP_RETRY_BACKOFF * (2 ** (attempt - 1)) * (1 + random.random()))
+
+    _forget(list(live))
+    for award_id, _, _, future in batch:
+        if award_id in live:
+            future.set_result(result)
+        else:
+            future.set_exception(AccountDeleted(f"Account {user_id} was deleted"))
+
+
+def award(user_id: str, xp_earned: int = 0, challenge_title: str = "") -> Future:
+    """
+    Queues an award and returns a Future for the resulting progress state
+    (see progress_service.update_progress). Awards coalesced into the same
+    batch share one result. Fire-and-forget callers can ignore the Future.
+    Raises AccountDeleted if the user's awards were discarded, and
+    sqlite3.Error if the award can't be journaled.
+    """
+    _ensure_started()
+    award_id = uuid.uuid4().hex
+    with _connect() as conn:
+        if conn.execute("SELECT 1 FROM discarded_users WHERE user_id = ?", (user_id,)).fetchone():
+            raise AccountDeleted(f"Account {user_id} was deleted")
+        conn.execute(
+            "INSERT INTO xp_awards (id, user_id, xp, title, queued_at) VALUES (?, ?, ?, ?, ?)",
+            (award_id, user_id, xp_earned, challenge_title, time.time()),
+        )
+    future = Future()
+    _queue.put((award_id, user_id, xp_earned, challenge_title, future))
+    return future
+
+
+def discard(user_id: str) -> int:
+    """
+    Drops the user's queued awards, in every worker on the host, and
+    refuses new ones. Returns how many were dropped. Used when the account
+    is deleted.
+    """
+    _ensure_started()
+    with _user_lock(user_id):   # waits out a batch being applied right now
+        with _connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO discarded_users (user_id, discarded_at) VALUES (?, ?)",
+                (user_id, time.time()),
+            )
+            return conn.execute("DELETE FROM xp_awards WHERE user_id = ?", (user_id,)).rowcount
@@ -63,40 +63,40 @@ export default function ProfilePage() {
   const BACKEND_URL =
     process.env.NEXT_PUBLIC_BACKEND_URL || "http://127.0.0.1:5000";
 
+  const normalizeDoc = (doc: Doc): Doc => ({
+    ...doc,
+    steps: Array.isArray(doc.steps)
+      ? doc.steps
+      : typeof doc.steps === "string"
+      ? (doc.steps as string)
+          .split("\n")
+          .map((s: string) => s.trim())
+          .filter(Boolean)
+      : [],
+    flashcards: Array.isArray(doc.flashcards)
+      ? doc.flashcards
+      : typeof doc.flashcards === "string" &&
+        (doc.flashcards as string).trim() !== ""
+      ? (() => {
+          try {
+            return JSON.parse(doc.flashcards as string);
+          } catch {
+            return [];
+          }
+        })()
+      : [],
+  });
+
+  // The list only carries titles and dates; full content is loaded on open
   const fetchUserDocs = useCallback(async () => {
     if (!userTyped) return;
     setLoadingDocs(true);
     try {
       const resp = await fetch(
-        `${BACKEND_URL}/api/fetch_user_docs?userId=${userTyped.$id}`
+        `${BACKEND_URL}/api/fetch_user_docs?userId=${userTyped.$id}&view=summary`
       );
       const data = await resp.json();
-      if (resp.ok) {
-        const normalizedDocs = (data.docs || []).map((doc: Doc) => ({
-          ...doc,
-          steps: Array.isArray(doc.steps)
-            ? doc.steps
-            : typeof doc.steps === "string"
-            ? (doc.steps as string)
-                .split("\n")
-                .map((s: string) => s.trim())
-                .filter(Boolean)
-            : [],
-          flashcards: Array.isArray(doc.flashcards)
-            ? doc.flashcards
-            : typeof doc.flashcards === "string" &&
-              (doc.flashcards as string).trim() !== ""
-            ? (() => {
-                try {
-                  return JSON.parse(doc.flashcards as string);
-                } catch {
-                  return [];
-                }
-              })()
-            : [],
-        }));
-        setDocs(normalizedDocs);
-      }
+      if (resp.ok) setDocs(data.docs || []);
     } catch (err) {
       toast.error("Failed to fetch docs:" + (err as Error).message);
     } finally {
@@ -104,6 +104,23 @@ export default function ProfilePage() {
     }
   }, [BACKEND_URL, userTyped]);
 
+  const openDoc = async (docId: string) => {
+    if (!userTyped) return;
+    try {
+      const resp = await fetch(
+        `${BACKEND_URL}/api/docs/${docId}?userId=${userTyped.$id}`
+      );
+      const data = await resp.json();
+      if (!resp.ok) {
+        toast.error(data?.error || "Failed to load doc");
+        return;
+      }
+      setSelectedDoc(normalizeDoc(data.doc));
+    } catch (err) {
+      toast.error("Failed to load doc:" + (err as Error).message);
+    }
+  };
+
   useEffect(() => {
     if (!loading && !user) router.replace("/login");
     else fetchUserDocs();
@@ -316,7 +333,7 @@ export default function ProfilePage() {
                       {new Date(doc.createdAt).toLocaleString()}
                     </td>
                     <td className="p-3 flex flex-wrap gap-2">
-                      <Button size="sm" onClick={() => setSelectedDoc(doc)}>
+                      <Button size="sm" onClick={() => openDoc(doc.$id)}>
                         View
                       </Button>
                       <Button
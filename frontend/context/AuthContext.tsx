@@ -138,7 +138,7 @@ export const AuthProvider = ({ children }: { children: React.ReactNode }) => {
         }
 
         setUser(null);
-        toast.success("Your account and all documents have been deleted.");
+        toast.success("Your account and all documents are being deleted.");
         router.push("/login");
       } catch (err) {
         console.error("Delete Account Error:", err);